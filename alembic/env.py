@@ -1,5 +1,5 @@
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import create_engine, pool
 from alembic import context
 
 # Ensure the project root is on PYTHONPATH so `import app` works
@@ -8,11 +8,14 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Import your Base and models
-from app.backend.database import Base
+from app.backend.database import Base, SQLALCHEMY_DATABASE_URL
 from app.backend import models
 
 config = context.config
 
+# The app's database (DATABASE_URL) unless the caller sets sqlalchemy.url
+database_url = config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL
+
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
@@ -32,9 +35,8 @@ def run_migrations_offline() -> None:
     script output.
 
     """
-    url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url,
+        url=database_url,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
@@ -51,11 +53,7 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
-        poolclass=pool.NullPool,
-    )
+    connectable = create_engine(database_url, poolclass=pool.NullPool)
 
     with connectable.connect() as connection:
         context.configure(
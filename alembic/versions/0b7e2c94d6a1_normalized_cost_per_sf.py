@@ -0,0 +1,45 @@
+"""normalized cost per sf
+
+Revision ID: 0b7e2c94d6a1
+Revises: f38a6d0c5b19
+Create Date: 2026-10-19 17:41:09.663120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b7e2c94d6a1'
+down_revision: Union[str, Sequence[str], None] = 'f38a6d0c5b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of app.backend.unit_cost.COST_PER_SF_SQL at this revision
+COST_PER_SF_SQL = (
+    "CASE upper(pricing_unit)"
+    " WHEN 'SF' THEN price"
+    " WHEN 'SY' THEN price / 9.0"
+    " WHEN 'CT' THEN price / NULLIF(width, 0)"
+    " WHEN 'LF' THEN price / NULLIF(width, 0)"
+    " END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite can only ADD a VIRTUAL generated column (the indexes store the computed values);
+    # PostgreSQL before 18 only has STORED ones. Replaced by a plain column in b4d81f0c2a97.
+    persisted = op.get_context().dialect.name != "sqlite"
+    op.add_column('products', sa.Column('normalized_cost_per_sf', sa.Float(), sa.Computed(COST_PER_SF_SQL, persisted=persisted), nullable=True))
+    op.create_index('ix_products_cost_per_sf', 'products', ['normalized_cost_per_sf'], unique=False)
+    op.create_index('ix_products_type_cost_per_sf', 'products', ['product_type', 'normalized_cost_per_sf'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_type_cost_per_sf', table_name='products')
+    op.drop_index('ix_products_cost_per_sf', table_name='products')
+    op.drop_column('products', 'normalized_cost_per_sf')
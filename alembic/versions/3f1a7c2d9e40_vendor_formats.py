@@ -0,0 +1,37 @@
+"""vendor format registry
+
+Revision ID: 3f1a7c2d9e40
+Revises: 9c51d96bbecd
+Create Date: 2026-10-19 09:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a7c2d9e40'
+down_revision: Union[str, Sequence[str], None] = '9c51d96bbecd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vendor_formats',
+    sa.Column('fingerprint', sa.String(), nullable=False),
+    sa.Column('header_index', sa.Integer(), nullable=False),
+    sa.Column('header_hash', sa.String(), nullable=False),
+    sa.Column('delimiter', sa.String(), nullable=False),
+    sa.Column('encoding', sa.String(), nullable=False),
+    sa.Column('format_type', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.PrimaryKeyConstraint('fingerprint')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('vendor_formats')
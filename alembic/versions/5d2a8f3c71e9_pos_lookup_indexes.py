@@ -0,0 +1,30 @@
+"""pos lookup indexes
+
+Revision ID: 5d2a8f3c71e9
+Revises: 0b7e2c94d6a1
+Create Date: 2026-10-19 18:52:37.204815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a8f3c71e9'
+down_revision: Union[str, Sequence[str], None] = '0b7e2c94d6a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_products_barcode'), 'products', ['barcode'], unique=False)
+    op.create_index('ix_products_vendor_sku', 'products', ['vendor_id', 'sku'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_vendor_sku', table_name='products')
+    op.drop_index(op.f('ix_products_barcode'), table_name='products')
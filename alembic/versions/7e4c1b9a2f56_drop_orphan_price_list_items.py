@@ -0,0 +1,33 @@
+"""drop orphan price list items
+
+Revision ID: 7e4c1b9a2f56
+Revises: 5d2a8f3c71e9
+Create Date: 2026-10-19 21:14:06.518372
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4c1b9a2f56'
+down_revision: Union[str, Sequence[str], None] = '5d2a8f3c71e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite never enforced ondelete=CASCADE, so deleted products and price lists left their items behind
+    op.execute(sa.text(
+        "DELETE FROM price_list_items "
+        "WHERE product_id NOT IN (SELECT id FROM products) "
+        "OR price_list_id NOT IN (SELECT id FROM price_lists)"
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
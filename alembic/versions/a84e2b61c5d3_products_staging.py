@@ -0,0 +1,64 @@
+"""products staging table
+
+Revision ID: a84e2b61c5d3
+Revises: 3f1a7c2d9e40
+Create Date: 2026-10-19 10:03:54.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a84e2b61c5d3'
+down_revision: Union[str, Sequence[str], None] = '3f1a7c2d9e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('products_staging',
+    sa.Column('row_id', sa.Integer(), nullable=False),
+    sa.Column('batch_id', sa.String(), nullable=False),
+    sa.Column('sku', sa.String(), nullable=True),
+    sa.Column('style', sa.String(), nullable=True),
+    sa.Column('color', sa.String(), nullable=True),
+    sa.Column('product_type', sa.String(), nullable=True),
+    sa.Column('pricing_unit', sa.String(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=True),
+    sa.Column('width', sa.Float(), nullable=True),
+    sa.Column('backing', sa.String(), nullable=True),
+    sa.Column('retail_price', sa.Float(), nullable=True),
+    sa.Column('is_promo', sa.Boolean(), nullable=True),
+    sa.Column('start_promo_date', sa.String(), nullable=True),
+    sa.Column('end_promo_date', sa.String(), nullable=True),
+    sa.Column('promo_cut_cost', sa.Float(), nullable=True),
+    sa.Column('promo_roll_cost', sa.Float(), nullable=True),
+    sa.Column('is_dropped', sa.Boolean(), nullable=True),
+    sa.Column('retail_formula', sa.String(), nullable=True),
+    sa.Column('display_tags', sa.Boolean(), nullable=True),
+    sa.Column('comments', sa.String(), nullable=True),
+    sa.Column('private_style', sa.String(), nullable=True),
+    sa.Column('private_color', sa.String(), nullable=True),
+    sa.Column('weight', sa.Float(), nullable=True),
+    sa.Column('custom', sa.String(), nullable=True),
+    sa.Column('style_ux', sa.String(), nullable=True),
+    sa.Column('style_care', sa.Float(), nullable=True),
+    sa.Column('color_care', sa.Float(), nullable=True),
+    sa.Column('display_online', sa.Boolean(), nullable=True),
+    sa.Column('freight', sa.Float(), nullable=True),
+    sa.Column('picture_url', sa.String(), nullable=True),
+    sa.Column('barcode', sa.String(), nullable=True),
+    sa.Column('vendor_id', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('row_id')
+    )
+    op.create_index(op.f('ix_products_staging_batch_id'), 'products_staging', ['batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_staging_batch_id'), table_name='products_staging')
+    op.drop_table('products_staging')
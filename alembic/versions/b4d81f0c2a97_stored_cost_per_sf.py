@@ -0,0 +1,67 @@
+"""stored cost per sf
+
+Revision ID: b4d81f0c2a97
+Revises: 7e4c1b9a2f56
+Create Date: 2026-10-19 22:37:45.204813
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d81f0c2a97'
+down_revision: Union[str, Sequence[str], None] = '7e4c1b9a2f56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Existing rows have no sf_per_carton yet, so CT prices stay NULL until re-imported
+BACKFILL_SQL = (
+    "UPDATE products SET normalized_cost_per_sf = CASE upper(pricing_unit)"
+    " WHEN 'SF' THEN price"
+    " WHEN 'SY' THEN price / 9.0"
+    " WHEN 'LF' THEN price / NULLIF(width, 0)"
+    " END"
+)
+
+# Frozen copy of the generated column expression at 0b7e2c94d6a1
+COST_PER_SF_SQL = (
+    "CASE upper(pricing_unit)"
+    " WHEN 'SF' THEN price"
+    " WHEN 'SY' THEN price / 9.0"
+    " WHEN 'CT' THEN price / NULLIF(width, 0)"
+    " WHEN 'LF' THEN price / NULLIF(width, 0)"
+    " END"
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The generated column divided CT prices by `width`, which is often a piece count;
+    # the app now writes the value itself (see app/backend/unit_cost.py)
+    op.drop_index('ix_products_type_cost_per_sf', table_name='products')
+    op.drop_index('ix_products_cost_per_sf', table_name='products')
+    op.drop_column('products', 'normalized_cost_per_sf')
+    op.add_column('products', sa.Column('sf_per_carton', sa.Float(), nullable=True))
+    op.add_column('products', sa.Column('normalized_cost_per_sf', sa.Float(), nullable=True))
+    op.add_column('products_staging', sa.Column('sf_per_carton', sa.Float(), nullable=True))
+    op.add_column('products_staging', sa.Column('normalized_cost_per_sf', sa.Float(), nullable=True))
+    op.execute(sa.text(BACKFILL_SQL))
+    op.create_index('ix_products_cost_per_sf', 'products', ['normalized_cost_per_sf'], unique=False)
+    op.create_index('ix_products_type_cost_per_sf', 'products', ['product_type', 'normalized_cost_per_sf'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_type_cost_per_sf', table_name='products')
+    op.drop_index('ix_products_cost_per_sf', table_name='products')
+    op.drop_column('products_staging', 'normalized_cost_per_sf')
+    op.drop_column('products_staging', 'sf_per_carton')
+    op.drop_column('products', 'normalized_cost_per_sf')
+    op.drop_column('products', 'sf_per_carton')
+    persisted = op.get_context().dialect.name != "sqlite"
+    op.add_column('products', sa.Column('normalized_cost_per_sf', sa.Float(), sa.Computed(COST_PER_SF_SQL, persisted=persisted), nullable=True))
+    op.create_index('ix_products_cost_per_sf', 'products', ['normalized_cost_per_sf'], unique=False)
+    op.create_index('ix_products_type_cost_per_sf', 'products', ['product_type', 'normalized_cost_per_sf'], unique=False)
@@ -0,0 +1,54 @@
+"""price lists
+
+Revision ID: c27d90f4e1b8
+Revises: a84e2b61c5d3
+Create Date: 2026-10-19 11:26:07.553481
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27d90f4e1b8'
+down_revision: Union[str, Sequence[str], None] = 'a84e2b61c5d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('price_lists',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('formula', sa.String(), nullable=False),
+    sa.Column('vendor_id', sa.Integer(), nullable=True),
+    sa.Column('product_type', sa.String(), nullable=True),
+    sa.Column('use_product_formula', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+    sa.Column('generated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_price_lists_id'), 'price_lists', ['id'], unique=False)
+    op.create_table('price_list_items',
+    sa.Column('price_list_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=True),
+    sa.Column('freight', sa.Float(), nullable=True),
+    sa.Column('formula', sa.String(), nullable=False),
+    sa.Column('retail_price', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['price_list_id'], ['price_lists.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('price_list_id', 'product_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('price_list_items')
+    op.drop_index(op.f('ix_price_lists_id'), table_name='price_lists')
+    op.drop_table('price_lists')
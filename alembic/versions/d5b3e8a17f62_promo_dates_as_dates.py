@@ -0,0 +1,91 @@
+"""promo dates as indexed date columns
+
+Revision ID: d5b3e8a17f62
+Revises: c27d90f4e1b8
+Create Date: 2026-10-19 12:41:18.920334
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b3e8a17f62'
+down_revision: Union[str, Sequence[str], None] = 'c27d90f4e1b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%d-%b-%Y", "%Y-%m-%d %H:%M:%S")
+PROMO_COLUMNS = ("start_promo_date", "end_promo_date")
+
+
+def parse_date(value):
+    text = str(value).strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def collect_dates(table: str, pk: str) -> list[dict]:
+    """Promo dates as ISO strings keyed by primary key; unparseable values become NULL."""
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        f"SELECT {pk}, start_promo_date, end_promo_date FROM {table} "
+        f"WHERE start_promo_date IS NOT NULL OR end_promo_date IS NOT NULL"
+    )).all()
+    return [
+        {
+            "pk": row[0],
+            "start": parse_date(row[1]) if row[1] is not None else None,
+            "end": parse_date(row[2]) if row[2] is not None else None,
+        }
+        for row in rows
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    for table, pk in (("products", "id"), ("products_staging", "row_id")):
+        # SQLite's batch copy would CAST(... AS DATE) the text values into integers,
+        # so values are captured first and written back as ISO dates afterwards.
+        saved = collect_dates(table, pk)
+        with op.batch_alter_table(table) as batch_op:
+            for column in PROMO_COLUMNS:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.String(),
+                    type_=sa.Date(),
+                    existing_nullable=True,
+                    postgresql_using="NULL::date",
+                )
+        if saved:
+            conn.execute(
+                sa.text(f"UPDATE {table} SET start_promo_date = :start, end_promo_date = :end WHERE {pk} = :pk"),
+                saved,
+            )
+
+    op.create_index(op.f('ix_products_sku'), 'products', ['sku'], unique=False)
+    op.create_index('ix_products_promo_window', 'products', ['is_promo', 'start_promo_date', 'end_promo_date'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_promo_window', table_name='products')
+    op.drop_index(op.f('ix_products_sku'), table_name='products')
+
+    for table in ("products", "products_staging"):
+        with op.batch_alter_table(table) as batch_op:
+            for column in PROMO_COLUMNS:
+                batch_op.alter_column(
+                    column,
+                    existing_type=sa.Date(),
+                    type_=sa.String(),
+                    existing_nullable=True,
+                )
@@ -0,0 +1,30 @@
+"""catalog analytics indexes
+
+Revision ID: f38a6d0c5b19
+Revises: e91f4c6b2a07
+Create Date: 2026-10-19 16:20:47.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f38a6d0c5b19'
+down_revision: Union[str, Sequence[str], None] = 'e91f4c6b2a07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_products_vendor_price', 'products', ['vendor_id', 'price', 'product_type', 'is_dropped', 'is_promo'], unique=False)
+    op.create_index('ix_products_type_price', 'products', ['product_type', 'price', 'vendor_id', 'is_dropped', 'is_promo'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_type_price', table_name='products')
+    op.drop_index('ix_products_vendor_price', table_name='products')
@@ -0,0 +1,275 @@
+# app/backend/admission.py
+"""
+Admission control so a burst of large imports cannot starve interactive reads.
+
+Requests are classified by route:
+
+* heavy: import, convert, preview, diff, export, chunked-upload finalize and
+  price-list generation (HEAVY_ROUTES);
+* light: everything else (CRUD reads and writes, health checks, debug). Light
+  requests are never queued.
+
+A heavy request needs one of ADMISSION_HEAVY_SLOTS slots and its size in
+ADMISSION_MAX_INFLIGHT_BYTES. The size is the request's Content-Length, or
+the spooled file's size for a chunked-upload finalize. A request that can't
+be admitted yet waits in a FIFO queue of at most ADMISSION_QUEUE_SIZE
+entries, for at most ADMISSION_QUEUE_TIMEOUT seconds. Beyond that the server
+answers fast instead of piling up work:
+
+* 429 when the queue is full;
+* 503 when the wait timed out.
+
+Both carry Retry-After, estimated from recent heavy request durations. A
+rejected body of up to ADMISSION_DRAIN_MAX_BYTES is read and discarded first,
+so a client still uploading can read the answer instead of seeing a reset.
+Larger bodies, and clients that sent `Expect: 100-continue`, get the answer
+at once and the connection is closed. A
+request larger than the whole byte budget is admitted only when no other
+heavy work is running. Admitted heavy responses carry X-Queue-Wait-Ms.
+Counters and wait-time percentiles are at GET /debug/admission.
+
+Limits apply per worker process.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+from collections import deque
+
+from app.backend import upload_store
+
+logger = logging.getLogger("admission")
+
+ADMISSION_HEAVY_SLOTS = int(os.getenv("ADMISSION_HEAVY_SLOTS", str(max(1, (os.cpu_count() or 2) // 2))))
+ADMISSION_MAX_INFLIGHT_BYTES = int(os.getenv("ADMISSION_MAX_INFLIGHT_BYTES", str(256 * 1024 * 1024)))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "16"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+ADMISSION_DRAIN_MAX_BYTES = int(os.getenv("ADMISSION_DRAIN_MAX_BYTES", str(8 * 1024 * 1024)))
+WAIT_SAMPLES = 1000
+
+HEAVY_ROUTES = [
+    ("POST", re.compile(r"^/b2b/(import/csv|preview|convert-to-b2b|convert-batch|diff)/?$")),
+    ("GET", re.compile(r"^/b2b/export/(csv|json)/?$")),
+    ("POST", re.compile(r"^/b2b/uploads/(?P<upload_id>[0-9a-f]{32})/finalize/?$")),
+    ("POST", re.compile(r"^/qfloors/import/?$")),
+    ("GET", re.compile(r"^/qfloors/export/?$")),
+    ("POST", re.compile(r"^/pricelists/\d+/generate/?$")),
+]
+
+
+def heavy_route(scope) -> re.Match | None:
+    for method, pattern in HEAVY_ROUTES:
+        if scope["method"] == method:
+            match = pattern.match(scope["path"])
+            if match:
+                return match
+    return None
+
+
+def header(scope, name: bytes) -> bytes | None:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value
+    return None
+
+
+def request_bytes(scope, match: re.Match) -> int:
+    """Bytes the request will make us hold: its body, or the spooled upload it finalizes."""
+    upload_id = match.groupdict().get("upload_id")
+    if upload_id:
+        try:
+            return upload_store.received(upload_id)
+        except Exception:
+            return 0  # unknown upload: the endpoint answers 404
+    try:
+        return max(0, int(header(scope, b"content-length") or 0))
+    except ValueError:
+        return 0
+
+
+class Rejected(Exception):
+    def __init__(self, status: int, reason: str, retry_after: int):
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Slots plus a byte budget with a bounded FIFO wait queue (event-loop only, no locking)."""
+
+    def __init__(self, slots: int = ADMISSION_HEAVY_SLOTS, max_bytes: int = ADMISSION_MAX_INFLIGHT_BYTES,
+                 queue_size: int = ADMISSION_QUEUE_SIZE, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT):
+        self.slots = slots
+        self.max_bytes = max_bytes
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.inflight_bytes = 0
+        self._waiters: deque = deque()  # (nbytes, future), oldest first
+        self._waits = deque(maxlen=WAIT_SAMPLES)
+        self._avg_duration = 1.0  # seconds, moving average of heavy requests
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    # ---------- public API ----------
+
+    async def acquire(self, nbytes: int) -> float:
+        """Wait for a slot and `nbytes` of budget; returns seconds waited or raises Rejected."""
+        if not self._waiters and self._fits(nbytes):
+            self._admit(nbytes)
+            self._waits.append(0.0)
+            return 0.0
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise Rejected(429, "Too many heavy requests queued", self.retry_after())
+
+        started = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        entry = (nbytes, future)
+        self._waiters.append(entry)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if future.done():  # admitted just as the timeout fired
+                return self._waited(started)
+            self._waiters.remove(entry)
+            self.rejected_timeout += 1
+            self._wake()  # a smaller request behind us may fit now
+            raise Rejected(503, "Timed out waiting for a heavy-request slot", self.retry_after())
+        except BaseException:
+            if future.done():
+                self.release(nbytes, 0.0)
+            else:
+                self._waiters.remove(entry)
+                self._wake()
+            raise
+        return self._waited(started)
+
+    def release(self, nbytes: int, duration: float) -> None:
+        self.active -= 1
+        self.inflight_bytes -= nbytes
+        if duration:
+            self._avg_duration = 0.8 * self._avg_duration + 0.2 * duration
+        self._wake()
+
+    def retry_after(self) -> int:
+        """Seconds until a queued request would likely start: the queue ahead of it, drained per slot."""
+        rounds = (len(self._waiters) + 1) / max(1, self.slots)
+        return max(1, math.ceil(rounds * self._avg_duration))
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+
+        def pct(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "heavy_slots": self.slots,
+            "max_inflight_bytes": self.max_bytes,
+            "queue_size": self.queue_size,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active": self.active,
+            "inflight_bytes": self.inflight_bytes,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_heavy_duration_ms": round(self._avg_duration * 1000, 1),
+            "queue_wait_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+                              "max": round(waits[-1] * 1000, 1) if waits else 0.0},
+        }
+
+    # ---------- internals ----------
+
+    def _fits(self, nbytes: int) -> bool:
+        if self.active >= self.slots:
+            return False
+        # Oversized requests run alone rather than never
+        return self.inflight_bytes + nbytes <= self.max_bytes or self.active == 0
+
+    def _admit(self, nbytes: int) -> None:
+        self.active += 1
+        self.inflight_bytes += nbytes
+        self.admitted += 1
+
+    def _waited(self, started: float) -> float:
+        waited = time.monotonic() - started
+        self._waits.append(waited)
+        return waited
+
+    def _wake(self) -> None:
+        # Strict FIFO: a large request at the head is not overtaken by smaller ones
+        while self._waiters and self._fits(self._waiters[0][0]):
+            nbytes, future = self._waiters.popleft()
+            self._admit(nbytes)
+            future.set_result(None)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware so slots are held until a streamed response body is sent."""
+
+    def __init__(self, app, controller: "AdmissionController | None" = None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope, receive, send):
+        match = heavy_route(scope) if scope["type"] == "http" else None
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+
+        nbytes = request_bytes(scope, match)
+        try:
+            waited = await self.controller.acquire(nbytes)
+        except Rejected as e:
+            logger.warning(f"Rejected {scope['method']} {scope['path']} ({e.status}): {e.reason}")
+            upload_id = match.groupdict().get("upload_id")
+            drain = not upload_id and nbytes <= ADMISSION_DRAIN_MAX_BYTES and header(scope, b"expect") != b"100-continue"
+            if drain:
+                await self._drain(receive)
+            await self._reject(send, e, close=not drain)
+            return
+
+        wait_header = [(b"x-queue-wait-ms", str(round(waited * 1000, 1)).encode())]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *wait_header]}
+            await send(message)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.controller.release(nbytes, time.monotonic() - started)
+
+    @staticmethod
+    async def _drain(receive):
+        while True:
+            message = await receive()
+            if message["type"] != "http.request" or not message.get("more_body"):
+                return
+
+    @staticmethod
+    async def _reject(send, e: Rejected, close: bool):
+        body = json.dumps({"detail": e.reason, "retry_after": e.retry_after}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(e.retry_after).encode()),
+        ]
+        if close:
+            headers.append((b"connection", b"close"))
+        await send({"type": "http.response.start", "status": e.status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+admission = AdmissionController()
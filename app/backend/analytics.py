@@ -0,0 +1,290 @@
+# app/backend/analytics.py
+"""
+Catalog statistics per vendor and per product type: product counts, cost
+min/max/avg/median, and dropped and promo counts.
+
+Aggregates come from SQL over covering indexes, so no product row is read.
+They are kept in one group per (vendor_id, product_type) pair:
+
+* ix_products_vendor_price (vendor_id, price, product_type, is_dropped, is_promo)
+* ix_products_type_price (product_type, price, vendor_id, is_dropped, is_promo)
+
+Vendor and product-type totals are sums of those groups. A median cannot be
+summed that way, so each one is a separate lookup. It reads the middle of the
+group's price range in the index (WHERE vendor_id = ? ORDER BY price, and the
+same for product_type).
+
+Results are cached against a catalog version. Mutation paths call
+`mark_dirty(...)` after their commit with the vendors they touched, and that
+bumps the version. The next read recomputes only those vendors' groups, plus
+the medians of the product types they contain. Clearing the catalog, a change
+picked up from another worker (CACHE_SYNC=db) or a cache older than
+ANALYTICS_MAX_AGE_SECONDS triggers a full recompute.
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.backend import models
+from app.backend.cache import PRODUCTS, cache
+
+logger = logging.getLogger("analytics")
+
+ANALYTICS_MAX_AGE_SECONDS = float(os.getenv("ANALYTICS_MAX_AGE_SECONDS", "600"))
+ANALYTICS_GROUPINGS = ("vendor", "product_type")
+VENDOR_CHUNK_SIZE = 500  # stays under SQLite's bound-parameter limit
+
+
+@dataclass
+class GroupStats:
+    products: int = 0
+    priced: int = 0
+    min_cost: float | None = None
+    max_cost: float | None = None
+    total_cost: float = 0.0
+    dropped: int = 0
+    promo: int = 0
+
+    def add(self, other: "GroupStats") -> None:
+        self.products += other.products
+        self.priced += other.priced
+        self.total_cost += other.total_cost
+        self.dropped += other.dropped
+        self.promo += other.promo
+        if other.min_cost is not None and (self.min_cost is None or other.min_cost < self.min_cost):
+            self.min_cost = other.min_cost
+        if other.max_cost is not None and (self.max_cost is None or other.max_cost > self.max_cost):
+            self.max_cost = other.max_cost
+
+    def to_dict(self) -> dict:
+        return {
+            "products": self.products,
+            "priced": self.priced,
+            "min_cost": self.min_cost,
+            "max_cost": self.max_cost,
+            "avg_cost": round(self.total_cost / self.priced, 4) if self.priced else None,
+            "dropped": self.dropped,
+            "promo": self.promo,
+        }
+
+
+def group_stats_query(vendor_ids: list | None = None):
+    """Aggregates per (vendor_id, product_type), optionally for some vendors only (None = unassigned)."""
+    p = models.Product
+    stmt = select(
+        p.vendor_id,
+        p.product_type,
+        func.count(),
+        func.count(p.price),
+        func.min(p.price),
+        func.max(p.price),
+        func.coalesce(func.sum(p.price), 0.0),
+        func.sum(case((p.is_dropped, 1), else_=0)),
+        func.sum(case((p.is_promo, 1), else_=0)),
+    ).group_by(p.vendor_id, p.product_type)
+    if vendor_ids is not None:
+        ids = [v for v in vendor_ids if v is not None]
+        cond = p.vendor_id.in_(ids)
+        if len(ids) < len(vendor_ids):
+            cond = or_(cond, p.vendor_id.is_(None))
+        stmt = stmt.where(cond)
+    return stmt
+
+
+def median_cost(db: Session, column, value, priced: int) -> float | None:
+    """Median price where `column` equals `value`, read from the middle of the (column, price) index."""
+    if not priced:
+        return None
+    p = models.Product
+    stmt = (
+        select(p.price)
+        .where(column.is_(None) if value is None else column == value, p.price.isnot(None))
+        .order_by(p.price)
+        .offset((priced - 1) // 2)
+        .limit(2 - priced % 2)
+    )
+    prices = db.scalars(stmt).all()
+    return round(sum(prices) / len(prices), 4) if prices else None
+
+
+def rollup(groups: dict[tuple, GroupStats], index: int) -> dict:
+    """Sum the (vendor_id, product_type) groups by one half of the key."""
+    rolled: dict = {}
+    for key, stats in groups.items():
+        rolled.setdefault(key[index], GroupStats()).add(stats)
+    return rolled
+
+
+def totals(groups: Iterable[GroupStats]) -> GroupStats:
+    total = GroupStats()
+    for stats in groups:
+        total.add(stats)
+    return total
+
+
+def chunks(items: list, size: int = VENDOR_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class CatalogAnalytics:
+    def __init__(self, max_age: float = ANALYTICS_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._state_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()  # one recompute at a time; other readers wait for it
+
+        # Catalog version and what changed since the cached results were computed
+        self.version = 0
+        self._dirty_all = True
+        self._dirty_vendor_ids: set = set()
+        self._dirty_vendor_names: set[str] = set()
+
+        # Cached results
+        self._groups: dict[tuple, GroupStats] = {}
+        self._vendor_medians: dict = {}
+        self._type_medians: dict = {}
+        self._computed_version = -1
+        self._computed_at: datetime | None = None
+        self._computed_monotonic = 0.0
+        self.refreshes = {"cached": 0, "incremental": 0, "full": 0}
+
+    # ---------- invalidation ----------
+
+    def mark_dirty(self, vendor_ids: Iterable = (), vendor_names: Iterable[str] = ()) -> None:
+        """Call after a commit that changed these vendors' products."""
+        with self._state_lock:
+            self._dirty_vendor_ids.update(vendor_ids)
+            self._dirty_vendor_names.update(vendor_names)
+            self.version += 1
+
+    def mark_all_dirty(self, *_) -> None:
+        """Call after a change of unknown scope (e.g. the whole catalog cleared)."""
+        with self._state_lock:
+            self._dirty_all = True
+            self.version += 1
+
+    # ---------- reads ----------
+
+    def report(self, db: Session, group_by: str | None = None) -> dict:
+        cache.poll()
+        with self._refresh_lock:
+            started = time.perf_counter()
+            mode = self._refresh(db)
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            groups = dict(self._groups)
+            vendor_medians = dict(self._vendor_medians)
+            type_medians = dict(self._type_medians)
+            version, computed_at = self._computed_version, self._computed_at
+
+        result = {
+            "catalog_version": version,
+            "computed_at": computed_at.isoformat(timespec="seconds"),
+            "refresh": {"mode": mode, "ms": elapsed_ms},
+            "totals": totals(groups.values()).to_dict(),
+        }
+        if group_by in (None, "vendor"):
+            names = dict(db.execute(select(models.Vendor.id, models.Vendor.name)).all())
+            rows = [
+                {"vendor_id": vendor_id, "vendor": names.get(vendor_id), **stats.to_dict(),
+                 "median_cost": vendor_medians.get(vendor_id)}
+                for vendor_id, stats in rollup(groups, 0).items()
+            ]
+            result["by_vendor"] = sorted(rows, key=lambda r: ((r["vendor"] or "").casefold(), r["vendor_id"] or 0))
+        if group_by in (None, "product_type"):
+            rows = [
+                {"product_type": product_type, **stats.to_dict(), "median_cost": type_medians.get(product_type)}
+                for product_type, stats in rollup(groups, 1).items()
+            ]
+            result["by_product_type"] = sorted(rows, key=lambda r: (r["product_type"] or "").casefold())
+        return result
+
+    def stats(self) -> dict:
+        with self._state_lock:
+            return {
+                "catalog_version": self.version,
+                "computed_version": self._computed_version,
+                "groups": len(self._groups),
+                "refreshes": dict(self.refreshes),
+            }
+
+    # ---------- refresh ----------
+
+    def _refresh(self, db: Session) -> str:
+        with self._state_lock:
+            expired = time.monotonic() - self._computed_monotonic > self.max_age
+            if self._computed_version == self.version and not expired:
+                self.refreshes["cached"] += 1
+                return "cached"
+            full = self._dirty_all or expired
+            vendor_ids, vendor_names = set(self._dirty_vendor_ids), set(self._dirty_vendor_names)
+            target_version = self.version
+            self._dirty_all = False
+            self._dirty_vendor_ids.clear()
+            self._dirty_vendor_names.clear()
+
+        try:
+            if full:
+                self._recompute_all(db)
+            else:
+                if vendor_names:
+                    for names in chunks(sorted(vendor_names)):
+                        vendor_ids.update(db.scalars(select(models.Vendor.id).where(models.Vendor.name.in_(names))))
+                self._recompute_vendors(db, vendor_ids)
+        except Exception:
+            self.mark_all_dirty()  # cached results are now partial; start over next time
+            raise
+
+        mode = "full" if full else "incremental"
+        with self._state_lock:
+            self._computed_version = target_version
+            self._computed_at = datetime.now()
+            self._computed_monotonic = time.monotonic()
+            self.refreshes[mode] += 1
+        logger.info(f"Catalog analytics {mode} refresh to version {target_version}")
+        return mode
+
+    def _recompute_all(self, db: Session) -> None:
+        self._groups = {row[:2]: GroupStats(*row[2:]) for row in db.execute(group_stats_query())}
+        self._vendor_medians = self._medians(db, models.Product.vendor_id, rollup(self._groups, 0))
+        self._type_medians = self._medians(db, models.Product.product_type, rollup(self._groups, 1))
+
+    def _recompute_vendors(self, db: Session, vendor_ids: set) -> None:
+        if not vendor_ids:
+            return
+        product_types = set()
+        for key in [k for k in self._groups if k[0] in vendor_ids]:
+            product_types.add(key[1])
+            del self._groups[key]
+        for ids in chunks(list(vendor_ids)):
+            for row in db.execute(group_stats_query(ids)):
+                self._groups[row[:2]] = GroupStats(*row[2:])
+                product_types.add(row[1])
+
+        by_vendor = rollup(self._groups, 0)
+        by_type = rollup(self._groups, 1)
+        for vendor_id in vendor_ids:
+            self._vendor_medians.pop(vendor_id, None)
+        for product_type in product_types:
+            self._type_medians.pop(product_type, None)
+        self._vendor_medians.update(self._medians(
+            db, models.Product.vendor_id, {v: by_vendor[v] for v in vendor_ids if v in by_vendor}))
+        self._type_medians.update(self._medians(
+            db, models.Product.product_type, {t: by_type[t] for t in product_types if t in by_type}))
+
+    @staticmethod
+    def _medians(db: Session, column, groups: dict) -> dict:
+        return {value: median_cost(db, column, value, stats.priced) for value, stats in groups.items()}
+
+
+analytics = CatalogAnalytics()
+
+# Another worker changed products: we don't know which vendors, so recompute everything
+cache.on_remote_invalidate(lambda namespace: namespace == PRODUCTS and analytics.mark_all_dirty())
@@ -0,0 +1,214 @@
+# app/backend/cache.py
+"""
+In-process read-through cache for hot lookups (vendor list, small product
+lookups).
+
+Entries live per namespace with a TTL (CACHE_TTL_SECONDS) and a size cap
+(CACHE_MAX_ENTRIES per namespace, least recently used evicted first). Every
+mutation path calls `cache.invalidate(...)` after its commit. A loader that
+raced with an invalidation does not store its result, because the namespace
+generation it started under is gone.
+
+With CACHE_SYNC=db, invalidations are also published to other workers.
+`invalidate` bumps the namespace's row in `cache_generations` (through the
+single writer). Each worker polls that table at most every
+CACHE_SYNC_INTERVAL seconds and drops a namespace whose generation moved.
+Without it, other workers fall back to the TTL.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.backend import database, models
+
+logger = logging.getLogger("cache")
+
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+CACHE_SYNC = os.getenv("CACHE_SYNC", "").lower() == "db"
+CACHE_SYNC_INTERVAL = float(os.getenv("CACHE_SYNC_INTERVAL", "1.0"))
+
+VENDORS = "vendors"
+PRODUCTS = "products"
+
+
+class _Namespace:
+    def __init__(self):
+        self.entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+        }
+
+
+def bump_generations(db: Session, namespaces: tuple[str, ...]) -> None:
+    """Writer job: advance the shared generation of each namespace."""
+    for ns in namespaces:
+        updated = db.execute(
+            update(models.CacheGeneration)
+            .where(models.CacheGeneration.namespace == ns)
+            .values(generation=models.CacheGeneration.generation + 1)
+        ).rowcount
+        if not updated:
+            db.add(models.CacheGeneration(namespace=ns, generation=1))
+            db.flush()
+
+
+class ReadCache:
+    def __init__(
+        self,
+        ttl: float = CACHE_TTL_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        sync: bool = CACHE_SYNC,
+        sync_interval: float = CACHE_SYNC_INTERVAL,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.sync = sync
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._namespaces: dict[str, _Namespace] = {}
+        self._remote: dict[str, int] | None = None  # generations seen at the last poll
+        self._next_sync = 0.0
+        self._remote_listeners: list[Callable[[str], None]] = []
+        self.remote_invalidations = 0
+
+    # ---------- public API ----------
+
+    def get_or_load(self, namespace: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Cached value for `key`, or `loader()` stored under it. Callers must not mutate the result."""
+        if self.sync:
+            self._poll_remote()
+
+        now = time.monotonic()
+        with self._lock:
+            ns = self._ns(namespace)
+            entry = ns.entries.get(key)
+            if entry is not None and entry[0] > now:
+                ns.entries.move_to_end(key)
+                ns.hits += 1
+                return entry[1]
+            ns.misses += 1
+            generation = ns.generation
+
+        value = loader()
+
+        with self._lock:
+            if ns.generation == generation:
+                ns.entries[key] = (time.monotonic() + self.ttl, value)
+                ns.entries.move_to_end(key)
+                while len(ns.entries) > self.max_entries:
+                    ns.entries.popitem(last=False)
+                    ns.evictions += 1
+        return value
+
+    def invalidate(self, *namespaces: str) -> None:
+        """Drop cached reads after a commit; also tells other workers when CACHE_SYNC=db."""
+        with self._lock:
+            for name in namespaces:
+                self._clear(self._ns(name))
+
+        if self.sync and namespaces:
+            from app.backend.writer import coordinator  # writer imports database; avoid a cycle at import
+
+            coordinator.submit(bump_generations, tuple(namespaces)).add_done_callback(_log_bump_failure)
+
+    def poll(self) -> None:
+        """Pick up other workers' invalidations now (no-op without CACHE_SYNC=db)."""
+        if self.sync:
+            self._poll_remote()
+
+    def on_remote_invalidate(self, listener: Callable[[str], None]) -> None:
+        """Call `listener(namespace)` when another worker's invalidation is picked up."""
+        self._remote_listeners.append(listener)
+
+    def clear(self) -> None:
+        with self._lock:
+            for ns in self._namespaces.values():
+                self._clear(ns)
+
+    def stats(self) -> dict:
+        with self._lock:
+            namespaces = {name: ns.stats() for name, ns in sorted(self._namespaces.items())}
+        hits = sum(n["hits"] for n in namespaces.values())
+        lookups = hits + sum(n["misses"] for n in namespaces.values())
+        return {
+            "ttl_seconds": self.ttl,
+            "max_entries": self.max_entries,
+            "cross_worker_sync": self.sync,
+            "remote_invalidations": self.remote_invalidations,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "namespaces": namespaces,
+        }
+
+    # ---------- internals ----------
+
+    def _ns(self, name: str) -> _Namespace:
+        ns = self._namespaces.get(name)
+        if ns is None:
+            ns = self._namespaces[name] = _Namespace()
+        return ns
+
+    @staticmethod
+    def _clear(ns: _Namespace) -> None:
+        ns.entries.clear()
+        ns.generation += 1
+        ns.invalidations += 1
+
+    def _poll_remote(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_sync:
+                return
+            self._next_sync = now + self.sync_interval
+
+        try:
+            with database.engine.connect() as conn:
+                rows = conn.execute(select(models.CacheGeneration.namespace, models.CacheGeneration.generation)).all()
+        except SQLAlchemyError as e:
+            logger.warning(f"Cache sync disabled, cannot read cache_generations: {e.__class__.__name__}")
+            self.sync = False
+            return
+
+        changed = []
+        with self._lock:
+            previous, self._remote = self._remote, dict(rows)
+            if previous is None:
+                return  # first poll only establishes the baseline
+            for name, generation in self._remote.items():
+                if previous.get(name, 0) != generation:
+                    self._clear(self._ns(name))
+                    self.remote_invalidations += 1
+                    changed.append(name)
+
+        for name in changed:
+            for listener in self._remote_listeners:
+                listener(name)
+
+
+def _log_bump_failure(future) -> None:
+    if future.exception() is not None:
+        logger.warning(f"Cache generation bump failed: {future.exception()}")
+
+
+cache = ReadCache()
@@ -0,0 +1,242 @@
+# app/backend/catalog_diff.py
+"""
+Streaming diff of two vendor price lists, joined on SKU.
+
+The old list is loaded into a hash table, then the new list is streamed
+against it. A new row is `added` (SKU not in the old list) or `changed`
+(different price); old rows never matched are `removed` at the end.
+Repeated SKUs count once (first occurrence wins) and rows without a SKU are
+skipped.
+
+Memory is bounded by DIFF_MEMORY_ROWS table entries. When the table outgrows
+it, the join becomes a partitioned (grace) hash join. The table and the rest
+of both inputs are hashed by key into DIFF_PARTITIONS temporary files. Each
+partition is then joined on its own and the files are deleted when the
+stream ends.
+"""
+
+import csv
+import logging
+import os
+import tempfile
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+logger = logging.getLogger("b2b_import_export")
+
+DIFF_MEMORY_ROWS = int(os.getenv("DIFF_MEMORY_ROWS", "250000"))
+DIFF_PARTITIONS = 64
+
+DIFF_HEADERS = [
+    "Change", "SKU", "Manufacturer", "Style", "Color", "Product Type", "Pricing Unit",
+    "Old Price", "New Price", "Delta", "Delta %",
+]
+
+# Table markers for keys already settled while streaming the new list
+MATCHED = "matched"
+ADDED = "added"
+
+
+@dataclass(frozen=True)
+class DiffRow:
+    sku: str
+    manufacturer: str
+    style: str
+    color: str
+    product_type: str
+    pricing_unit: str
+    price: float | None
+
+    @property
+    def key(self) -> str:
+        return self.sku.strip().casefold()
+
+    def to_cells(self) -> list:
+        return [self.sku, self.manufacturer, self.style, self.color, self.product_type,
+                self.pricing_unit, "" if self.price is None else repr(self.price)]
+
+    @classmethod
+    def from_cells(cls, cells: list[str]) -> "DiffRow":
+        *text, price = cells
+        return cls(*text, price=float(price) if price else None)
+
+
+@dataclass
+class DiffStats:
+    old_rows: int = 0
+    new_rows: int = 0
+    added: int = 0
+    removed: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    skipped: int = 0
+    spilled: bool = False
+
+
+class CatalogDiff:
+    def __init__(self, min_change_pct: float = 0.0, include_unchanged: bool = False,
+                 memory_rows: int = DIFF_MEMORY_ROWS, partitions: int = DIFF_PARTITIONS):
+        self.min_change_pct = min_change_pct
+        self.include_unchanged = include_unchanged
+        self.memory_rows = memory_rows
+        self.partitions = partitions
+        self.stats = DiffStats()
+
+    # ---------- public API ----------
+
+    def records(self, old_rows: Iterable[DiffRow], new_rows: Iterable[DiffRow]) -> Iterator[dict]:
+        """Diff records (DIFF_HEADERS keys) in new-file order, removed rows last."""
+        table: dict[str, DiffRow | str] = {}
+
+        old_iter = self._keyed(old_rows, "old_rows")
+        for row in old_iter:
+            if row.key in table:
+                self.stats.duplicates += 1
+                continue
+            table[row.key] = row
+            if len(table) > self.memory_rows:
+                yield from self._spill(table, old_iter, self._keyed(new_rows, "new_rows"))
+                return
+
+        new_iter = self._keyed(new_rows, "new_rows")
+        for row in new_iter:
+            record = self._match(table, row)
+            if record is not None:
+                yield record
+            if len(table) > self.memory_rows:
+                # Added keys grow the table too; finish the rest on disk
+                yield from self._spill(table, iter(()), new_iter)
+                return
+
+        yield from self._removed(table)
+
+    # ---------- join ----------
+
+    def _keyed(self, rows: Iterable[DiffRow], counter: str) -> Iterator[DiffRow]:
+        for row in rows:
+            setattr(self.stats, counter, getattr(self.stats, counter) + 1)
+            if not row.key:
+                self.stats.skipped += 1
+                continue
+            yield row
+
+    def _match(self, table: dict, row: DiffRow) -> dict | None:
+        prev = table.get(row.key)
+        if prev is None:
+            table[row.key] = ADDED
+            self.stats.added += 1
+            return change_record("added", row, None, row)
+        if isinstance(prev, str):  # MATCHED / ADDED: repeated SKU in the new list
+            self.stats.duplicates += 1
+            return None
+
+        table[row.key] = MATCHED
+        if prev.price == row.price:
+            self.stats.unchanged += 1
+            return change_record("unchanged", row, prev, row) if self.include_unchanged else None
+
+        record = change_record("changed", row, prev, row)
+        pct = record["Delta %"]
+        if self.min_change_pct and pct != "" and abs(pct) < self.min_change_pct:
+            self.stats.unchanged += 1
+            return None
+        self.stats.changed += 1
+        return record
+
+    def _removed(self, table: dict) -> Iterator[dict]:
+        for prev in table.values():
+            if not isinstance(prev, str):
+                self.stats.removed += 1
+                yield change_record("removed", prev, prev, None)
+
+    # ---------- spill to disk ----------
+
+    def _spill(self, table: dict, old_rest: Iterator[DiffRow], new_rest: Iterator[DiffRow]) -> Iterator[dict]:
+        self.stats.spilled = True
+        logger.info(f"Diff table over {self.memory_rows} rows; partitioning to disk")
+
+        with tempfile.TemporaryDirectory(prefix="b2b-diff-") as tmp:
+            state_paths = [os.path.join(tmp, f"state-{i}.csv") for i in range(self.partitions)]
+            new_paths = [os.path.join(tmp, f"new-{i}.csv") for i in range(self.partitions)]
+
+            # Table entries (old rows and settled keys) plus the unread old rows
+            with PartitionWriter(state_paths) as out:
+                for key, value in table.items():
+                    if isinstance(value, str):
+                        out.write(key, [value, key])
+                    else:
+                        out.write(key, ["old", *value.to_cells()])
+                table.clear()
+                for row in old_rest:
+                    out.write(row.key, ["old", *row.to_cells()])
+
+            with PartitionWriter(new_paths) as out:
+                for row in new_rest:
+                    out.write(row.key, row.to_cells())
+
+            for state_path, new_path in zip(state_paths, new_paths):
+                part: dict[str, DiffRow | str] = {}
+                for cells in read_partition(state_path):
+                    if cells[0] == "old":
+                        row = DiffRow.from_cells(cells[1:])
+                        if row.key in part:
+                            self.stats.duplicates += 1
+                        else:
+                            part[row.key] = row
+                    else:
+                        part[cells[1]] = cells[0]
+
+                for cells in read_partition(new_path):
+                    record = self._match(part, DiffRow.from_cells(cells))
+                    if record is not None:
+                        yield record
+
+                yield from self._removed(part)
+
+
+class PartitionWriter:
+    """Appends CSV rows to one of N files chosen by a stable hash of the key."""
+
+    def __init__(self, paths: list[str]):
+        self.files = [open(p, "w", newline="", encoding="utf-8") for p in paths]
+        self.writers = [csv.writer(f) for f in self.files]
+
+    def write(self, key: str, cells: list) -> None:
+        self.writers[zlib.crc32(key.encode("utf-8")) % len(self.writers)].writerow(cells)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for f in self.files:
+            f.close()
+
+
+def read_partition(path: str) -> Iterator[list[str]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.reader(f)
+
+
+def change_record(change: str, row: DiffRow, old: DiffRow | None, new: DiffRow | None) -> dict:
+    old_price = old.price if old else None
+    new_price = new.price if new else None
+    delta = pct = ""
+    if old_price is not None and new_price is not None:
+        delta = round(new_price - old_price, 4)
+        if old_price:
+            pct = round((new_price - old_price) / old_price * 100, 2)
+    return {
+        "Change": change,
+        "SKU": row.sku,
+        "Manufacturer": row.manufacturer,
+        "Style": row.style,
+        "Color": row.color,
+        "Product Type": row.product_type,
+        "Pricing Unit": row.pricing_unit,
+        "Old Price": "" if old_price is None else old_price,
+        "New Price": "" if new_price is None else new_price,
+        "Delta": delta,
+        "Delta %": pct,
+    }
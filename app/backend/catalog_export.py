@@ -0,0 +1,70 @@
+# app/backend/catalog_export.py
+"""
+Constant-memory catalog exports.
+
+Products joined to their vendor are read through a server-side cursor
+(`stream_results` + `yield_per`) and written out as CSV text in small chunks,
+so a full-catalog export never holds more than one batch of rows.
+"""
+
+import csv
+import io
+from typing import Callable, Iterable, Iterator, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.backend import models
+
+EXPORT_BATCH_SIZE = 1000
+CSV_FLUSH_BYTES = 64 * 1024
+
+
+def catalog_query(vendors: Sequence[str] | None = None, product_types: Sequence[str] | None = None):
+    """Products with their vendor name as `vendor_name`, optionally filtered."""
+    product_cols = [c for c in models.Product.__table__.columns]
+    stmt = (
+        select(models.Vendor.name.label("vendor_name"), *product_cols)
+        .select_from(models.Product)
+        .outerjoin(models.Vendor, models.Product.vendor_id == models.Vendor.id)
+        .order_by(models.Product.id)
+    )
+    if vendors:
+        stmt = stmt.where(models.Vendor.name.in_(vendors))
+    if product_types:
+        stmt = stmt.where(models.Product.product_type.in_([t.upper() for t in product_types]))
+    return stmt
+
+
+def iter_catalog(db: Session, stmt, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Row]:
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        yield from result
+    finally:
+        result.close()
+
+
+def stream_csv(headers: list[str], rows: Iterable[Row], to_record: Callable[[Row], dict]) -> Iterator[str]:
+    """Render rows as CSV, yielding roughly CSV_FLUSH_BYTES of text at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=headers)
+    writer.writeheader()
+
+    for row in rows:
+        writer.writerow(to_record(row))
+        if buffer.tell() >= CSV_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def blank(v):
+    return "" if v is None else v
+
+
+def flag(v) -> int:
+    return 1 if v else 0
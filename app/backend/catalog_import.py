@@ -0,0 +1,89 @@
+# app/backend/catalog_import.py
+"""
+Write side of the vendor imports.
+
+Routers parse and convert the uploaded file themselves, producing
+(vendor_name, product_fields) pairs; the database work below runs on the
+single writer (see writer.py) so concurrent uploads queue instead of fighting
+over SQLite's write lock.
+"""
+
+from typing import Dict, Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.backend import models, staging
+from app.backend.analytics import analytics
+from app.backend.cache import PRODUCTS, VENDORS, cache
+from app.backend.dedupe import Deduplicator
+from app.backend.lookup import product_lookup
+from app.backend.snapshot import catalog_snapshot
+from app.backend.unit_cost import with_cost_per_sf
+from app.backend.writer import coordinator
+
+IMPORT_MODES = ("append", "replace")
+INSERT_CHUNK_SIZE = 5000
+
+
+def import_deduplicator(policy: str, key_fields: list[str]) -> Deduplicator:
+    """Deduplicator over (vendor_name, product_fields) import rows."""
+    def key_of(row):
+        vendor_name, fields = row
+        return [vendor_name if f == "manufacturer" else fields.get(f) for f in key_fields]
+
+    return Deduplicator(policy, key_of=key_of, cost_of=lambda row: row[1].get("price"))
+
+
+def resolve_vendor_id(db: Session, vendor_name: str, vendor_ids: Dict[str, int], created: list[int] | None = None) -> int:
+    """Look up (or create) a vendor once per import instead of once per row."""
+    if vendor_name not in vendor_ids:
+        vendor = db.query(models.Vendor).filter_by(name=vendor_name).first()
+        if not vendor:
+            vendor = models.Vendor(name=vendor_name)
+            db.add(vendor)
+            db.flush()
+            if created is not None:
+                created.append(vendor.id)
+        vendor_ids[vendor_name] = vendor.id
+    return vendor_ids[vendor_name]
+
+
+def with_vendor_ids(db: Session, rows: Iterable[tuple[str, dict]], created: list[int] | None = None) -> Iterable[dict]:
+    vendor_ids: Dict[str, int] = {}
+    for vendor_name, fields in rows:
+        yield with_cost_per_sf(dict(fields, vendor_id=resolve_vendor_id(db, vendor_name, vendor_ids, created)))
+
+
+def append_products(db: Session, rows: list[tuple[str, dict]]) -> dict:
+    """Writer job: bulk insert the rows (no commit, the writer commits)."""
+    chunk, count = [], 0
+    for fields in with_vendor_ids(db, rows):
+        chunk.append({**staging.PRODUCT_DEFAULTS, **fields})
+        if len(chunk) >= INSERT_CHUNK_SIZE:
+            db.execute(insert(models.Product), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(models.Product), chunk)
+        count += len(chunk)
+    return {"imported": count}
+
+
+def replace_products(db: Session, rows: list[tuple[str, dict]]) -> dict:
+    """Exclusive writer job: stage, validate and swap per-vendor catalogs."""
+    created: list[int] = []  # vendors new to this import, dropped again if it is rejected
+    return staging.replace_vendor_catalogs(db, with_vendor_ids(db, rows, created), created)
+
+
+async def write_products(rows: list[tuple[str, dict]], mode: str) -> dict:
+    try:
+        if mode == "replace":
+            return await coordinator.run(replace_products, rows, exclusive=True)
+        return await coordinator.run(append_products, rows)
+    finally:
+        # Imports create vendors as well as products
+        cache.invalidate(VENDORS, PRODUCTS)
+        analytics.mark_dirty(vendor_names={vendor_name for vendor_name, _ in rows})
+        catalog_snapshot.mark_stale()
+        product_lookup.mark_stale()
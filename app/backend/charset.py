@@ -0,0 +1,86 @@
+# app/backend/charset.py
+"""
+Text encoding detection for vendor uploads.
+
+The encoding is chosen from a bounded prefix (ENCODING_PREFIX_BYTES) and the
+file is then decoded exactly once:
+
+1. A BOM decides: UTF-8 (utf-8-sig) or UTF-16 (either byte order).
+2. Without a BOM, NUL bytes concentrated on odd or even positions mean
+   UTF-16 LE or BE. Windows tools often export that way.
+3. A prefix that is valid UTF-8 means UTF-8 (plain ASCII included).
+4. Otherwise it is a single-byte Windows export: cp1252 when bytes
+   0x80-0x9F are used as cp1252 punctuation, else latin-1.
+
+A byte sequence later in the file that is invalid in the chosen encoding
+is decoded as cp1252 (latin-1 where cp1252 has a hole) instead of failing.
+The whole file never has to be decoded a second time.
+"""
+
+import codecs
+
+ENCODING_PREFIX_BYTES = 64 * 1024
+UTF16_SAMPLE_BYTES = 4096
+
+FALLBACK_ERRORS = "cp1252-fallback"
+
+# Bytes with no cp1252 mapping; their presence means latin-1
+CP1252_UNDEFINED = frozenset(b"\x81\x8d\x8f\x90\x9d")
+C1_RANGE = range(0x80, 0xA0)
+
+
+def _byte_fallback(b: int) -> str:
+    return bytes([b]).decode("latin-1" if b in CP1252_UNDEFINED else "cp1252")
+
+
+def _cp1252_fallback(error: UnicodeDecodeError):
+    bad = error.object[error.start:error.end]
+    return "".join(_byte_fallback(b) for b in bad), error.end
+
+
+codecs.register_error(FALLBACK_ERRORS, _cp1252_fallback)
+
+
+def detect_encoding(prefix: bytes) -> str:
+    """Codec name for a file starting with `prefix` (only the first ENCODING_PREFIX_BYTES are examined)."""
+    prefix = prefix[:ENCODING_PREFIX_BYTES]
+
+    # 1️⃣ Byte order marks
+    if prefix.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if prefix.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    # 2️⃣ BOM-less UTF-16: mostly-ASCII text has a NUL in every other byte
+    sample = prefix[:UTF16_SAMPLE_BYTES]
+    pairs = len(sample) // 2
+    if pairs:
+        even_nuls = sample[0::2].count(0)
+        odd_nuls = sample[1::2].count(0)
+        if odd_nuls > pairs * 0.3 and even_nuls < pairs * 0.05:
+            return "utf-16-le"
+        if even_nuls > pairs * 0.3 and odd_nuls < pairs * 0.05:
+            return "utf-16-be"
+
+    # 3️⃣ UTF-8 (a multi-byte sequence cut off at the end of the prefix is fine)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    # 4️⃣ Single-byte Windows encodings
+    used = set(prefix)
+    if used & CP1252_UNDEFINED or not used.intersection(C1_RANGE):
+        return "latin-1"
+    return "cp1252"
+
+
+def incremental_decoder(encoding: str) -> codecs.IncrementalDecoder:
+    return codecs.getincrementaldecoder(encoding)(errors=FALLBACK_ERRORS)
+
+
+def decode(contents: bytes, encoding: str | None = None) -> tuple[str, str]:
+    """Decode a whole file once. Returns (text, encoding)."""
+    encoding = encoding or detect_encoding(contents)
+    return contents.decode(encoding, errors=FALLBACK_ERRORS), encoding
@@ -0,0 +1,223 @@
+# app/backend/compression.py
+"""
+Compressed price-list transfer.
+
+Input: gzip (.csv.gz) and zstd (.csv.zst) uploads are recognized by their
+magic bytes, whatever the file is called. zstd needs the optional
+`zstandard` package. Every price-list endpoint accepts them: convert, preview,
+batch convert, diff, the B2B and QFloors imports, and chunked uploads. The
+data is inflated block by block with an incremental decompressor:
+
+* whole-file endpoints read the spooled upload DECOMPRESS_BLOCK bytes at a
+  time (`read_upload`), so the compressed copy is never held in memory;
+* chunked uploads inflate each chunk as it is parsed (`Decompressor`), so
+  the pipelined parser keeps working on plain bytes.
+
+Inflated size is capped at MAX_DECOMPRESSED_BYTES (413). A small upload
+cannot expand into gigabytes.
+
+Output: CSV downloads (convert, chunked-upload finalize, diff and the B2B
+and QFloors exports) can be gzipped on the fly:
+
+* `compress=gzip` sends a .csv.gz file (application/gzip) to keep as is;
+* otherwise, a client sending `Accept-Encoding: gzip` gets the CSV with
+  `Content-Encoding: gzip`, which browsers and HTTP libraries undo for it;
+* `compress=none` always sends plain CSV.
+"""
+
+import os
+import tempfile
+import zlib
+from typing import Iterable, Iterator
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+
+from app.backend import profiling, upload_store
+
+DECOMPRESS_BLOCK = 64 * 1024
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024  # inflated uploads past this go to a temporary file
+MAX_DECOMPRESSED_BYTES = int(os.getenv("MAX_DECOMPRESSED_BYTES", str(2 * upload_store.UPLOAD_MAX_BYTES)))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+COMPRESSED_SUFFIXES = (".gz", ".gzip", ".zst", ".zstd")
+
+COMPRESS_OPTIONS = ("gzip", "none")
+
+
+# ---------- input ----------
+
+def detect(head: bytes) -> str | None:
+    """"gzip", "zstd" or None (plain) from a file's first 4 bytes."""
+    if head.startswith(GZIP_MAGIC):
+        return "gzip"
+    if head.startswith(ZSTD_MAGIC):
+        return "zstd"
+    return None
+
+
+def plain_name(filename: str | None) -> str | None:
+    """`list.csv.gz` -> `list.csv`, so extension checks see the inner file."""
+    if filename and filename.lower().endswith(COMPRESSED_SUFFIXES):
+        return filename.rsplit(".", 1)[0]
+    return filename
+
+
+def _zstd_decompressobj():
+    try:
+        import zstandard
+    except ImportError:
+        raise HTTPException(status_code=400, detail="zstd uploads require the zstandard package; send gzip instead")
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+class Decompressor:
+    """Incremental gzip or zstd decoder; concatenated members/frames are read as one stream."""
+
+    def __init__(self, method: str, max_bytes: int = MAX_DECOMPRESSED_BYTES):
+        self.method = method
+        self.max_bytes = max_bytes
+        self.total = 0
+        self._obj = self._new()
+        self._started = False  # bytes fed to the current member
+
+    def _new(self):
+        if self.method == "gzip":
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return _zstd_decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        out = []
+        while data:
+            if not self._started:
+                data = data.lstrip(b"\x00")  # zero padding after the last member, as gzip(1) allows
+                if not data:
+                    break
+            try:
+                chunk = self._obj.decompress(data)
+            except Exception as e:  # zlib.error / zstandard.ZstdError
+                raise HTTPException(status_code=400, detail=f"Corrupt {self.method} data: {e}")
+            self._started = True
+            self.total += len(chunk)
+            if self.total > self.max_bytes:
+                raise HTTPException(status_code=413, detail=f"Decompressed upload exceeds {self.max_bytes} bytes")
+            out.append(chunk)
+            data = b""
+            if getattr(self._obj, "eof", False):
+                data = self._obj.unused_data
+                self._obj, self._started = self._new(), False
+        return b"".join(out)
+
+    def finish(self) -> None:
+        """Call after the last block: a member cut short means a truncated upload."""
+        if self._started and hasattr(self._obj, "eof"):
+            raise HTTPException(status_code=400, detail=f"Truncated {self.method} data")
+
+
+def decompress_file(fileobj, head: bytes, method: str) -> bytes:
+    """Inflate `head` plus the rest of `fileobj`, one DECOMPRESS_BLOCK at a time."""
+    decompressor = Decompressor(method)
+    out = [decompressor.decompress(head)]
+    while block := fileobj.read(DECOMPRESS_BLOCK):
+        out.append(decompressor.decompress(block))
+    decompressor.finish()
+    return b"".join(out)
+
+
+def decompress(data: bytes) -> bytes:
+    """`data` inflated if it is gzip or zstd, else unchanged."""
+    method = detect(data[:4])
+    if method is None:
+        return data
+    decompressor = Decompressor(method)
+    view = memoryview(data)
+    out = [decompressor.decompress(bytes(view[i:i + DECOMPRESS_BLOCK])) for i in range(0, len(data), DECOMPRESS_BLOCK)]
+    decompressor.finish()
+    return b"".join(out)
+
+
+async def read_upload(file: UploadFile) -> bytes:
+    """The upload's bytes, inflated off the event loop when it is gzip or zstd."""
+    head = await file.read(4)
+    method = detect(head)
+    if method is None:
+        return head + await file.read()
+    return await profiling.to_thread(decompress_file, file.file, head, method)
+
+
+def spool_file(fileobj):
+    """
+    `fileobj` rewound when it is plain, else a temporary file holding the
+    inflated data (in memory up to SPOOL_MEMORY_BYTES). For readers that
+    stream the file (build_stream_reader) instead of taking its bytes.
+    """
+    head = fileobj.read(4)
+    method = detect(head)
+    fileobj.seek(0)
+    if method is None:
+        return fileobj
+    decompressor = Decompressor(method)
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    try:
+        while block := fileobj.read(DECOMPRESS_BLOCK):
+            spooled.write(decompressor.decompress(block))
+        decompressor.finish()
+    except BaseException:
+        spooled.close()
+        raise
+    spooled.seek(0)
+    return spooled
+
+
+async def spool_upload(file: UploadFile):
+    """`spool_file` for an upload, off the event loop."""
+    return await profiling.to_thread(spool_file, file.file)
+
+
+# ---------- output ----------
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            return not (q.startswith("q=") and q[2:].strip() in ("0", "0.0", "0.00", "0.000"))
+    return False
+
+
+def negotiate(compress: str | None, accept_encoding: str | None) -> str | None:
+    """How to send a CSV download: "file" (.csv.gz), "encoding" (Content-Encoding: gzip) or None."""
+    if compress is not None and compress not in COMPRESS_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"compress must be one of {', '.join(COMPRESS_OPTIONS)}")
+    if compress == "gzip":
+        return "file"
+    if compress is None and accepts_gzip(accept_encoding):
+        return "encoding"
+    return None
+
+
+def gzip_chunks(chunks: Iterable[str | bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    """Gzip a stream of text/bytes chunks without buffering the whole body."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def csv_response(body: Iterable[str], filename: str, delivery: str | None, headers: dict | None = None) -> StreamingResponse:
+    """A CSV download, gzipped as chosen by `negotiate`."""
+    headers = dict(headers or {})
+    if delivery == "file":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.gz"'
+        return StreamingResponse(gzip_chunks(body), media_type="application/gzip", headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    headers["Vary"] = "Accept-Encoding"
+    if delivery == "encoding":
+        headers["Content-Encoding"] = "gzip"
+        body = gzip_chunks(body)
+    return StreamingResponse(body, media_type="text/csv", headers=headers)
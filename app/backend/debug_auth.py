@@ -0,0 +1,26 @@
+# app/backend/debug_auth.py
+"""
+Shared secret for the /debug routes.
+
+They expose worker internals and some change worker state, so they are off
+unless DEBUG_TOKEN is set. A request then sends the token as an
+`X-Debug-Token` header.
+"""
+
+import hmac
+import os
+
+from fastapi import Header, HTTPException
+
+DEBUG_TOKEN = os.getenv("DEBUG_TOKEN", "")
+
+
+def is_authorized(token: str | None) -> bool:
+    return bool(DEBUG_TOKEN) and token is not None and hmac.compare_digest(token, DEBUG_TOKEN)
+
+
+def require_debug_token(x_debug_token: str = Header(None)):
+    if not DEBUG_TOKEN:
+        raise HTTPException(status_code=404, detail="Debug endpoints are disabled (set DEBUG_TOKEN)")
+    if not is_authorized(x_debug_token):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Debug-Token")
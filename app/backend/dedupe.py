@@ -0,0 +1,131 @@
+# app/backend/dedupe.py
+"""
+In-file duplicate removal for the import/convert row pipeline.
+
+Rows are keyed (manufacturer + SKU by default) and the key is reduced to an
+8-byte BLAKE2b digest, so tracking a million distinct keys costs a few tens of
+MB instead of holding every key string. Rows with an empty key field are
+never treated as duplicates.
+
+Policies (callers opt in; the endpoints default to none):
+- none:         keep every row
+- first:        keep the first occurrence (streaming)
+- error:        reject the file on the first duplicate (streaming)
+- last:         keep the last occurrence, in the position of the first
+- lowest-cost:  keep the cheapest occurrence, in the position of the first
+
+first and error only hold the digest set. last and lowest-cost cannot emit a
+row until the file ends, so they hold every kept row: memory is O(unique rows)
+on top of the digests.
+"""
+
+import hashlib
+from typing import Callable, Generic, Iterable, Iterator, Sequence, TypeVar
+
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+DEDUPE_POLICIES = ("none", "first", "last", "lowest-cost", "error")
+DEDUPE_KEY_FIELDS = ("manufacturer", "sku", "style", "color", "product_type", "pricing_unit")
+DEFAULT_DEDUPE_KEY = "manufacturer,sku"
+DEFAULT_DEDUPE_POLICY = "none"
+
+
+def parse_dedupe_options(policy: str | None, key: str | None) -> tuple[str, list[str]]:
+    """Validate form/query parameters; raises 400 on unknown values."""
+    policy = (policy or DEFAULT_DEDUPE_POLICY).strip().lower()
+    if policy not in DEDUPE_POLICIES:
+        raise HTTPException(status_code=400, detail=f"dedupe must be one of {', '.join(DEDUPE_POLICIES)}")
+
+    fields = [f.strip().lower() for f in (key or DEFAULT_DEDUPE_KEY).split(",") if f.strip()]
+    unknown = [f for f in fields if f not in DEDUPE_KEY_FIELDS]
+    if not fields or unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"dedupe_key fields must be among {', '.join(DEDUPE_KEY_FIELDS)}",
+        )
+    return policy, fields
+
+
+def key_digest(values: Sequence) -> bytes | None:
+    parts = [str(v).strip().lower() if v is not None else "" for v in values]
+    if not all(parts):
+        return None
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).digest()
+
+
+def as_cost(v) -> float | None:
+    """Cost as a number; raw cell text is read the way convert reads it ("$1,250.00")."""
+    if isinstance(v, str):
+        v = v.replace("$", "").replace(",", "").strip()
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+class Deduplicator(Generic[T]):
+    """
+    `key_of(record)` returns the key values for a record; `cost_of(record)`
+    (only needed for lowest-cost) returns its cost. `removed` counts dropped rows.
+    """
+
+    def __init__(
+        self,
+        policy: str,
+        key_of: Callable[[T], Sequence],
+        cost_of: Callable[[T], float | None] | None = None,
+    ):
+        self.policy = policy
+        self.key_of = key_of
+        self.cost_of = cost_of or (lambda record: None)
+        self.removed = 0
+
+    def apply(self, records: Iterable[T]) -> Iterator[T]:
+        if self.policy == "none":
+            return iter(records)
+        if self.policy in ("first", "error"):
+            return self._stream(records)
+        return self._retain(records)
+
+    def _stream(self, records: Iterable[T]) -> Iterator[T]:
+        seen: set[bytes] = set()
+        for line, record in enumerate(records, start=1):
+            digest = key_digest(self.key_of(record))
+            if digest is not None:
+                if digest in seen:
+                    if self.policy == "error":
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"Duplicate key {list(self.key_of(record))} at data row {line}",
+                        )
+                    self.removed += 1
+                    continue
+                seen.add(digest)
+            yield record
+
+    def _retain(self, records: Iterable[T]) -> Iterator[T]:
+        """last / lowest-cost: buffers every kept row (O(unique rows)) and yields them at the end."""
+        slots: list[T] = []
+        index: dict[bytes, int] = {}
+        for record in records:
+            digest = key_digest(self.key_of(record))
+            if digest is None:
+                slots.append(record)
+                continue
+            pos = index.get(digest)
+            if pos is None:
+                index[digest] = len(slots)
+                slots.append(record)
+                continue
+
+            self.removed += 1
+            if self.policy == "last":
+                slots[pos] = record
+            else:  # lowest-cost: unpriced rows never win over priced ones
+                new_cost, old_cost = as_cost(self.cost_of(record)), as_cost(self.cost_of(slots[pos]))
+                if new_cost is not None and (old_cost is None or new_cost < old_cost):
+                    slots[pos] = record
+        del index
+        yield from slots
@@ -0,0 +1,191 @@
+# app/backend/formats.py
+"""
+Persistent registry of vendor file formats.
+
+Vendors send identically shaped files every month, so the result of header,
+delimiter, encoding and Soho detection is stored keyed by a fingerprint of the
+file's leading bytes. A stored entry is only trusted if the line at the stored
+header index still hashes to the stored header hash; otherwise detection runs
+again and the entry is replaced.
+
+New entries are used from memory at once and persisted through the single
+writer (see writer.py) without waiting for the commit.
+"""
+
+import hashlib
+import logging
+import threading
+from dataclasses import asdict, dataclass
+from typing import Callable
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.backend import database, models
+from app.backend.writer import coordinator
+
+logger = logging.getLogger("b2b_import_export")
+
+FINGERPRINT_BYTES = 1024
+
+
+@dataclass(frozen=True)
+class FileFormat:
+    header_index: int
+    header_hash: str
+    delimiter: str
+    encoding: str
+    format_type: str = "standard"
+
+    @property
+    def is_soho(self) -> bool:
+        return self.format_type == "soho"
+
+    def matches(self, lines: list[str]) -> bool:
+        return self.header_index < len(lines) and header_hash(lines[self.header_index]) == self.header_hash
+
+
+def header_hash(line: str) -> str:
+    return hashlib.sha1(line.encode("utf-8", "surrogatepass")).hexdigest()[:16]
+
+
+def fingerprint(contents: bytes) -> str:
+    """Hash of the first line's raw bytes (capped), before any decoding."""
+    head = contents[:FINGERPRINT_BYTES]
+    end = head.find(b"\n")
+    if end != -1:
+        head = head[:end]
+    return hashlib.sha1(head.rstrip(b"\r")).hexdigest()
+
+
+def _persist_format(db, fp: str, fmt: FileFormat) -> None:
+    """Writer job: upsert one registry entry (the writer commits)."""
+    db.merge(models.VendorFormat(fingerprint=fp, **asdict(fmt)))
+
+
+def _delete_formats(db, fp: str | None) -> int:
+    """Writer job: remove one entry, or all of them when `fp` is None."""
+    query = db.query(models.VendorFormat)
+    if fp is not None:
+        query = query.filter(models.VendorFormat.fingerprint == fp)
+    return query.delete()
+
+
+def _log_persist_failure(future) -> None:
+    if future.exception() is not None:
+        logger.warning("Could not persist format: %s", future.exception())
+
+
+class FormatRegistry:
+    """In-process mirror of the `vendor_formats` table with hit/miss counters."""
+
+    def __init__(self, session_factory=database.SessionLocal, writer=coordinator):
+        self.session_factory = session_factory
+        self.writer = writer
+        self._entries: dict[str, FileFormat] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    # ---------- storage ----------
+
+    def _load(self, fp: str) -> FileFormat | None:
+        with self._lock:
+            fmt = self._entries.get(fp)
+        if fmt is not None:
+            return fmt
+
+        try:
+            with self.session_factory() as db:
+                row = db.get(models.VendorFormat, fp)
+        except SQLAlchemyError as e:
+            logger.warning("Format registry unavailable: %s", e)
+            return None
+        if row is None:
+            return None
+
+        fmt = FileFormat(
+            header_index=row.header_index,
+            header_hash=row.header_hash,
+            delimiter=row.delimiter,
+            encoding=row.encoding,
+            format_type=row.format_type,
+        )
+        with self._lock:
+            self._entries[fp] = fmt
+        return fmt
+
+    def _store(self, fp: str, fmt: FileFormat) -> None:
+        with self._lock:
+            self._entries[fp] = fmt
+        # Fire and forget: the request does not wait for the writer queue
+        self.writer.submit(_persist_format, fp, fmt).add_done_callback(_log_persist_failure)
+
+    # ---------- public API ----------
+
+    def resolve(
+        self,
+        fp: str,
+        lines: list[str],
+        encoding: str,
+        detect: Callable[[list[str], str], FileFormat],
+    ) -> FileFormat:
+        """
+        Return the format of a file with fingerprint `fp`, already decoded as
+        `encoding` into `lines`, running `detect` only when no stored format applies.
+        """
+        fmt = self._load(fp)
+
+        if fmt is not None:
+            if fmt.encoding == encoding and fmt.matches(lines):
+                with self._lock:
+                    self.hits += 1
+                logger.info(f"Format registry hit: {fp[:12]}")
+                return fmt
+            with self._lock:
+                self.stale += 1
+
+        with self._lock:
+            self.misses += 1
+        fmt = detect(lines, encoding)
+        self._store(fp, fmt)
+        return fmt
+
+    def invalidate(self, fp: str | None = None) -> int:
+        """Forget one fingerprint, or every entry when `fp` is None. Returns rows removed."""
+        with self._lock:
+            if fp is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(fp, None)
+
+        return self.writer.submit(_delete_formats, fp).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "cached_entries": len(self._entries),
+            }
+
+    def list(self) -> list[dict]:
+        with self.session_factory() as db:
+            rows = db.query(models.VendorFormat).order_by(models.VendorFormat.created_at).all()
+            return [
+                {
+                    "fingerprint": r.fingerprint,
+                    "header_index": r.header_index,
+                    "delimiter": r.delimiter,
+                    "encoding": r.encoding,
+                    "format_type": r.format_type,
+                    "created_at": r.created_at,
+                }
+                for r in rows
+            ]
+
+
+registry = FormatRegistry()
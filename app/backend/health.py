@@ -0,0 +1,77 @@
+# app/backend/health.py
+"""
+Liveness and readiness checks.
+
+The schema is owned by alembic (`alembic upgrade head`), which runs once before
+the server starts rather than inside every worker. Readiness therefore checks
+that the database answers and that its recorded alembic revision is the
+latest one shipped with the code.
+"""
+
+import logging
+import threading
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.backend import database
+
+logger = logging.getLogger("health")
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+_lock = threading.Lock()
+_expected_heads: set[str] | None = None
+_schema_ok = False
+
+
+def expected_heads() -> set[str]:
+    """Head revisions of the migration scripts, loaded on first use (empty if not shipped)."""
+    global _expected_heads
+    if _expected_heads is None:
+        heads: set[str] = set()
+        if ALEMBIC_INI.exists():
+            try:
+                from alembic.config import Config
+                from alembic.script import ScriptDirectory
+
+                config = Config(str(ALEMBIC_INI))
+                config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+                heads = set(ScriptDirectory.from_config(config).get_heads())
+            except Exception as e:
+                logger.warning("Could not read alembic scripts: %s", e)
+        _expected_heads = heads
+    return _expected_heads
+
+
+def check_readiness() -> tuple[bool, dict]:
+    """Returns (ready, details). The schema check is skipped once it has passed."""
+    global _schema_ok
+    details: dict = {}
+
+    try:
+        with database.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            details["database"] = "ok"
+
+            with _lock:
+                schema_ok = _schema_ok
+            if not schema_ok:
+                try:
+                    current = set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+                except SQLAlchemyError:
+                    current = set()
+                heads = expected_heads()
+                schema_ok = bool(current) and (not heads or current == heads)
+                if not schema_ok:
+                    details["schema_revision"] = sorted(current)
+                    details["expected_revision"] = sorted(heads)
+                with _lock:
+                    _schema_ok = schema_ok
+    except SQLAlchemyError as e:
+        details["database"] = f"unavailable: {e.__class__.__name__}"
+        return False, details
+
+    details["schema"] = "ok" if schema_ok else "pending migrations (run `alembic upgrade head`)"
+    return schema_ok, details
@@ -0,0 +1,318 @@
+# app/backend/lookup.py
+"""
+Exact-match product lookups by barcode and by vendor + SKU, for point-of-sale
+scanning (GET/POST /products/lookup).
+
+The index is an in-process hash table, always on. It maps each barcode and
+each (vendor_id, sku) pair to the products that carry it. For each product it
+holds the fields a till needs (LOOKUP_FIELDS), already JSON-ready. A scan is
+two dict reads; the database is not touched.
+
+Mutation paths keep it current after they commit, the same way they keep the
+catalog snapshot current:
+
+* `added(product)` indexes a created product;
+* `removed(product_id)` drops a deleted one;
+* `mark_stale()` covers everything else (imports, bulk edits, clear-all,
+  vendor deletes). A background thread rebuilds the index with one streamed
+  SELECT. Until it is done, lookups run as SQL on ix_products_barcode and
+  ix_products_vendor_sku, so an import never stalls the tills.
+
+Another worker's product changes (CACHE_SYNC=db) also trigger a rebuild.
+
+The first lookup in a worker starts the initial build. LOOKUP_WARM_ON_STARTUP=1
+starts it at boot instead, at the cost of a products scan per booting worker.
+
+Barcodes and SKUs are not unique. When several products share one, live
+products come before dropped ones, then the oldest first. Single lookups
+answer with that first product.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import select
+
+from app.backend import database, models
+from app.backend.cache import PRODUCTS, cache
+
+logger = logging.getLogger("lookup")
+
+LOOKUP_WARM_ON_STARTUP = os.getenv("LOOKUP_WARM_ON_STARTUP", "").lower() in ("1", "true", "yes")
+LOOKUP_BUILD_CHUNK = 5000
+LOOKUP_SQL_CHUNK = 500
+
+LOOKUP_FIELDS = (
+    "id", "vendor_id", "sku", "barcode", "style", "color", "product_type",
+    "pricing_unit", "price", "retail_price", "is_promo", "start_promo_date",
+    "end_promo_date", "promo_cut_cost", "promo_roll_cost", "is_dropped",
+    "normalized_cost_per_sf",
+)
+# Few distinct values across the catalog: share one string object per value
+SHARED_FIELDS = ("style", "color", "product_type", "pricing_unit")
+
+ID = LOOKUP_FIELDS.index("id")
+VENDOR_ID = LOOKUP_FIELDS.index("vendor_id")
+SKU = LOOKUP_FIELDS.index("sku")
+BARCODE = LOOKUP_FIELDS.index("barcode")
+IS_DROPPED = LOOKUP_FIELDS.index("is_dropped")
+SHARED = tuple(LOOKUP_FIELDS.index(name) for name in SHARED_FIELDS)
+
+VendorSku = tuple[int, str]
+
+
+def to_record(values) -> tuple:
+    """One product's LOOKUP_FIELDS values as a JSON-ready tuple."""
+    record = [v.isoformat() if isinstance(v, date) else v for v in values]
+    for i in SHARED:
+        if record[i] is not None:
+            record[i] = sys.intern(record[i])
+    return tuple(record)
+
+
+def as_dict(record: tuple | None) -> dict | None:
+    return None if record is None else dict(zip(LOOKUP_FIELDS, record))
+
+
+def barcode_key(code: str | None) -> str | None:
+    # Scanners often append a newline or pad with spaces
+    code = code.strip() if code else code
+    return code or None
+
+
+def sku_key(vendor_id: int | None, sku: str | None) -> VendorSku | None:
+    sku = sku.strip() if sku else sku
+    return (vendor_id, sku) if vendor_id is not None and sku else None
+
+
+def rank(record: tuple) -> tuple:
+    return bool(record[IS_DROPPED]), record[ID]
+
+
+class _Index:
+    """Records by id plus the two key maps. Key maps hold tuples that are replaced, never mutated,
+    so readers need no lock."""
+
+    def __init__(self):
+        self.records: dict[int, tuple] = {}
+        self.by_barcode: dict[str, tuple[int, ...]] = {}
+        self.by_sku: dict[VendorSku, tuple[int, ...]] = {}
+
+    def keys(self, record: tuple):
+        return (
+            (self.by_barcode, barcode_key(record[BARCODE])),
+            (self.by_sku, sku_key(record[VENDOR_ID], record[SKU])),
+        )
+
+    def add(self, record: tuple) -> None:
+        self.remove(record[ID])
+        self.records[record[ID]] = record
+        for mapping, key in self.keys(record):
+            if key is not None:
+                ids = (*mapping.get(key, ()), record[ID])
+                mapping[key] = tuple(sorted(ids, key=lambda i: rank(self.records[i])))
+
+    def extend(self, records: list[tuple]) -> None:
+        """Bulk-add records in id order (initial build)."""
+        for record in records:
+            product_id = record[ID]
+            if product_id in self.records:
+                continue  # matched by both barcode and SKU
+            self.records[product_id] = record
+            for mapping, key in self.keys(record):
+                if key is not None:
+                    mapping[key] = (*mapping.get(key, ()), product_id)
+
+    def finish(self) -> None:
+        """Put live products first wherever a key is shared (after `extend`)."""
+        for mapping in (self.by_barcode, self.by_sku):
+            for key, ids in mapping.items():
+                if len(ids) > 1:
+                    mapping[key] = tuple(sorted(ids, key=lambda i: rank(self.records[i])))
+
+    def remove(self, product_id: int) -> None:
+        record = self.records.pop(product_id, None)
+        if record is None:
+            return
+        for mapping, key in self.keys(record):
+            if key is not None:
+                ids = tuple(i for i in mapping.get(key, ()) if i != product_id)
+                if ids:
+                    mapping[key] = ids
+                else:
+                    mapping.pop(key, None)
+
+    def apply(self, op: tuple) -> None:
+        kind, arg = op
+        if kind == "add":
+            self.add(arg)
+        else:
+            self.remove(arg)
+
+    def first(self, mapping: dict, key) -> tuple | None:
+        ids = mapping.get(key) if key is not None else None
+        return self.records.get(ids[0]) if ids else None
+
+
+class ProductLookup:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: _Index | None = None  # None while missing or stale: lookups use SQL
+        self._building = False
+        self._started = False
+        self._rebuild_again = False
+        self._pending: list | None = None  # patches received while a rebuild runs
+        self.builds = 0
+        self.patches = 0
+        self.index_lookups = 0
+        self.sql_lookups = 0
+        self.last_build_ms = 0.0
+
+    # ---------- mutation hooks (call after commit) ----------
+
+    def added(self, product) -> None:
+        self._patch(("add", to_record(getattr(product, name) for name in LOOKUP_FIELDS)))
+
+    def removed(self, product_id: int) -> None:
+        self._patch(("remove", product_id))
+
+    def mark_stale(self, *_) -> None:
+        with self._lock:
+            self._index = None
+            if self._building:
+                self._rebuild_again = True
+                return
+            self._building = self._started = True
+        threading.Thread(target=self._rebuild, name="product-lookup", daemon=True).start()
+
+    def warm(self) -> None:
+        """Build the index in the background unless it is already built or building."""
+        with self._lock:
+            if self._index is not None or self._building:
+                return
+        self.mark_stale()
+
+    # ---------- reads ----------
+
+    def find(self, barcodes: list[str] = (), skus: list[VendorSku] = ()) -> tuple[list, list] | None:
+        """First product record (or None) for each barcode and each (vendor_id, sku) pair,
+        from the index; None when it is not built yet and the caller should use `find_in_db`."""
+        cache.poll()
+        index = self._index
+        if index is None:
+            if not self._started:
+                self.warm()  # first use without a startup warm-up
+            return None
+        with self._lock:  # endpoints run on the threadpool
+            self.index_lookups += 1
+        return (
+            [as_dict(index.first(index.by_barcode, barcode_key(code))) for code in barcodes],
+            [as_dict(index.first(index.by_sku, sku_key(vendor_id, sku))) for vendor_id, sku in skus],
+        )
+
+    def find_in_db(self, barcodes: list[str] = (), skus: list[VendorSku] = ()) -> tuple[list, list]:
+        """Same answer as `find`, as indexed SQL (while the index is rebuilding)."""
+        with self._lock:
+            self.sql_lookups += 1
+        P = models.Product
+        columns = [P.__table__.c[name] for name in LOOKUP_FIELDS]
+        index = _Index()
+        barcode_keys = [barcode_key(code) for code in barcodes]
+        sku_keys = [sku_key(vendor_id, sku) for vendor_id, sku in skus]
+        wanted_barcodes = list(dict.fromkeys(k for k in barcode_keys if k is not None))
+        wanted_skus = list(dict.fromkeys(k for k in sku_keys if k is not None))
+
+        with database.engine.connect() as conn:
+            for i in range(0, len(wanted_barcodes), LOOKUP_SQL_CHUNK):
+                stmt = select(*columns).where(P.barcode.in_(wanted_barcodes[i:i + LOOKUP_SQL_CHUNK]))
+                index.extend([to_record(row) for row in conn.execute(stmt)])
+            # One `vendor_id = ? AND sku IN (...)` per vendor: SQLite scans the table for row-value IN
+            skus_by_vendor: dict[int, list[str]] = {}
+            for vendor_id, sku in wanted_skus:
+                skus_by_vendor.setdefault(vendor_id, []).append(sku)
+            for vendor_id, vendor_skus in skus_by_vendor.items():
+                for i in range(0, len(vendor_skus), LOOKUP_SQL_CHUNK):
+                    stmt = select(*columns).where(
+                        P.vendor_id == vendor_id, P.sku.in_(vendor_skus[i:i + LOOKUP_SQL_CHUNK])
+                    )
+                    index.extend([to_record(row) for row in conn.execute(stmt)])
+        index.finish()
+
+        return (
+            [as_dict(index.first(index.by_barcode, key)) for key in barcode_keys],
+            [as_dict(index.first(index.by_sku, key)) for key in sku_keys],
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            index, building = self._index, self._building
+            counters = {
+                "builds": self.builds,
+                "patches": self.patches,
+                "index_lookups": self.index_lookups,
+                "sql_lookups": self.sql_lookups,
+                "last_build_ms": self.last_build_ms,
+            }
+        return {
+            "ready": index is not None,
+            "building": building,
+            "products": len(index.records) if index else 0,
+            "barcodes": len(index.by_barcode) if index else 0,
+            "vendor_skus": len(index.by_sku) if index else 0,
+            **counters,
+        }
+
+    # ---------- internals ----------
+
+    def _patch(self, op: tuple) -> None:
+        with self._lock:
+            self.patches += 1
+            if self._pending is not None:
+                self._pending.append(op)
+            if self._index is not None:
+                self._index.apply(op)
+
+    def _rebuild(self) -> None:
+        while True:
+            with self._lock:
+                self._rebuild_again = False
+                self._pending = []
+            try:
+                index = self._build()
+            except Exception:
+                logger.exception("Product lookup index rebuild failed; lookups use SQL until the next change")
+                with self._lock:
+                    self._building, self._pending = False, None
+                return
+            with self._lock:
+                if self._rebuild_again:
+                    continue  # changed again mid-build: that copy is already stale
+                for op in self._pending:
+                    index.apply(op)
+                self._index, self._pending, self._building = index, None, False
+                return
+
+    def _build(self) -> _Index:
+        started = time.perf_counter()
+        index = _Index()
+        stmt = select(*[models.Product.__table__.c[name] for name in LOOKUP_FIELDS]).order_by(models.Product.id)
+        with database.engine.connect() as conn:
+            result = conn.execution_options(yield_per=LOOKUP_BUILD_CHUNK).execute(stmt)
+            for rows in result.partitions():
+                index.extend([to_record(row) for row in rows])
+        index.finish()
+        build_ms = round((time.perf_counter() - started) * 1000, 1)
+        with self._lock:
+            self.builds += 1
+            self.last_build_ms = build_ms
+        logger.info(f"Product lookup index rebuilt: {len(index.records)} products in {build_ms} ms")
+        return index
+
+
+product_lookup = ProductLookup()
+
+cache.on_remote_invalidate(lambda namespace: namespace == PRODUCTS and product_lookup.mark_stale())
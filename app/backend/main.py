@@ -1,10 +1,15 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.backend.database import engine, Base
-from app.backend.routers import products, vendors, pricelists, qfloors_import_export, b2b_import_export
+from fastapi.responses import JSONResponse
+from app.backend import health
+from app.backend.admission import AdmissionMiddleware
+from app.backend.lookup import LOOKUP_WARM_ON_STARTUP, product_lookup
+from app.backend.profiling import ProfilingMiddleware
+from app.backend.query_stats import QueryStatsMiddleware
+from app.backend.routers import products, vendors, pricelists, qfloors_import_export, b2b_import_export, uploads, analytics, debug
 
-# Create all tables (if using SQLAlchemy ORM)
-Base.metadata.create_all(bind=engine)
+# The schema is managed by alembic: run `alembic upgrade head` once before
+# starting the server instead of creating tables in every worker at import time.
 
 # Initialize app
 app = FastAPI(
@@ -19,23 +24,60 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
+# Middleware added last runs first: CORS -> admission -> profiling -> query stats -> routes,
+# so 429/503 rejections still carry CORS headers and profiles exclude queueing.
+
+# Per-request SQL counts, N+1 warnings and slow-query log (see query_stats.py)
+app.add_middleware(QueryStatsMiddleware)
+
+# Opt-in cProfile capture for /b2b and /qfloors requests (see profiling.py)
+app.add_middleware(ProfilingMiddleware)
+
+# Slots, byte budget and bounded queue for heavy import/convert/export routes (see admission.py)
+app.add_middleware(AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Queue-Wait-Ms", "X-SQL-Queries", "X-SQL-Time-Ms", "X-SQL-Repeated"],
 )
 
+# Off by default: every worker would scan the products table while booting. Without it the
+# index is built on the first lookup, which is answered from SQL meanwhile.
+if LOOKUP_WARM_ON_STARTUP:
+    @app.on_event("startup")
+    def warm_lookup_index():
+        product_lookup.warm()
+
 # Root route
 @app.get("/")
 def root():
     return {"message": "✅ Floor Pricing API is running. Visit /docs for API documentation."}
 
+# Liveness: the process is up and serving requests (no database access)
+@app.get("/healthz", tags=["Health"])
+def healthz():
+    return {"status": "ok"}
+
+# Readiness: database reachable and schema migrated to the latest revision
+@app.get("/readyz", tags=["Health"])
+def readyz():
+    ready, details = health.check_readiness()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not ready", **details},
+    )
+
 # Routers
 app.include_router(products.router)
 app.include_router(vendors.router)
 app.include_router(pricelists.router)
 app.include_router(qfloors_import_export.router)
 app.include_router(b2b_import_export.router)
+app.include_router(uploads.router)
+app.include_router(analytics.router)
+app.include_router(debug.router)
 
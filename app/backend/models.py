@@ -1,7 +1,9 @@
 # app/backend/models.py
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Date, Table, Index, event
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
 from app.backend.database import Base
+from app.backend.unit_cost import cost_per_sf
 
 class Vendor(Base):
     __tablename__ = "vendors"
@@ -17,7 +19,7 @@ class Product(Base):
     __tablename__ = "products"
 
     id = Column(Integer, primary_key=True, index=True)
-    sku = Column(String, nullable=True)
+    sku = Column(String, nullable=True, index=True)
     style = Column(String, nullable=True)
     color = Column(String, nullable=True)
     product_type = Column(String, nullable=True)
@@ -27,8 +29,8 @@ class Product(Base):
     backing = Column(String, nullable=True)
     retail_price = Column(Float, nullable=True)
     is_promo = Column(Boolean, default=False)
-    start_promo_date = Column(String, nullable=True)
-    end_promo_date = Column(String, nullable=True)
+    start_promo_date = Column(Date, nullable=True)
+    end_promo_date = Column(Date, nullable=True)
     promo_cut_cost = Column(Float, nullable=True)
     promo_roll_cost = Column(Float, nullable=True)
     is_dropped = Column(Boolean, default=False)
@@ -45,7 +47,99 @@ class Product(Base):
     display_online = Column(Boolean, default=True)
     freight = Column(Float, nullable=True)
     picture_url = Column(String, nullable=True)
-    barcode = Column(String, nullable=True)
+    barcode = Column(String, nullable=True, index=True)
+    sf_per_carton = Column(Float, nullable=True)
+
+    # Derived from price, pricing_unit, width and sf_per_carton (see unit_cost.py); set on every write
+    normalized_cost_per_sf = Column(Float, nullable=True)
 
     vendor_id = Column(Integer, ForeignKey("vendors.id"))
     vendor = relationship("Vendor", back_populates="products")
+
+    __table_args__ = (
+        # Active-promotion lookups: is_promo = true AND start <= :day AND end >= :day
+        Index("ix_products_promo_window", "is_promo", "start_promo_date", "end_promo_date"),
+        # Catalog analytics: covering indexes, ordered by price within each group for medians
+        Index("ix_products_vendor_price", "vendor_id", "price", "product_type", "is_dropped", "is_promo"),
+        Index("ix_products_type_price", "product_type", "price", "vendor_id", "is_dropped", "is_promo"),
+        # Cross-vendor unit-cost comparison: "cheapest CER per SF" is a range scan
+        Index("ix_products_cost_per_sf", "normalized_cost_per_sf"),
+        Index("ix_products_type_cost_per_sf", "product_type", "normalized_cost_per_sf"),
+        # Point-of-sale lookups by vendor + SKU (barcode has its own index)
+        Index("ix_products_vendor_sku", "vendor_id", "sku"),
+    )
+
+
+@event.listens_for(Product, "before_insert")
+@event.listens_for(Product, "before_update")
+def set_cost_per_sf(mapper, connection, product):
+    product.normalized_cost_per_sf = cost_per_sf(
+        product.price, product.pricing_unit, product.width, product.sf_per_carton
+    )
+
+
+# Same columns as `products` (minus the key), plus the import batch they belong to.
+# Rows are bulk-loaded here and swapped into `products` in one short transaction.
+products_staging = Table(
+    "products_staging",
+    Base.metadata,
+    Column("row_id", Integer, primary_key=True),
+    Column("batch_id", String, nullable=False, index=True),
+    *[
+        Column(c.name, c.type, nullable=True)
+        for c in Product.__table__.columns
+        if c.name != "id"
+    ],
+)
+
+
+class VendorFormat(Base):
+    """Detected layout of a vendor file, keyed by a fingerprint of its leading bytes."""
+    __tablename__ = "vendor_formats"
+
+    fingerprint = Column(String, primary_key=True)
+    header_index = Column(Integer, nullable=False)
+    header_hash = Column(String, nullable=False)
+    delimiter = Column(String, nullable=False)
+    encoding = Column(String, nullable=False)
+    format_type = Column(String, nullable=False, default="standard")
+    created_at = Column(DateTime, server_default=func.now())
+
+
+class CacheGeneration(Base):
+    """Per-namespace counter bumped on every write; other workers drop their cached reads when it moves."""
+    __tablename__ = "cache_generations"
+
+    namespace = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+
+class PriceList(Base):
+    __tablename__ = "price_lists"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    formula = Column(String, nullable=False)
+    vendor_id = Column(Integer, ForeignKey("vendors.id"), nullable=True)
+    product_type = Column(String, nullable=True)
+    use_product_formula = Column(Boolean, default=True)
+    created_at = Column(DateTime, server_default=func.now())
+    generated_at = Column(DateTime, nullable=True)
+
+    vendor = relationship("Vendor")
+
+
+class PriceListItem(Base):
+    """
+    Cached retail price of one product on one price list, with the inputs it was computed from.
+    SQLite does not enforce ondelete="CASCADE" here (foreign_keys is off), so every path that
+    deletes products or price lists deletes their items explicitly.
+    """
+    __tablename__ = "price_list_items"
+
+    price_list_id = Column(Integer, ForeignKey("price_lists.id", ondelete="CASCADE"), primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    cost = Column(Float, nullable=True)
+    freight = Column(Float, nullable=True)
+    formula = Column(String, nullable=False)
+    retail_price = Column(Float, nullable=True)
@@ -0,0 +1,174 @@
+# app/backend/pricing.py
+"""
+Retail formula engine.
+
+A formula is a small arithmetic expression over a product's `cost` and
+`freight`, e.g.
+
+    cost * 1.85 + freight
+    end_in(cost * 2 + 0.35, 0.99)
+    ceil_to(cost * 1.6, 0.05)
+    2.1                 (shorthand for cost * 2.1)
+    * 1.8 + 0.5         (shorthand for cost * 1.8 + 0.5)
+
+A signed bare number ("-1.5", "+2") could mean either a price or an
+adjustment of cost, so it is rejected; write "cost - 1.5" instead.
+
+Formulas are parsed once, checked against a whitelist of syntax, and compiled
+into plain Python functions that are cached by source text. Evaluation is done
+in batches: products are grouped by formula and each group's cost and freight
+columns run through one compiled loop.
+"""
+
+import ast
+import math
+from functools import lru_cache
+from typing import Callable, Iterable, Sequence
+
+
+class FormulaError(ValueError):
+    pass
+
+
+def round_to(x: float, step: float) -> float:
+    """Round to the nearest multiple of `step` (e.g. 0.05)."""
+    return round(round(x / step) * step, 4) if step else x
+
+
+def ceil_to(x: float, step: float) -> float:
+    """Round up to the next multiple of `step`."""
+    return round(math.ceil(round(x / step, 9)) * step, 4) if step else x
+
+
+def end_in(x: float, ending: float) -> float:
+    """Smallest price >= x whose cents are `ending` (e.g. 0.99 -> 12.99)."""
+    price = math.floor(x) + ending
+    if price < x:
+        price += 1
+    return round(price, 4)
+
+
+FORMULA_VARIABLES = ("cost", "freight")
+
+FORMULA_FUNCTIONS = {
+    "round_to": round_to,
+    "ceil_to": ceil_to,
+    "end_in": end_in,
+    "round": round,
+    "min": min,
+    "max": max,
+    "abs": abs,
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.USub, ast.UAdd,
+)
+
+
+def is_number(src: str) -> bool:
+    try:
+        float(src)
+    except ValueError:
+        return False
+    return True
+
+
+def normalize_formula(text: str) -> str:
+    """Expand shorthands: a bare number is a multiplier, a leading operator applies to cost."""
+    src = str(text).strip()
+    if not src:
+        raise FormulaError("Empty formula")
+    if src[0] in "+-" and is_number(src.replace(" ", "")):
+        raise FormulaError(f"Ambiguous formula {text!r}: write it as cost {src[0]} {src[1:].strip()} or cost * {src}")
+    if src[0] in "*/+-x":
+        if src[0] == "x":
+            src = "*" + src[1:]
+        return f"cost {src}"
+    return f"cost * {src}" if is_number(src) else src
+
+
+def validate_tree(tree: ast.AST) -> None:
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise FormulaError(f"Unsupported syntax in formula: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise FormulaError("Only numeric constants are allowed")
+        if isinstance(node, ast.Name) and node.id not in FORMULA_VARIABLES and node.id not in FORMULA_FUNCTIONS:
+            raise FormulaError(f"Unknown name in formula: {node.id}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FORMULA_FUNCTIONS:
+                raise FormulaError("Only round_to, ceil_to, end_in, round, min, max and abs may be called")
+            if node.keywords:
+                raise FormulaError("Keyword arguments are not allowed")
+
+
+@lru_cache(maxsize=1024)
+def parse_formula(text: str) -> str:
+    """Expand, parse and validate a formula; returns the expression to compile."""
+    src = normalize_formula(text)
+    try:
+        tree = ast.parse(src, mode="eval")
+    except SyntaxError as e:
+        raise FormulaError(f"Invalid formula {text!r}: {e.msg}")
+    validate_tree(tree)
+    return ast.unparse(tree.body)
+
+
+@lru_cache(maxsize=1024)
+def compile_formula(text: str) -> Callable[[float, float], float]:
+    """Parse, validate and compile a formula into `fn(cost, freight) -> price`."""
+    code = compile(f"lambda {', '.join(FORMULA_VARIABLES)}: ({parse_formula(text)})", "<formula>", "eval")
+    return eval(code, {"__builtins__": {}, **FORMULA_FUNCTIONS})
+
+
+@lru_cache(maxsize=1024)
+def compile_column_formula(text: str) -> Callable[[Sequence[float], Sequence[float]], list[float]]:
+    """Compile a formula into `fn(costs, freights) -> prices`, one loop over both columns."""
+    names = ", ".join(FORMULA_VARIABLES)
+    code = compile(
+        f"lambda columns: [round({parse_formula(text)}, 4) for {names} in zip(*columns)]", "<formula>", "eval"
+    )
+    # validate_tree keeps `zip` out of the formula itself
+    return eval(code, {"__builtins__": {}, **FORMULA_FUNCTIONS, "zip": zip})
+
+
+def evaluate_columns(formula: str, costs: Sequence[float], freights: Sequence[float]) -> list[float | None]:
+    """Evaluate one formula over a cost column and a freight column. Failures yield None."""
+    try:
+        return compile_column_formula(formula)((costs, freights))
+    except (ArithmeticError, TypeError, ValueError):
+        pass
+    # Some row failed: redo the column row by row to find which
+    fn = compile_formula(formula)
+    out = []
+    for cost, freight in zip(costs, freights):
+        try:
+            out.append(round(fn(cost, freight), 4))
+        except (ArithmeticError, TypeError, ValueError):
+            out.append(None)
+    return out
+
+
+def evaluate_batch(formula: str, inputs: Sequence[tuple[float, float]]) -> list[float | None]:
+    """Evaluate one formula over many (cost, freight) pairs. Failures yield None."""
+    compile_formula(formula)  # invalid formulas raise even for an empty batch
+    return evaluate_columns(formula, [cost for cost, _ in inputs], [freight for _, freight in inputs])
+
+
+def evaluate_grouped(items: Iterable[tuple[object, str, float, float]]) -> dict[object, float | None]:
+    """
+    Evaluate many products at once. `items` are (key, formula, cost, freight);
+    products sharing a formula are computed together, column by column.
+    """
+    groups: dict[str, tuple[list, list, list]] = {}
+    for key, formula, cost, freight in items:
+        keys, costs, freights = groups.setdefault(formula, ([], [], []))
+        keys.append(key)
+        costs.append(cost or 0.0)
+        freights.append(freight or 0.0)
+
+    results = {}
+    for formula, (keys, costs, freights) in groups.items():
+        results.update(zip(keys, evaluate_columns(formula, costs, freights)))
+    return results
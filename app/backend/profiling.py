@@ -0,0 +1,232 @@
+# app/backend/profiling.py
+"""
+Opt-in request profiling for the import/convert endpoints.
+
+Profiling is off unless DEBUG_TOKEN is set (see debug_auth.py). A request
+under /b2b/ or /qfloors/ is then profiled with cProfile when it carries the
+token, either as an `X-Debug-Token` header or a `?profile=<token>` query
+parameter. The profile covers the whole ASGI call, including a streamed
+response body.
+
+cProfile only sees the thread that enables it, and parsing runs off the event
+loop. Work the routes hand to `profiling.to_thread`, and streamed bodies
+wrapped in `iterate_profiled`, are profiled in the worker thread and merged
+into the request's profile. Sync endpoints, the DB writer thread and the
+batch process pool are not captured. Only one request is profiled at a time;
+a second request asking for a profile while one is running is served
+normally with `X-Profile-Status: busy`.
+
+Each profile is kept on disk under PROFILE_DIR as `<id>.prof` (pstats dump,
+loadable with snakeviz or `python -m pstats`) plus `<id>.json` (request info
+and the hottest functions). Only the newest PROFILE_KEEP profiles are kept.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qs
+
+from app.backend import debug_auth
+
+if TYPE_CHECKING:  # cProfile/pstats load when a request is first profiled
+    import cProfile
+    import pstats
+
+logger = logging.getLogger("profiling")
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "./profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILED_PREFIXES = ("/b2b/", "/qfloors/")
+TOP_FUNCTIONS = 25
+
+PROFILE_ID_RE = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+_busy = threading.Lock()
+_ring_lock = threading.Lock()
+
+# Worker-thread profilers of the request being profiled, by thread id
+_worker_profilers: ContextVar["dict[int, cProfile.Profile] | None"] = ContextVar("worker_profilers", default=None)
+
+
+def requested_token(scope) -> str | None:
+    for name, value in scope.get("headers", []):
+        if name == b"x-debug-token":
+            return value.decode("latin-1")
+    values = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile")
+    return values[0] if values else None
+
+
+def call_profiled(func, *args, **kwargs):
+    """Call `func`, adding its time in this thread to the current request's profile, if any."""
+    profilers = _worker_profilers.get()
+    if profilers is None:
+        return func(*args, **kwargs)
+    profiler = profilers.get(threading.get_ident())
+    if profiler is None:
+        import cProfile
+        profiler = profilers[threading.get_ident()] = cProfile.Profile()
+    return profiler.runcall(func, *args, **kwargs)
+
+
+async def to_thread(func, /, *args, **kwargs):
+    """asyncio.to_thread, with the call profiled in the worker when the request is profiled."""
+    return await asyncio.to_thread(call_profiled, func, *args, **kwargs)
+
+
+def iterate_profiled(iterable):
+    """Re-yield a sync streamed body, profiling each step in whichever threadpool thread runs it."""
+    iterator = iter(iterable)
+    done = object()
+    while (item := call_profiled(next, iterator, done)) is not done:
+        yield item
+
+
+def new_profile_id() -> str:
+    return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+
+def short_path(filename: str) -> str:
+    """Trim site-packages / project prefixes so function names stay readable."""
+    for marker in ("site-packages/", "app/backend/"):
+        pos = filename.rfind(marker)
+        if pos != -1:
+            return filename[pos + len(marker):] if marker == "site-packages/" else filename[pos:]
+    return filename
+
+
+def hot_functions(stats: "pstats.Stats", limit: int = TOP_FUNCTIONS) -> list[dict]:
+    """Functions ranked by their own (exclusive) time."""
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": name,
+            "location": f"{short_path(filename)}:{line}",
+            "calls": calls,
+            "self_ms": round(tottime * 1000, 3),
+            "cumulative_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["self_ms"], reverse=True)
+    return rows[:limit]
+
+
+def save_profile(profile_id: str, profiler: "cProfile.Profile", info: dict, workers=()) -> None:
+    import pstats
+    stats = pstats.Stats(profiler)
+    for worker in workers:
+        stats.add(worker)
+    summary = {
+        "id": profile_id,
+        **info,
+        "total_calls": stats.total_calls,
+        "hot_functions": hot_functions(stats),
+    }
+    with _ring_lock:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stats.dump_stats(PROFILE_DIR / f"{profile_id}.prof")
+        (PROFILE_DIR / f"{profile_id}.json").write_text(json.dumps(summary, indent=2))
+        prune()
+
+
+def prune() -> None:
+    """Drop the oldest profiles beyond PROFILE_KEEP (ids sort chronologically)."""
+    summaries = sorted(PROFILE_DIR.glob("*.json"))
+    for old in summaries[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else summaries:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict]:
+    """Newest first, without the hot function lists."""
+    out = []
+    for path in sorted(PROFILE_DIR.glob("*.json"), reverse=True):
+        try:
+            summary = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        summary.pop("hot_functions", None)
+        out.append(summary)
+    return out
+
+
+def profile_path(profile_id: str, suffix: str) -> Path | None:
+    if not PROFILE_ID_RE.match(profile_id):
+        return None
+    path = PROFILE_DIR / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware so streamed response bodies are inside the profile."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not debug_auth.DEBUG_TOKEN
+            or not scope["path"].startswith(PROFILED_PREFIXES)
+            or not debug_auth.is_authorized(requested_token(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        if not _busy.acquire(blocking=False):
+            await self.app(scope, receive, self._with_headers(send, [(b"x-profile-status", b"busy")]))
+            return
+
+        profile_id = new_profile_id()
+        status = {"code": None}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        import cProfile
+        profiler = cProfile.Profile()
+        workers = {}
+        started = time.perf_counter()
+        try:
+            reset = _worker_profilers.set(workers)
+            profiler.enable()
+            try:
+                await self.app(
+                    scope, receive,
+                    self._with_headers(send_wrapper, [(b"x-profile-id", profile_id.encode())]),
+                )
+            finally:
+                profiler.disable()
+                _worker_profilers.reset(reset)
+        finally:
+            _busy.release()
+            info = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status["code"],
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                "worker_threads": len(workers),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+            try:
+                save_profile(profile_id, profiler, info, workers.values())
+                logger.info(f"Saved profile {profile_id} for {info['method']} {info['path']} ({info['duration_ms']} ms)")
+            except Exception:
+                logger.exception("Could not save profile %s", profile_id)
+
+    @staticmethod
+    def _with_headers(send, headers):
+        async def wrapped(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+        return wrapped
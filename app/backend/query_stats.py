@@ -0,0 +1,245 @@
+# app/backend/query_stats.py
+"""
+SQL instrumentation: statement counts and time per request, repeated-statement
+(N+1) detection and a slow-query log.
+
+Engine events time every cursor execution on `database.engine`. The
+statements are attributed to the request being served through a context
+variable, set by QueryStatsMiddleware. Context follows the request into
+threadpool endpoints, asyncio.to_thread work and its write-coordinator jobs
+(see writer.py).
+
+* N+1: within one request, the same statement shape executed
+  SQL_REPEAT_THRESHOLD times or more is logged once as a suspected N+1. The
+  shape is the SQL text with IN-lists collapsed. executemany calls (bulk
+  inserts) are batches, not N+1, and are not counted as repeats.
+* Slow queries: statements slower than SQL_SLOW_QUERY_MS are logged from any
+  thread. The newest SLOW_QUERY_KEEP are kept for GET /debug/queries (which
+  needs the debug token). Bound parameters carry SKUs, prices and vendor
+  names, so they are redacted unless SQL_LOG_PARAMS=1.
+* Per route: request count, statements, time and N+1 hits are aggregated
+  under "METHOD /path/{template}" for GET /debug/queries.
+* SQL_DEBUG_HEADERS=1 adds X-SQL-Queries, X-SQL-Time-Ms and X-SQL-Repeated
+  to every response. They count the statements run before the response
+  started, so a streamed export's cursor reads are not included.
+
+SQL_INSTRUMENTATION=0 removes the engine hooks. Counters are per worker
+process.
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from app.backend import database
+
+logger = logging.getLogger("sql")
+
+SQL_INSTRUMENTATION = os.getenv("SQL_INSTRUMENTATION", "1").lower() not in ("0", "false", "no")
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "10"))
+SQL_DEBUG_HEADERS = os.getenv("SQL_DEBUG_HEADERS", "").lower() in ("1", "true", "yes")
+SQL_LOG_PARAMS = os.getenv("SQL_LOG_PARAMS", "").lower() in ("1", "true", "yes")
+SLOW_QUERY_KEEP = 50
+LOGGED_PARAMS_MAX = 500   # characters of parameters shown per slow statement
+TRACKED_SHAPES_MAX = 500  # distinct shapes remembered per request
+
+IN_LIST_RE = re.compile(r"\?(?:, \?)+|(?<=IN \()\?(?=\))")
+
+
+def statement_shape(statement: str) -> str:
+    """SQL text with `?, ?, ?` runs and one-value `IN (?)` collapsed, so IN-lists of any length match."""
+    return IN_LIST_RE.sub("?, ...", statement) if "?, ?" in statement or "IN (?)" in statement else statement
+
+
+def describe_params(parameters, executemany: bool, redact: bool = not SQL_LOG_PARAMS) -> str:
+    if executemany:
+        rows = list(parameters)
+        text = f"{len(rows)} rows" + (" (redacted)" if redact else f", first: {rows[:3]!r}")
+    else:
+        text = f"{len(parameters or ())} values (redacted)" if redact else repr(parameters)
+    return text if len(text) <= LOGGED_PARAMS_MAX else text[:LOGGED_PARAMS_MAX] + "..."
+
+
+def one_line(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+class RequestQueries:
+    """Statements run on behalf of one request (may be updated from several threads)."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: dict[str, int] = {}
+        self.repeated: list[str] = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float, executemany: bool) -> None:
+        with self._lock:
+            self.count += 1
+            self.seconds += seconds
+            if executemany:
+                return
+            shape = statement_shape(statement)
+            seen = self.shapes.get(shape)
+            if seen is None and len(self.shapes) >= TRACKED_SHAPES_MAX:
+                return
+            seen = self.shapes[shape] = (seen or 0) + 1
+            if seen != SQL_REPEAT_THRESHOLD:
+                return
+            self.repeated.append(shape)
+        logger.warning(f"Possible N+1 in {self.label}: statement repeated {SQL_REPEAT_THRESHOLD}+ times: {one_line(shape)[:300]}")
+
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        with self._lock:
+            return [
+                (b"x-sql-queries", str(self.count).encode()),
+                (b"x-sql-time-ms", str(round(self.seconds * 1000, 1)).encode()),
+                (b"x-sql-repeated", str(len(self.repeated)).encode()),
+            ]
+
+
+_current: ContextVar[RequestQueries | None] = ContextVar("request_queries", default=None)
+
+
+class QueryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.routes: dict[str, dict] = {}
+        self.slow: deque = deque(maxlen=SLOW_QUERY_KEEP)
+        self.statements = 0
+        self.slow_statements = 0
+
+    def install(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    # ---------- engine events ----------
+
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        request = _current.get()
+        with self._lock:  # cursor events fire on many threads at once
+            self.statements += 1
+        if request is not None:
+            request.record(statement, seconds, executemany)
+        if seconds * 1000 >= SQL_SLOW_QUERY_MS:
+            self._slow(statement, parameters, executemany, seconds, request)
+
+    def _slow(self, statement, parameters, executemany, seconds, request) -> None:
+        entry = {
+            "route": request.label if request else None,
+            "ms": round(seconds * 1000, 1),
+            "statement": one_line(statement),
+            "parameters": describe_params(parameters, executemany),
+        }
+        with self._lock:
+            self.slow_statements += 1
+            self.slow.append(entry)
+        logger.warning(f"Slow query ({entry['ms']} ms) in {entry['route'] or 'background'}: "
+                       f"{entry['statement'][:1000]} -- params: {entry['parameters']}")
+
+    # ---------- per request ----------
+
+    def start(self, label: str) -> tuple[RequestQueries, object]:
+        request = RequestQueries(label)
+        return request, _current.set(request)
+
+    def finish(self, request: RequestQueries, token) -> None:
+        _current.reset(token)
+        with self._lock:
+            route = self.routes.get(request.label)
+            if route is None:
+                route = self.routes[request.label] = {
+                    "requests": 0, "queries": 0, "max_queries": 0, "sql_ms": 0.0, "n_plus_one_requests": 0,
+                }
+            route["requests"] += 1
+            route["queries"] += request.count
+            route["max_queries"] = max(route["max_queries"], request.count)
+            route["sql_ms"] += request.seconds * 1000
+            route["n_plus_one_requests"] += bool(request.repeated)
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {
+                label: {
+                    **route,
+                    "sql_ms": round(route["sql_ms"], 1),
+                    "avg_queries": round(route["queries"] / route["requests"], 2),
+                }
+                for label, route in sorted(self.routes.items(), key=lambda item: -item[1]["queries"])
+            }
+            slow = list(self.slow)
+            statements, slow_statements = self.statements, self.slow_statements
+        return {
+            "enabled": SQL_INSTRUMENTATION,
+            "slow_query_ms": SQL_SLOW_QUERY_MS,
+            "repeat_threshold": SQL_REPEAT_THRESHOLD,
+            "debug_headers": SQL_DEBUG_HEADERS,
+            "log_params": SQL_LOG_PARAMS,
+            "statements": statements,
+            "slow_statements": slow_statements,
+            "routes": routes,
+            "slow_queries": slow[::-1],
+        }
+
+
+_route_paths: dict = {}  # endpoint function -> route path template
+
+
+def route_label(scope) -> str:
+    """"GET /products/{product_id}" for the matched route; the raw path would make one entry per id."""
+    endpoint = scope.get("endpoint")
+    path = _route_paths.get(endpoint)
+    if path is None and endpoint is not None and scope.get("app") is not None:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                path = _route_paths[endpoint] = route.path
+                break
+    return f"{scope['method']} {path or '(unmatched)'}"
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware so statements run while a response streams still count for the route."""
+
+    def __init__(self, app, stats: "QueryStats | None" = None):
+        self.app = app
+        self.stats = stats or query_stats
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_INSTRUMENTATION:
+            await self.app(scope, receive, send)
+            return
+
+        request, token = self.stats.start(f"{scope['method']} {scope['path']}")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                request.label = route_label(scope)
+                if SQL_DEBUG_HEADERS:
+                    message = {**message, "headers": [*message.get("headers", []), *request.headers()]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request.label = route_label(scope)
+            self.stats.finish(request, token)
+
+
+query_stats = QueryStats()
+
+if SQL_INSTRUMENTATION:
+    query_stats.install(database.engine)
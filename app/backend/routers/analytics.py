@@ -0,0 +1,28 @@
+# app/backend/routers/analytics.py
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.backend import database
+from app.backend.analytics import ANALYTICS_GROUPINGS, analytics
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@router.get("/catalog")
+def get_catalog_analytics(group_by: str | None = Query(None), db: Session = Depends(get_db)):
+    """
+    Per-vendor and per-product-type counts, cost min/max/avg/median, and dropped
+    and promo counts. Pass group_by=vendor or group_by=product_type for just one.
+    Cached until the catalog changes; see analytics.py.
+    """
+    if group_by is not None and group_by not in ANALYTICS_GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(ANALYTICS_GROUPINGS)}")
+    return analytics.report(db, group_by)
@@ -1,16 +1,35 @@
 # app/backend/routers/b2b_import_export.py
 
+import asyncio
 import csv
+import datetime
 import io
+import itertools
+import json
 import logging
+import os
 import re
-from typing import Dict
+import tempfile
+import time
+import zipfile
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Dict, Iterator
 
-from fastapi import APIRouter, UploadFile, Depends, HTTPException, Form
+from fastapi import APIRouter, UploadFile, Depends, HTTPException, Form, Header, Query
 from fastapi.responses import StreamingResponse, JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
-from app.backend import database, models
+from app.backend import catalog_export, catalog_import, charset, compression, database, models, profiling
+from app.backend.catalog_diff import DIFF_HEADERS, CatalogDiff, DiffRow
+from app.backend.dedupe import DEFAULT_DEDUPE_KEY, DEFAULT_DEDUPE_POLICY, Deduplicator, parse_dedupe_options
+from app.backend.unit_cost import SF_PER_CARTON_FIELDS, cost_per_sf
+
+# Heavy or rarely used components load on first use, not at worker start:
+# openpyxl (build_sheet_reader), the batch process pool (get_batch_pool) and
+# the format registry (app.backend.formats, first text file read).
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+    from app.backend.formats import FileFormat
 
 router = APIRouter(prefix="/b2b", tags=["B2B Import/Export"])
 
@@ -121,6 +140,26 @@ def extract_retail_price(row: Dict, product_type: str) -> float | str:
 # ---------------- CSV READER (SAFE) --------------------------
 # ============================================================
 
+HEADER_KEYWORDS = [
+    "sku", "item", "description", "price", "cost",
+    "color", "size", "uom", "unit", "code"
+]
+
+
+def score_header_cells(cols: list[str]) -> int:
+    """Score one candidate header row: column count plus bonus for useful keywords."""
+    if len(cols) < 3:
+        return 0
+
+    score = len(cols)
+    for c in cols:
+        cl = c.lower()
+        for kw in HEADER_KEYWORDS:
+            if kw in cl:
+                score += 5
+    return score
+
+
 def find_header_row(lines: list[str]) -> int:
     """
     Detect the most likely header row by scoring rows
@@ -129,54 +168,149 @@ def find_header_row(lines: list[str]) -> int:
     best_score = 0
     best_index = 0
 
-    KEYWORDS = [
-        "sku", "item", "description", "price", "cost",
-        "color", "size", "uom", "unit", "code"
-    ]
-
     for i, line in enumerate(lines[:50]):
-        
-        cols = re.split(r"[,\t;|]", line)
-        cols = [c.strip() for c in cols]
+        cols = [c.strip() for c in re.split(r"[,\t;|]", line)]
+        score = score_header_cells(cols)
+
+        if score > best_score:
+            best_score = score
+            best_index = i
+
+    return best_index
+
+
+# ============================================================
+# ---------------- XLSX READER (STREAMING) --------------------
+# ============================================================
+
+XLSX_EXTENSIONS = (".xlsx", ".xlsm")
 
-        if len(cols) < 3:
-            continue
 
-        score = 0
+def is_xlsx(contents: bytes, filename: str | None = None) -> bool:
+    """True for Excel workbooks (a zip container with an xl/workbook.xml part)."""
+    if filename and filename.lower().endswith(XLSX_EXTENSIONS):
+        return True
+    if contents[:4] != b"PK\x03\x04":
+        return False
+    try:
+        with zipfile.ZipFile(io.BytesIO(contents)) as z:
+            return "xl/workbook.xml" in z.namelist()
+    except zipfile.BadZipFile:
+        return False
+
 
-        # Score for number of columns
-        score += len(cols)
+def cell_text(v) -> str:
+    """Render a spreadsheet cell the way it would appear in a CSV export."""
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    if isinstance(v, datetime.datetime):
+        return v.date().isoformat() if v.time() == datetime.time() else v.isoformat()
+    if isinstance(v, datetime.date):
+        return v.isoformat()
+    return str(v).strip()
 
-        # Score for meaningful header words
-        for c in cols:
-            cl = c.lower()
-            for kw in KEYWORDS:
-                if kw in cl:
-                    score += 5
 
+def find_header_row_cells(rows: list[list[str]]) -> tuple[int, int]:
+    """
+    Same scoring as find_header_row, over already-split cells. Returns (index, score).
+    Empty cells are ignored since read-only sheets pad every row to the sheet width.
+    """
+    best_score = 0
+    best_index = 0
+    for i, cols in enumerate(rows[:50]):
+        score = score_header_cells([c for c in cols if c])
         if score > best_score:
             best_score = score
             best_index = i
+    return best_index, best_score
 
-    return best_index
 
+class SheetDictReader:
+    """
+    csv.DictReader look-alike over one worksheet of a read-only workbook.
+
+    Rows are pulled lazily from openpyxl's streaming parser, so only the current
+    row is ever materialized. The workbook is closed once iteration finishes.
+    """
+
+    def __init__(self, workbook, sheet_name: str, header_index: int, fieldnames: list[str]):
+        self.workbook = workbook
+        self.sheet_name = sheet_name
+        self.header_index = header_index
+        self.fieldnames = fieldnames
+
+    def __iter__(self):
+        sheet = self.workbook[self.sheet_name]
+        width = len(self.fieldnames)
+        try:
+            for values in sheet.iter_rows(min_row=self.header_index + 2, values_only=True):
+                cells = [cell_text(v) for v in values]
+                if not any(cells):
+                    continue
+                if len(cells) < width:
+                    cells.extend([""] * (width - len(cells)))
+                yield dict(zip(self.fieldnames, cells))
+        finally:
+            self.workbook.close()
+
+
+def build_sheet_reader(contents: bytes) -> SheetDictReader:
+    """
+    Open a workbook in read-only (streaming) mode and pick the sheet whose
+    best candidate header row scores highest.
+    """
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(status_code=400, detail="XLSX support requires the openpyxl package")
 
-def build_reader(contents: bytes) -> csv.DictReader:
-    # 1️⃣ Decode safely
     try:
-        text = contents.decode("utf-8-sig")
-    except UnicodeDecodeError:
-        text = contents.decode("latin-1")
+        workbook = load_workbook(io.BytesIO(contents), read_only=True, data_only=True)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Unreadable XLSX file: {e}")
+
+    best = None  # (score, sheet_name, header_index, header_cells)
+    for sheet in workbook.worksheets:
+        head = [
+            [cell_text(v) for v in values]
+            for values in itertools.islice(sheet.iter_rows(values_only=True), 50)
+        ]
+        if not head:
+            continue
+        index, score = find_header_row_cells(head)
+        if best is None or score > best[0]:
+            best = (score, sheet.title, index, head[index])
+
+    if best is None or not any(best[3]):
+        workbook.close()
+        raise HTTPException(status_code=400, detail="Empty XLSX file")
+
+    _, sheet_name, header_index, header_cells = best
+    logger.info(f"Detected XLSX sheet: {sheet_name} (header row {header_index})")
+
+    fieldnames = [normalize_key(h) for h in header_cells]
+    logger.info("Normalized headers: %s", fieldnames)
+
+    return SheetDictReader(workbook, sheet_name, header_index, fieldnames)
+
+
+# ============================================================
+# ---------------- PRICE LIST READER --------------------------
+# ============================================================
+
+def detect_text_format(lines: list[str], encoding: str) -> "FileFormat":
+    """Header row, delimiter and Soho detection over already-decoded lines."""
+    from app.backend import formats
 
-    lines = text.splitlines()
     if not lines:
         raise HTTPException(status_code=400, detail="Empty CSV file")
 
     # 2️⃣ Find header row
     header_index = find_header_row(lines)
-    relevant_lines = lines[header_index:]
 
-    sample = "\n".join(relevant_lines[:10])
+    sample = "\n".join(lines[header_index:header_index + 10])
 
     # 3️⃣ Detect delimiter
     try:
@@ -187,13 +321,110 @@ def build_reader(contents: bytes) -> csv.DictReader:
 
     logger.info(f"Detected delimiter: {delimiter}")
 
-    # 4️⃣ Rebuild clean stream
-    stream = io.StringIO("\n".join(relevant_lines))
+    # 4️⃣ Detect Soho layout from the raw header cells
+    header_cells = next(csv.reader([lines[header_index]], delimiter=delimiter), [])
+    is_soho = is_soho_pricelist(header_cells)
+
+    return formats.FileFormat(
+        header_index=header_index,
+        header_hash=formats.header_hash(lines[header_index]),
+        delimiter=delimiter,
+        encoding=encoding,
+        format_type="soho" if is_soho else "standard",
+    )
+
 
-    reader = csv.DictReader(stream, delimiter=delimiter)
+def build_reader(contents: bytes, filename: str | None = None) -> csv.DictReader | SheetDictReader:
+    """
+    Open a vendor price list. The returned reader has normalized `fieldnames`
+    and an `is_soho` flag.
+    """
+    # 0️⃣ Spreadsheets go through the streaming XLSX reader
+    if is_xlsx(contents, filename):
+        reader = build_sheet_reader(contents)
+        reader.is_soho = is_soho_pricelist(reader.fieldnames)
+        return reader
 
-    # 5️⃣ Normalize headers immediately
+    from app.backend import formats
+
+    # 1️⃣ Decode once, with the encoding picked from the file's prefix
+    text, encoding = charset.decode(contents)
+    lines = text.splitlines()
+
+    # Known vendor layouts skip detection entirely
+    fmt = formats.registry.resolve(formats.fingerprint(contents), lines, encoding, detect_text_format)
+
+    # Rebuild clean stream
+    stream = io.StringIO("\n".join(lines[fmt.header_index:]))
+
+    reader = csv.DictReader(stream, delimiter=fmt.delimiter)
+
+    # Normalize headers immediately
     reader.fieldnames = [normalize_key(h) for h in reader.fieldnames]
+    reader.is_soho = fmt.is_soho
+
+    logger.info("Normalized headers: %s", reader.fieldnames)
+
+    return reader
+
+
+STREAM_PREFIX_BYTES = 1024 * 1024  # encoding and format detection input, as for chunked uploads
+STREAM_BLOCK_CHARS = 256 * 1024
+LINE_BREAKS = "\r\n\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"  # what str.splitlines splits on
+
+
+def split_lines(text: str, final: bool = False) -> tuple[list[str], str]:
+    """
+    Complete lines of `text`, split as str.splitlines splits them, and the
+    unfinished tail to prepend to the next block (none once `final`).
+    """
+    parts = text.splitlines(keepends=True)
+    pending = ""
+    if parts and not final:
+        last = parts[-1]
+        # Incomplete line, or a "\r" whose "\n" may be in the next block
+        if last[-1] not in LINE_BREAKS or last.endswith("\r"):
+            pending = parts.pop()
+    return [part.rstrip(LINE_BREAKS) for part in parts], pending
+
+
+def iter_text_lines(stream) -> Iterator[str]:
+    """Lines of a text stream, split as str.splitlines splits them, read block by block."""
+    pending = ""
+    while block := stream.read(STREAM_BLOCK_CHARS):
+        lines, pending = split_lines(pending + block)
+        yield from lines
+    yield from split_lines(pending, final=True)[0]
+
+
+def build_stream_reader(fileobj, filename: str | None = None) -> csv.DictReader | SheetDictReader:
+    """
+    `build_reader` over a binary file (plain bytes, rewound), parsing it as it
+    is read instead of decoding the whole file into memory first. Text files
+    are detected from a STREAM_PREFIX_BYTES prefix. XLSX workbooks are
+    compressed and read by openpyxl's streaming reader, so they are loaded
+    as is.
+    """
+    from app.backend import formats
+
+    prefix = fileobj.read(STREAM_PREFIX_BYTES)
+    if prefix[:4] == b"PK\x03\x04" or is_xlsx(b"", filename):
+        return build_reader(prefix + fileobj.read(), filename)
+
+    encoding = charset.detect_encoding(prefix)
+    head = charset.incremental_decoder(encoding).decode(prefix).splitlines()
+    if len(prefix) == STREAM_PREFIX_BYTES and head:
+        head.pop()  # may be cut off
+    fmt = formats.registry.resolve(formats.fingerprint(prefix), head, encoding, detect_text_format)
+
+    fileobj.seek(0)
+    lines = iter_text_lines(io.TextIOWrapper(fileobj, encoding=encoding, errors=charset.FALLBACK_ERRORS, newline=""))
+    for _ in range(fmt.header_index):
+        next(lines, None)
+
+    reader = csv.DictReader((line + "\n" for line in lines), delimiter=fmt.delimiter)
+    reader.fieldnames = [normalize_key(h) for h in reader.fieldnames or []]
+    reader.is_soho = fmt.is_soho
 
     logger.info("Normalized headers: %s", reader.fieldnames)
 
@@ -311,6 +542,11 @@ def infer_pricing_unit(row: Dict, product_type: str) -> str:
     return "EA"
 
 
+def extract_sf_per_carton(row: Dict) -> float | None:
+    """SF per carton, only from columns that state it in SF (see unit_cost.py)."""
+    return parse_numeric(get_any(row, SF_PER_CARTON_FIELDS)) or None
+
+
 def extract_carton_quantity(row: Dict) -> str | float:
     """
     Extract carton/sheet quantity intelligently.
@@ -546,54 +782,79 @@ def resolve_manufacturer(row: Dict) -> str:
 # ---------------- IMPORT CSV --------------------------------
 # ============================================================
 
-@router.post("/import/csv")
-async def import_b2b_csv(file: UploadFile, db: Session = Depends(get_db)):
-    contents = await file.read()
-    reader = build_reader(contents)
-    
-    # Check if this is a Soho price list
-    is_soho = is_soho_pricelist(reader.fieldnames or [])
-    logger.info(f"Is Soho pricelist: {is_soho}")
+def import_product_fields(row: Dict, is_soho: bool) -> Dict:
+    """Product column values for one normalized vendor row (vendor excluded)."""
+    product_type = resolve_product_type(row)
 
-    count = 0
+    # Handle pricing based on pricelist type
+    if is_soho:
+        pricing_unit, price = extract_soho_pricing(row)
+    else:
+        price = parse_price(get_any(row, ["price", "cut cost", "base price", "distributor cost multiplier"]))
+        pricing_unit = infer_pricing_unit(row, product_type)
 
-    for raw_row in reader:
-        row = normalize_row(raw_row)
+    style = get_any(row, ["description", "style", "pattern", "name", "item description"]) or ""
 
-        vendor_name = resolve_manufacturer(row) or "Unknown Vendor"
+    return {
+        "sku": get_any(row, ["sku", "ikey", "code", "item #"]) or "",
+        "style": style,
+        "color": extract_soho_color(style) if is_soho else get_any(row, ["color", "colour"]) or "",
+        "product_type": product_type,
+        "pricing_unit": pricing_unit,
+        "price": price,
+        # B2B "Width/Quant-Carton": roll width, or a carton quantity that may be pieces
+        "width": parse_numeric(extract_carton_quantity(row)) or None,
+        "sf_per_carton": extract_sf_per_carton(row),
+    }
 
-        vendor = db.query(models.Vendor).filter_by(name=vendor_name).first()
-        if not vendor:
-            vendor = models.Vendor(name=vendor_name)
-            db.add(vendor)
-            db.commit()
-            db.refresh(vendor)
 
-        product_type = resolve_product_type(row)
+@router.post("/import/csv")
+async def import_b2b_csv(
+    file: UploadFile,
+    mode: str = Form("append"),
+    dedupe: str = Form(DEFAULT_DEDUPE_POLICY),
+    dedupe_key: str = Form(DEFAULT_DEDUPE_KEY),
+):
+    """
+    Import a vendor price list.
 
-        # Handle pricing based on pricelist type
-        if is_soho:
-            pricing_unit, price = extract_soho_pricing(row)
-        else:
-            price = parse_price(get_any(row, ["price", "cut cost", "base price", "distributor cost multiplier"]))
-            pricing_unit = infer_pricing_unit(row, product_type)
-
-        product = models.Product(
-            sku=get_any(row, ["sku", "ikey", "code", "item #"]) or "",
-            style=get_any(row, ["description", "style", "pattern", "name", "item description"]) or "",
-            color=extract_soho_color(get_any(row, ["description", "style", "pattern", "name", "item description"]) or "") if is_soho else get_any(row, ["color", "colour"]) or "",
-            product_type=product_type,
-            pricing_unit=pricing_unit,
-            price=price,
-            vendor_id=vendor.id,
-        )
+    - `append` (default): add rows to the existing catalog.
+    - `replace`: stage the rows, validate them, then atomically swap them in for
+      every vendor present in the file.
 
-        db.add(product)
-        count += 1
+    Repeated rows (same `dedupe_key`, manufacturer+SKU by default) are kept
+    unless `dedupe` asks to resolve them: first, last, lowest-cost or error.
+    """
+    if mode not in catalog_import.IMPORT_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(catalog_import.IMPORT_MODES)}")
+    policy, key_fields = parse_dedupe_options(dedupe, dedupe_key)
 
-    db.commit()
+    contents = await compression.read_upload(file)
+    # Parsing is CPU-bound: run it off the event loop so light requests keep being served
+    reader = await profiling.to_thread(build_reader, contents, compression.plain_name(file.filename))
+    
+    # Check if this is a Soho price list
+    is_soho = reader.is_soho
+    logger.info(f"Is Soho pricelist: {is_soho}")
+
+    def parsed_rows():
+        for raw_row in reader:
+            row = normalize_row(raw_row)
+            vendor_name = resolve_manufacturer(row) or "Unknown Vendor"
+            yield vendor_name, import_product_fields(row, is_soho)
 
-    return {"status": "✅ B2B CSV imported successfully", "imported": count}
+    # Parse and convert here; only the database writes go through the writer queue
+    dedupe_stage = catalog_import.import_deduplicator(policy, key_fields)
+    rows = await profiling.to_thread(lambda: list(dedupe_stage.apply(parsed_rows())))
+
+    result = await catalog_import.write_products(rows, mode)
+
+    return {
+        "status": "✅ B2B CSV imported successfully",
+        "mode": mode,
+        **result,
+        "duplicates_removed": dedupe_stage.removed,
+    }
 
 
 # ============================================================
@@ -604,62 +865,222 @@ async def import_b2b_csv(file: UploadFile, db: Session = Depends(get_db)):
 async def preview_convert_to_b2b(
     file: UploadFile,
     manufacturer: str = Form(None),
-    force_manufacturer: bool = Form(False)
+    force_manufacturer: bool = Form(False),
+    dedupe: str = Form(DEFAULT_DEDUPE_POLICY),
+    dedupe_key: str = Form(DEFAULT_DEDUPE_KEY),
 ):
-    contents = await file.read()
-    reader = build_reader(contents)
-    
-    # Check if this is a Soho price list
-    is_soho = is_soho_pricelist(reader.fieldnames or [])
-    logger.info(f"Is Soho pricelist: {is_soho}")
+    policy, key_fields = parse_dedupe_options(dedupe, dedupe_key)
+    contents = await compression.read_upload(file)
+
+    def build_preview():
+        reader = build_reader(contents, compression.plain_name(file.filename))
+
+        # Check if this is a Soho price list
+        is_soho = reader.is_soho
+        logger.info(f"Is Soho pricelist: {is_soho}")
+
+        out = []
+
+        for raw_row in reader:
+            row = normalize_row(raw_row)
+
+            original_manuf = resolve_manufacturer(row)
+
+            if manufacturer:
+                manuf = manufacturer.strip() if force_manufacturer else original_manuf or manufacturer.strip()
+            else:
+                manuf = original_manuf
+
+            product_type = resolve_product_type(row)
+
+            # Handle pricing based on pricelist type
+            if is_soho:
+                pricing_unit, cut_cost = extract_soho_pricing(row)
+            else:
+                cut_cost = get_any(row, ["price", "cut cost", "base price", "retail price"]) or ""
+                pricing_unit = infer_pricing_unit(row, product_type)
+
+            # Extract color based on pricelist type
+            if is_soho:
+                style_name = get_any(row, ["description", "style", "pattern", "name", "item description"]) or ""
+                color_name = extract_soho_color(style_name)
+            else:
+                style_name = get_any(row, ["description", "style", "pattern", "name", "item description"]) or ""
+                color_name = get_any(row, ["color", "colour"]) or ""
+
+            out.append({
+                "~~Manufacturer": manuf,
+                "Style Name": style_name,
+                "Color Name": color_name,
+                "SKU": get_any(row, ["sku", "ikey", "code", "item #"]) or "",
+                "Product Type": product_type,
+                "Pricing Unit": pricing_unit,
+                "Cut Cost": cut_cost,
+                "Weight": extract_weight(row),
+                "Width/Quant-Carton": extract_carton_quantity(row),
+                "Cost/SF": cost_per_sf(
+                    parse_numeric(cut_cost) or None, pricing_unit,
+                    parse_numeric(extract_carton_quantity(row)) or None, extract_sf_per_carton(row),
+                ),
+            })
+
+        dedupe_stage = b2b_deduplicator(policy, key_fields)
+        out = list(dedupe_stage.apply(out))
+
+        return {"already_b2b": False, "rows_preview": out[:200], "duplicates_removed": dedupe_stage.removed}
+
+    # CPU-bound: off the event loop so light requests keep being served
+    return await profiling.to_thread(build_preview)
 
-    out = []
 
-    for raw_row in reader:
-        row = normalize_row(raw_row)
+# ============================================================
+# ---------------- CONVERT -----------------------------------
+# ============================================================
 
-        original_manuf = resolve_manufacturer(row)
+B2B_HEADERS = [
+    "~~Manufacturer","Style Name","Style Number","Color Name","Color Number","SKU",
+    "Product Type","Pricing Unit","Cut Cost","Roll Cost","Width/Quant-Carton","Backing",
+    "Retail Price","Is Promo","Start Promo Date","End Promo Date","Promo Cut Cost","Promo Roll Cost",
+    "Is Dropped","Retail Formula","Display Tags","Comments","Private Style","Private Color","Weight",
+    "Custom","Style UX","Style CARE","Color CARE","Display Online","Freight","Picture 1 URL","Barcode"
+]
+
+
+def clean_output_value(v):
+    if isinstance(v, str):
+        return v.replace("'", "").replace('"', "")
+    return v
+
+
+def convert_row(row: Dict, is_soho: bool, manufacturer: str | None, force_manufacturer: bool) -> Dict:
+    """Convert one normalized vendor row into a B2B output row."""
+    original_manuf = resolve_manufacturer(row)
+
+    if manufacturer:
+        manuf = manufacturer.strip() if force_manufacturer else original_manuf or manufacturer.strip()
+    else:
+        manuf = original_manuf
+
+    product_type = resolve_product_type(row)
+
+    # Handle pricing based on pricelist type
+    if is_soho:
+        pricing_unit, cut_cost = extract_soho_pricing(row)
+    else:
+        # Standard pricing extraction
+        cut_cost_raw = get_any(row, ["price", "cut cost", "base price", "distributor cost multiplier"]) or ""
+        cut_cost = parse_numeric(cut_cost_raw)
+        pricing_unit = infer_pricing_unit(row, product_type)
+
+    # If single price provided, use it for both cut and roll cost
+    roll_cost = cut_cost
+
+    # Extract color based on pricelist type
+    style_name = get_any(row, ["description", "style", "pattern", "name", "item description"]) or ""
+    if is_soho:
+        color_name = extract_soho_color(style_name)
+    else:
+        color_name = get_any(row, ["color", "colour"]) or ""
+
+    output_row = {
+        "~~Manufacturer": manuf or "Unknown Vendor",
+        "Style Name": style_name,
+        "Style Number": "",
+        "Color Name": color_name,
+        "Color Number": get_any(row, ["color number", "part / color #"]) or "",
+        "SKU": get_any(row, ["sku", "ikey", "code", "item #"]) or "",
+        "Product Type": product_type,
+        "Pricing Unit": pricing_unit,
+        "Cut Cost": cut_cost,
+        "Roll Cost": roll_cost,
+        "Width/Quant-Carton": parse_numeric(extract_carton_quantity(row)),
+        "Backing": "",
+        "Retail Price": extract_retail_price(row, product_type),
+        "Is Promo": 0,
+        "Start Promo Date": "",
+        "End Promo Date": "",
+        "Promo Cut Cost": "",
+        "Promo Roll Cost": "",
+        "Is Dropped": 0,
+        "Retail Formula": "",
+        "Display Tags": 0,
+        "Comments": "",
+        "Private Style": "",
+        "Private Color": "",
+        "Weight": parse_numeric(extract_weight(row)),
+        "Custom": "",
+        "Style UX": "",
+        "Style CARE": "",
+        "Color CARE": "",
+        "Display Online": 0,
+        "Freight": "",
+        "Picture 1 URL": "",
+        "Barcode": "",
+    }
 
-        if manufacturer:
-            manuf = manufacturer.strip() if force_manufacturer else original_manuf or manufacturer.strip()
-        else:
-            manuf = original_manuf
+    # Clean single and double quotes from string values only
+    return {k: clean_output_value(v) if isinstance(v, str) else v for k, v in output_row.items()}
 
-        product_type = resolve_product_type(row)
 
-        # Handle pricing based on pricelist type
-        if is_soho:
-            pricing_unit, cut_cost = extract_soho_pricing(row)
-        else:
-            cut_cost = get_any(row, ["price", "cut cost", "base price", "retail price"]) or ""
-            pricing_unit = infer_pricing_unit(row, product_type)
+# Dedupe key field -> B2B output column
+B2B_DEDUPE_COLUMNS = {
+    "manufacturer": "~~Manufacturer",
+    "sku": "SKU",
+    "style": "Style Name",
+    "color": "Color Name",
+    "product_type": "Product Type",
+    "pricing_unit": "Pricing Unit",
+}
 
-        # Extract color based on pricelist type
-        if is_soho:
-            style_name = get_any(row, ["description", "style", "pattern", "name", "item description"]) or ""
-            color_name = extract_soho_color(style_name)
-        else:
-            style_name = get_any(row, ["description", "style", "pattern", "name", "item description"]) or ""
-            color_name = get_any(row, ["color", "colour"]) or ""
-        
-        out.append({
-            "~~Manufacturer": manuf,
-            "Style Name": style_name,
-            "Color Name": color_name,
-            "SKU": get_any(row, ["sku", "ikey", "code", "item #"]) or "",
-            "Product Type": product_type,
-            "Pricing Unit": pricing_unit,
-            "Cut Cost": cut_cost,
-            "Weight": extract_weight(row),
-            "Width/Quant-Carton": extract_carton_quantity(row),
-        })
 
-    return {"already_b2b": False, "rows_preview": out[:200]}
+def b2b_deduplicator(policy: str, key_fields: list[str]) -> Deduplicator:
+    """Deduplicator over B2B-shaped rows (convert output and preview rows)."""
+    columns = [B2B_DEDUPE_COLUMNS[f] for f in key_fields]
+    return Deduplicator(
+        policy,
+        key_of=lambda r: [r.get(c) for c in columns],
+        cost_of=lambda r: r.get("Cut Cost"),
+    )
 
 
-# ============================================================
-# ---------------- CONVERT -----------------------------------
-# ============================================================
+def convert_contents(
+    contents: bytes,
+    manufacturer: str | None = None,
+    force_manufacturer: bool = False,
+    source_name: str | None = None,
+    dedupe_policy: str = "none",
+    dedupe_fields: list[str] | None = None,
+) -> tuple[str, int, int]:
+    """
+    Run a raw vendor file (CSV or XLSX) through the B2B pipeline.
+    Returns (csv_text, row_count, duplicates_removed).
+    """
+    reader = build_reader(contents, source_name)
+
+    # Check if this is a Soho price list
+    is_soho = reader.is_soho
+    logger.info(f"Is Soho pricelist: {is_soho}")
+
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=B2B_HEADERS)
+    writer.writeheader()
+
+    dedupe = b2b_deduplicator(dedupe_policy, dedupe_fields or ["manufacturer", "sku"])
+    rows = (
+        convert_row(normalize_row(raw_row), is_soho, manufacturer, force_manufacturer)
+        for raw_row in reader
+    )
+
+    count = 0
+    for output_row in dedupe.apply(rows):
+        writer.writerow(output_row)
+        count += 1
+
+    if dedupe.removed:
+        logger.info(f"Removed {dedupe.removed} duplicate rows ({dedupe_policy})")
+
+    return output.getvalue(), count, dedupe.removed
+
 
 @router.post("/convert-to-b2b")
 async def convert_to_b2b(
@@ -667,120 +1088,364 @@ async def convert_to_b2b(
     manufacturer: str = Form(None),
     force_manufacturer: bool = Form(False),
     filename: str = Form(None),
+    dedupe: str = Form(DEFAULT_DEDUPE_POLICY),
+    dedupe_key: str = Form(DEFAULT_DEDUPE_KEY),
+    compress: str = Form(None),
+    accept_encoding: str = Header(None),
 ):
-    contents = await file.read()
-    reader = build_reader(contents)
-    
-    # Check if this is a Soho price list
-    is_soho = is_soho_pricelist(reader.fieldnames or [])
-    logger.info(f"Is Soho pricelist: {is_soho}")
+    """
+    Convert a vendor price list (CSV or XLSX, optionally .gz/.zst) to the B2B
+    CSV layout. `compress=gzip` returns a .csv.gz file; otherwise the CSV is
+    gzip-encoded for clients that accept it (see compression.py).
+    """
+    policy, key_fields = parse_dedupe_options(dedupe, dedupe_key)
+    delivery = compression.negotiate(compress, accept_encoding)
+    contents = await compression.read_upload(file)
+    csv_text, _, removed = await profiling.to_thread(
+        convert_contents, contents, manufacturer, force_manufacturer,
+        compression.plain_name(file.filename), policy, key_fields,
+    )
 
-    headers = [
-        "~~Manufacturer","Style Name","Style Number","Color Name","Color Number","SKU",
-        "Product Type","Pricing Unit","Cut Cost","Roll Cost","Width/Quant-Carton","Backing",
-        "Retail Price","Is Promo","Start Promo Date","End Promo Date","Promo Cut Cost","Promo Roll Cost",
-        "Is Dropped","Retail Formula","Display Tags","Comments","Private Style","Private Color","Weight",
-        "Custom","Style UX","Style CARE","Color CARE","Display Online","Freight","Picture 1 URL","Barcode"
-    ]
+    return compression.csv_response(
+        iter([csv_text]), safe_filename(filename), delivery, {"X-Duplicates-Removed": str(removed)}
+    )
 
-    def clean_output_value(v):
-        if isinstance(v, str):
-            return v.replace("'", "").replace('"', "")
-        return v
 
-    output_rows = []
+# ============================================================
+# ---------------- BATCH CONVERT -----------------------------
+# ============================================================
 
-    for raw_row in reader:
-        row = normalize_row(raw_row)
+BATCH_MAX_WORKERS = int(os.getenv("B2B_BATCH_WORKERS", "0")) or (os.cpu_count() or 2)
+BATCH_MAX_FILES = int(os.getenv("B2B_BATCH_MAX_FILES", "200"))
 
-        original_manuf = resolve_manufacturer(row)
+_batch_pool: "ProcessPoolExecutor | None" = None
 
-        if manufacturer:
-            manuf = manufacturer.strip() if force_manufacturer else original_manuf or manufacturer.strip()
-        else:
-            manuf = original_manuf
 
-        product_type = resolve_product_type(row)
+def get_batch_pool() -> "ProcessPoolExecutor":
+    """
+    Worker pool is created on first use and shared by all batch requests.
+    Workers are spawned, not forked: a forked child would inherit this
+    process's pooled SQLite connections (the format registry and the writer
+    thread use the database), and SQLite connections must not cross a fork.
+    """
+    global _batch_pool
+    if _batch_pool is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
 
-        # Handle pricing based on pricelist type
-        if is_soho:
-            pricing_unit, cut_cost = extract_soho_pricing(row)
-        else:
-            # Standard pricing extraction
-            cut_cost_raw = get_any(row, ["price", "cut cost", "base price", "distributor cost multiplier"]) or ""
-            cut_cost = parse_numeric(cut_cost_raw)
-            pricing_unit = infer_pricing_unit(row, product_type)
-        
-        # If single price provided, use it for both cut and roll cost
-        roll_cost = cut_cost
+        _batch_pool = ProcessPoolExecutor(
+            max_workers=BATCH_MAX_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _batch_pool
+
+
+def _convert_batch_job(
+    name: str,
+    contents: bytes,
+    manufacturer: str | None,
+    force_manufacturer: bool,
+    dedupe_policy: str,
+    dedupe_fields: list[str],
+) -> dict:
+    """Runs inside a pool worker; never raises so one bad file cannot fail the batch."""
+    started = time.perf_counter()
+    try:
+        csv_text, rows, removed = convert_contents(
+            contents, manufacturer, force_manufacturer, name, dedupe_policy, dedupe_fields
+        )
+        error = None
+    except HTTPException as e:
+        csv_text, rows, removed, error = "", 0, 0, str(e.detail)
+    except Exception as e:
+        logger.exception("Batch conversion failed for %s", name)
+        csv_text, rows, removed, error = "", 0, 0, str(e)
+    return {
+        "source": name,
+        "rows": rows,
+        "duplicates_removed": removed,
+        "seconds": round(time.perf_counter() - started, 4),
+        "error": error,
+        "csv": csv_text,
+    }
 
-        # Extract color based on pricelist type
-        style_name = get_any(row, ["description", "style", "pattern", "name", "item description"]) or ""
-        if is_soho:
-            color_name = extract_soho_color(style_name)
+
+def expand_batch_uploads(uploads: list[tuple[str, bytes, str | None]]) -> list[tuple[str, bytes, str | None]]:
+    """Flatten uploaded zip archives into their member files, keeping the archive's manufacturer override."""
+    jobs = []
+    for name, contents, manuf in uploads:
+        if name.lower().endswith(".zip") or (contents[:4] == b"PK\x03\x04" and not is_xlsx(contents, name)):
+            try:
+                archive = zipfile.ZipFile(io.BytesIO(contents))
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail=f"Invalid zip archive: {name}")
+            with archive:
+                for info in archive.infolist():
+                    base = info.filename.rsplit("/", 1)[-1]
+                    if info.is_dir() or not base or base.startswith(".") or info.filename.startswith("__MACOSX/"):
+                        continue
+                    jobs.append((compression.plain_name(base), compression.decompress(archive.read(info)), manuf))
         else:
-            color_name = get_any(row, ["color", "colour"]) or ""
-        
-        output_row = {
-            "~~Manufacturer": manuf or "Unknown Vendor",
-            "Style Name": style_name,
-            "Style Number": "",
-            "Color Name": color_name,
-            "Color Number": get_any(row, ["color number", "part / color #"]) or "",
-            "SKU": get_any(row, ["sku", "ikey", "code", "item #"]) or "",
-            "Product Type": product_type,
-            "Pricing Unit": pricing_unit,
-            "Cut Cost": cut_cost,
-            "Roll Cost": roll_cost,
-            "Width/Quant-Carton": parse_numeric(extract_carton_quantity(row)),
-            "Backing": "",
-            "Retail Price": extract_retail_price(row, product_type),
-            "Is Promo": 0,
-            "Start Promo Date": "",
-            "End Promo Date": "",
-            "Promo Cut Cost": "",
-            "Promo Roll Cost": "",
-            "Is Dropped": 0,
-            "Retail Formula": "",
-            "Display Tags": 0,
-            "Comments": "",
-            "Private Style": "",
-            "Private Color": "",
-            "Weight": parse_numeric(extract_weight(row)),
-            "Custom": "",
-            "Style UX": "",
-            "Style CARE": "",
-            "Color CARE": "",
-            "Display Online": 0,
-            "Freight": "",
-            "Picture 1 URL": "",
-            "Barcode": "",
-        }
-
-        # Clean single and double quotes from string values only
-        output_row = {k: clean_output_value(v) if isinstance(v, str) else v for k, v in output_row.items()}
-
-        output_rows.append(output_row)
+            jobs.append((name, contents, manuf))
+    return jobs
 
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=headers)
-    writer.writeheader()
-    writer.writerows(output_rows)
-    output.seek(0)
+
+@router.post("/convert-batch")
+async def convert_batch_to_b2b(
+    files: list[UploadFile],
+    manufacturers: list[str] = Form(None),
+    force_manufacturer: bool = Form(False),
+    filename: str = Form(None),
+    dedupe: str = Form(DEFAULT_DEDUPE_POLICY),
+    dedupe_key: str = Form(DEFAULT_DEDUPE_KEY),
+):
+    """
+    Convert many vendor files in one request.
+
+    - `files` may be CSV/XLSX price lists (optionally .gz/.zst) or zip archives of price lists.
+    - `manufacturers` is matched to `files` by position; leave an entry empty for no override.
+    - Files are converted concurrently on a bounded process pool, so wall time tracks the
+      largest file rather than the sum of all files.
+    - Returns a zip of B2B CSVs plus `manifest.json` with per-file row counts and timings.
+    """
+    policy, key_fields = parse_dedupe_options(dedupe, dedupe_key)
+    overrides = manufacturers or []
+    uploads = []
+    for i, upload in enumerate(files):
+        manuf = overrides[i].strip() if i < len(overrides) and overrides[i] else None
+        name = compression.plain_name(upload.filename) or f"file_{i + 1}.csv"
+        uploads.append((name, await compression.read_upload(upload), manuf))
+
+    jobs = expand_batch_uploads(uploads)
+    if not jobs:
+        raise HTTPException(status_code=400, detail="No files to convert")
+    if len(jobs) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files in batch (max {BATCH_MAX_FILES})")
+
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    pool = get_batch_pool()
+    results = await asyncio.gather(*[
+        loop.run_in_executor(pool, _convert_batch_job, name, contents, manuf, force_manufacturer, policy, key_fields)
+        for name, contents, manuf in jobs
+    ])
+    wall_seconds = round(time.perf_counter() - started, 4)
+
+    archive_file = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+    manifest = []
+    used_names: set[str] = set()
+
+    with zipfile.ZipFile(archive_file, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for result in results:
+            csv_text = result.pop("csv")
+            entry = dict(result, output=None)
+            if result["error"] is None:
+                stem = result["source"].rsplit(".", 1)[0]
+                out_name = safe_filename(f"{stem}_b2b")
+                n = 1
+                while out_name in used_names:
+                    n += 1
+                    out_name = safe_filename(f"{stem}_b2b_{n}")
+                used_names.add(out_name)
+                archive.writestr(out_name, csv_text)
+                entry["output"] = out_name
+            manifest.append(entry)
+
+        archive.writestr("manifest.json", json.dumps({
+            "files": manifest,
+            "total_rows": sum(m["rows"] for m in manifest),
+            "duplicates_removed": sum(m["duplicates_removed"] for m in manifest),
+            "failed": sum(1 for m in manifest if m["error"]),
+            "workers": BATCH_MAX_WORKERS,
+            "wall_seconds": wall_seconds,
+        }, indent=2))
+
+    logger.info("Batch converted %d files in %.2fs", len(manifest), wall_seconds)
+
+    archive_file.seek(0)
+
+    def iter_archive():
+        try:
+            while chunk := archive_file.read(64 * 1024):
+                yield chunk
+        finally:
+            archive_file.close()
+
+    out_name = re.sub(r"[^\w\-\.]", "_", (filename or "converted_b2b").strip())
+    if not out_name.lower().endswith(".zip"):
+        out_name += ".zip"
 
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f'attachment; filename="{safe_filename(filename)}"'}
+        iter_archive(),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{out_name}"'}
+    )
+
+# ============================================================
+# ---------------- FORMAT REGISTRY ---------------------------
+# ============================================================
+
+@router.get("/formats")
+def list_vendor_formats():
+    """Stored vendor file layouts plus registry hit/miss statistics."""
+    from app.backend import formats
+    return {"stats": formats.registry.stats(), "formats": formats.registry.list()}
+
+
+@router.delete("/formats")
+def clear_vendor_formats():
+    from app.backend import formats
+    removed = formats.registry.invalidate()
+    return {"message": "Format registry cleared", "removed": removed}
+
+
+@router.delete("/formats/{fingerprint}")
+def delete_vendor_format(fingerprint: str):
+    from app.backend import formats
+    removed = formats.registry.invalidate(fingerprint)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Format not found")
+    return {"message": "Format removed", "removed": removed}
+
+
+# ============================================================
+# ---------------- DIFF --------------------------------------
+# ============================================================
+
+def diff_rows(reader) -> Iterator[DiffRow]:
+    """Vendor rows through the import normalization, as diff join rows."""
+    for raw_row in reader:
+        row = normalize_row(raw_row)
+        fields = import_product_fields(row, reader.is_soho)
+        yield DiffRow(
+            sku=str(fields["sku"]),
+            manufacturer=resolve_manufacturer(row),
+            style=str(fields["style"]),
+            color=str(fields["color"]),
+            product_type=str(fields["product_type"]),
+            pricing_unit=str(fields["pricing_unit"]),
+            price=fields["price"],
+        )
+
+
+@router.post("/diff")
+async def diff_price_lists(
+    old: UploadFile,
+    new: UploadFile,
+    min_change_pct: float = Form(0.0),
+    include_unchanged: bool = Form(False),
+    filename: str = Form(None),
+    compress: str = Form(None),
+    accept_encoding: str = Header(None),
+):
+    """
+    Compare a vendor's previous and new price lists by SKU and stream the
+    added, removed and price-changed rows as CSV (with absolute and percentage
+    deltas). `min_change_pct` hides smaller price moves.
+
+    Neither list is held in memory: uploads stay in their spooled files
+    (gzip/zstd ones are inflated to a temporary file) and their rows are
+    parsed as the diff consumes them (see build_stream_reader and
+    catalog_diff.py). XLSX workbooks are the exception and are loaded whole.
+    """
+    delivery = compression.negotiate(compress, accept_encoding)
+    # Open both files up front so unreadable input fails before streaming starts
+    old_file = await compression.spool_upload(old)
+    new_file = await compression.spool_upload(new)
+    old_reader = await profiling.to_thread(build_stream_reader, old_file, compression.plain_name(old.filename))
+    new_reader = await profiling.to_thread(build_stream_reader, new_file, compression.plain_name(new.filename))
+    diff = CatalogDiff(min_change_pct=min_change_pct, include_unchanged=include_unchanged)
+
+    def body():
+        try:
+            records = diff.records(diff_rows(old_reader), diff_rows(new_reader))
+            yield from catalog_export.stream_csv(DIFF_HEADERS, records, lambda r: r)
+        finally:
+            old_file.close()
+            new_file.close()
+        logger.info(f"Diff {old.filename} -> {new.filename}: {asdict(diff.stats)}")
+
+    # The rows are parsed as the body streams, in the threadpool
+    return compression.csv_response(
+        profiling.iterate_profiled(body()), safe_filename(filename, "price_list_diff.csv"), delivery
     )
 
+
+# ============================================================
+# ---------------- EXPORT CSV --------------------------------
+# ============================================================
+
+def product_to_b2b(row) -> Dict:
+    """Map a catalog row (products joined to vendors) onto the B2B column layout."""
+    blank, flag = catalog_export.blank, catalog_export.flag
+    return {
+        "~~Manufacturer": row.vendor_name or "Unknown Vendor",
+        "Style Name": blank(row.style),
+        "Style Number": "",
+        "Color Name": blank(row.color),
+        "Color Number": "",
+        "SKU": blank(row.sku),
+        "Product Type": blank(row.product_type),
+        "Pricing Unit": blank(row.pricing_unit),
+        "Cut Cost": blank(row.price),
+        "Roll Cost": blank(row.price),
+        "Width/Quant-Carton": blank(row.width),
+        "Backing": blank(row.backing),
+        "Retail Price": blank(row.retail_price),
+        "Is Promo": flag(row.is_promo),
+        "Start Promo Date": blank(row.start_promo_date),
+        "End Promo Date": blank(row.end_promo_date),
+        "Promo Cut Cost": blank(row.promo_cut_cost),
+        "Promo Roll Cost": blank(row.promo_roll_cost),
+        "Is Dropped": flag(row.is_dropped),
+        "Retail Formula": blank(row.retail_formula),
+        "Display Tags": flag(row.display_tags),
+        "Comments": blank(row.comments),
+        "Private Style": blank(row.private_style),
+        "Private Color": blank(row.private_color),
+        "Weight": blank(row.weight),
+        "Custom": blank(row.custom),
+        "Style UX": blank(row.style_ux),
+        "Style CARE": blank(row.style_care),
+        "Color CARE": blank(row.color_care),
+        "Display Online": flag(row.display_online),
+        "Freight": blank(row.freight),
+        "Picture 1 URL": blank(row.picture_url),
+        "Barcode": blank(row.barcode),
+    }
+
+
+@router.get("/export/csv")
+def export_b2b_csv(
+    vendor: list[str] = Query(None),
+    product_type: list[str] = Query(None),
+    filename: str = Query(None),
+    compress: str = Query(None),
+    accept_encoding: str = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream the catalog in the same 33-column layout as /b2b/convert-to-b2b.
+    `vendor` (name) and `product_type` may be repeated to filter. `compress=gzip`
+    returns a .csv.gz file (see compression.py).
+    """
+    delivery = compression.negotiate(compress, accept_encoding)
+    stmt = catalog_export.catalog_query(vendor, product_type)
+    rows = catalog_export.iter_catalog(db, stmt)
+
+    return compression.csv_response(
+        catalog_export.stream_csv(B2B_HEADERS, rows, product_to_b2b),
+        safe_filename(filename, "b2b_export.csv"), delivery,
+    )
+
+
 # ============================================================
 # ---------------- EXPORT JSON -------------------------------
 # ============================================================
 
 @router.get("/export/json")
 def export_b2b_json(db: Session = Depends(get_db)):
-    products = db.query(models.Product).all()
+    # Load vendors with the products: lazy `p.vendor` was one SELECT per vendor
+    products = db.query(models.Product).options(joinedload(models.Product.vendor)).all()
     return {
         "products": [
             {
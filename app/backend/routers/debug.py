@@ -0,0 +1,94 @@
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.backend import profiling
+from app.backend.admission import admission
+from app.backend.analytics import analytics
+from app.backend.cache import cache
+from app.backend.debug_auth import require_debug_token
+from app.backend.lookup import product_lookup
+from app.backend.query_stats import query_stats
+from app.backend.snapshot import catalog_snapshot
+from app.backend.writer import coordinator
+
+# Every route here exposes internals or changes worker state: all need the debug token
+router = APIRouter(prefix="/debug", tags=["Debug"], dependencies=[Depends(require_debug_token)])
+
+
+@router.get("/writer")
+def get_writer_stats():
+    """Write coordinator queue depth, batching and wait times."""
+    return coordinator.stats()
+
+
+@router.get("/admission")
+def get_admission_stats():
+    """Heavy-request slots, in-flight bytes, queue depth, rejections and queue wait times (this worker only)."""
+    return admission.stats()
+
+
+@router.get("/cache")
+def get_cache_stats():
+    """Read-through cache hit rates and sizes (this worker only)."""
+    return cache.stats()
+
+
+@router.delete("/cache")
+def clear_cache():
+    """Drop this worker's cached reads."""
+    cache.clear()
+    return {"message": "Cache cleared"}
+
+
+@router.get("/analytics")
+def get_analytics_stats():
+    """Catalog analytics version and cached / incremental / full refresh counts (this worker only)."""
+    return analytics.stats()
+
+
+@router.get("/snapshot")
+def get_snapshot_stats():
+    """Catalog snapshot size, memory and rebuild/patch counts (this worker only)."""
+    return catalog_snapshot.stats()
+
+
+@router.get("/queries")
+def get_query_stats():
+    """SQL statements and time per route, N+1 hits and the newest slow queries (this worker only)."""
+    return query_stats.stats()
+
+
+@router.get("/lookup")
+def get_lookup_stats():
+    """Barcode / vendor+SKU index size, rebuilds and index vs SQL lookups (this worker only)."""
+    return product_lookup.stats()
+
+
+# ---------------- PROFILES ----------------
+
+@router.get("/profiles")
+def list_profiles():
+    """Stored request profiles, newest first."""
+    return profiling.list_profiles()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str, limit: int = Query(profiling.TOP_FUNCTIONS, ge=1)):
+    """Request info and the hottest functions by self time."""
+    path = profiling.profile_path(profile_id, ".json")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    summary = json.loads(path.read_text())
+    summary["hot_functions"] = summary["hot_functions"][:limit]
+    return summary
+
+
+@router.get("/profiles/{profile_id}/download")
+def download_profile(profile_id: str):
+    """Raw pstats dump (open with snakeviz or `python -m pstats`)."""
+    path = profiling.profile_path(profile_id, ".prof")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
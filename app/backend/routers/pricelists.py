@@ -1,7 +1,203 @@
-from fastapi import APIRouter
+import time
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.backend import database, models, pricing, schemas
+from app.backend.writer import coordinator
 
 router = APIRouter(prefix="/pricelists", tags=["Price Lists"])
 
-@router.get("/")
-def get_pricelists():
-    return {"message": "Price list endpoints placeholder"}
+WRITE_CHUNK_SIZE = 5000
+DELETE_CHUNK_SIZE = 500  # stays under SQLite's bound-parameter limit
+
+
+def get_db():
+    db = database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_pricelist_or_404(db: Session, pricelist_id: int) -> models.PriceList:
+    pricelist = db.get(models.PriceList, pricelist_id)
+    if not pricelist:
+        raise HTTPException(status_code=404, detail="Price list not found")
+    return pricelist
+
+
+def check_formula(formula: str) -> None:
+    try:
+        pricing.compile_formula(formula)
+    except pricing.FormulaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def chunks(rows: list, size: int = WRITE_CHUNK_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+@router.get("/", response_model=list[schemas.PriceList])
+def get_pricelists(db: Session = Depends(get_db)):
+    return db.query(models.PriceList).all()
+
+
+@router.post("/", response_model=schemas.PriceList)
+def create_pricelist(pricelist: schemas.PriceListCreate, db: Session = Depends(get_db)):
+    check_formula(pricelist.formula)
+    db_pricelist = models.PriceList(**pricelist.dict())
+    db.add(db_pricelist)
+    try:
+        db.commit()
+    except:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Price list with this name already exists")
+    db.refresh(db_pricelist)
+    return db_pricelist
+
+
+@router.get("/{pricelist_id}", response_model=schemas.PriceList)
+def get_pricelist(pricelist_id: int, db: Session = Depends(get_db)):
+    return get_pricelist_or_404(db, pricelist_id)
+
+
+@router.delete("/{pricelist_id}", status_code=204)
+def delete_pricelist(pricelist_id: int, db: Session = Depends(get_db)):
+    pricelist = get_pricelist_or_404(db, pricelist_id)
+    db.execute(delete(models.PriceListItem).where(models.PriceListItem.price_list_id == pricelist.id))
+    db.delete(pricelist)
+    db.commit()
+
+
+@router.post("/{pricelist_id}/generate")
+def generate_pricelist(pricelist_id: int, full: bool = False, db: Session = Depends(get_db)):
+    """
+    Compute retail prices for every product in the list's scope.
+
+    Only products whose cost, freight or effective formula changed since the
+    last run are recomputed; pass `full=true` to recompute everything.
+    A product's own `retail_formula` overrides the list formula when
+    `use_product_formula` is set.
+    """
+    pricelist = get_pricelist_or_404(db, pricelist_id)
+    check_formula(pricelist.formula)
+    started = time.perf_counter()
+
+    Item = models.PriceListItem
+    Product = models.Product
+
+    # Previously computed inputs, keyed by product
+    cached = {
+        product_id: (cost, freight, formula)
+        for product_id, cost, freight, formula in db.execute(
+            select(Item.product_id, Item.cost, Item.freight, Item.formula)
+            .where(Item.price_list_id == pricelist.id)
+        )
+    }
+
+    stmt = select(Product.id, Product.price, Product.freight, Product.retail_formula)
+    if pricelist.vendor_id is not None:
+        stmt = stmt.where(Product.vendor_id == pricelist.vendor_id)
+    if pricelist.product_type:
+        stmt = stmt.where(Product.product_type == pricelist.product_type)
+
+    pending = []   # (product_id, formula, cost, freight)
+    seen = set()
+    bad_formulas = {}
+    for product_id, cost, freight, product_formula in db.execute(stmt.execution_options(yield_per=WRITE_CHUNK_SIZE)):
+        seen.add(product_id)
+        formula = pricelist.formula
+        if pricelist.use_product_formula and product_formula and str(product_formula).strip():
+            formula = str(product_formula).strip()
+            if formula not in bad_formulas:
+                try:
+                    pricing.compile_formula(formula)
+                    bad_formulas[formula] = False
+                except pricing.FormulaError:
+                    bad_formulas[formula] = True
+            if bad_formulas[formula]:
+                formula = pricelist.formula
+
+        if not full and cached.get(product_id) == (cost, freight, formula):
+            continue
+        pending.append((product_id, formula, cost, freight))
+
+    prices = pricing.evaluate_grouped(pending)
+
+    inserts, updates = [], []
+    for product_id, formula, cost, freight in pending:
+        row = {
+            "price_list_id": pricelist.id,
+            "product_id": product_id,
+            "cost": cost,
+            "freight": freight,
+            "formula": formula,
+            "retail_price": prices[product_id],
+        }
+        (updates if product_id in cached else inserts).append(row)
+
+    removed = [pid for pid in cached if pid not in seen]
+
+    coordinator.submit(write_pricelist_items, pricelist.id, inserts, updates, removed).result()
+    db.commit()  # end the read transaction so later reads see the writer's commit
+
+    return {
+        "price_list_id": pricelist.id,
+        "products": len(seen),
+        "computed": len(pending),
+        "unchanged": len(seen) - len(pending),
+        "removed": len(removed),
+        "failed": sum(1 for pid, *_ in pending if prices[pid] is None),
+        "invalid_product_formulas": sorted(f for f, bad in bad_formulas.items() if bad),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def write_pricelist_items(db: Session, pricelist_id: int, inserts: list, updates: list, removed: list) -> None:
+    """Writer job: apply the computed price list difference."""
+    Item = models.PriceListItem
+    for chunk in chunks(inserts):
+        db.execute(insert(Item), chunk)
+    for chunk in chunks(updates):
+        db.execute(update(Item), chunk)
+    for chunk in chunks(removed, DELETE_CHUNK_SIZE):
+        db.execute(
+            delete(Item)
+            .where(Item.price_list_id == pricelist_id, Item.product_id.in_(chunk))
+            .execution_options(synchronize_session=False)
+        )
+    db.execute(
+        update(models.PriceList)
+        .where(models.PriceList.id == pricelist_id)
+        .values(generated_at=datetime.utcnow())
+    )
+
+
+@router.get("/{pricelist_id}/items")
+def get_pricelist_items(
+    pricelist_id: int,
+    limit: int = Query(500, le=10000),
+    offset: int = 0,
+    db: Session = Depends(get_db),
+):
+    pricelist = get_pricelist_or_404(db, pricelist_id)
+    Item = models.PriceListItem
+    Product = models.Product
+    rows = db.execute(
+        select(Product.id, Product.sku, Product.style, Product.color, Product.pricing_unit,
+               Item.cost, Item.freight, Item.formula, Item.retail_price)
+        .join(Product, Product.id == Item.product_id)
+        .where(Item.price_list_id == pricelist.id)
+        .order_by(Product.id)
+        .limit(limit)
+        .offset(offset)
+    )
+    return {
+        "price_list_id": pricelist.id,
+        "generated_at": pricelist.generated_at,
+        "items": [dict(r._mapping) for r in rows],
+    }
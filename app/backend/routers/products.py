@@ -1,6 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import itertools
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy import and_, case, delete, false, func, insert, or_, select, true, update
 from sqlalchemy.orm import Session
 from app.backend import database, models, schemas
+from app.backend.analytics import analytics
+from app.backend.cache import PRODUCTS, cache
+from app.backend.lookup import product_lookup
+from app.backend.snapshot import catalog_snapshot
+from app.backend.unit_cost import COST_INPUTS, cost_per_sf_sql, with_cost_per_sf
+from app.backend.writer import coordinator
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
@@ -20,17 +32,333 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
     except:
         db.rollback()
         raise HTTPException(status_code=400, detail="Product already exists")
+    cache.invalidate(PRODUCTS)
+    analytics.mark_dirty(vendor_ids=[db_product.vendor_id])
     db.refresh(db_product)
+    catalog_snapshot.added(db_product)
+    product_lookup.added(db_product)
     return db_product
 
 @router.get("/")
-def list_products(db: Session = Depends(get_db)):
-    return db.query(models.Product).all()
+def list_products(
+    vendor_id: int | None = None,
+    product_type: str | None = None,
+    sku: list[str] | None = Query(None),
+    db: Session = Depends(get_db),
+):
+    """All products, optionally filtered. Served from the catalog snapshot when CATALOG_SNAPSHOT=1."""
+    if catalog_snapshot.enabled:
+        # Records are already JSON-ready; skip the per-object encoder
+        return JSONResponse(catalog_snapshot.products(vendor_id, product_type, sku))
+    query = db.query(models.Product)
+    if vendor_id is not None:
+        query = query.filter(models.Product.vendor_id == vendor_id)
+    if product_type is not None:
+        query = query.filter(models.Product.product_type == product_type)
+    if sku:
+        query = query.filter(models.Product.sku.in_(sku))
+    return query.order_by(models.Product.id).all()
+
+# ---------- Effective price ----------
+
+SKU_LOOKUP_CHUNK = 5000
+CACHED_SKU_LOOKUP_MAX = 50  # small UI lookups are cached; bulk lookups go straight to SQL
+
+
+def promo_active_on(day: date):
+    """SQL condition: the product's promo window covers `day` (open-ended bounds allowed)."""
+    P = models.Product
+    return and_(
+        P.is_promo == true(),
+        or_(P.start_promo_date.is_(None), P.start_promo_date <= day),
+        or_(P.end_promo_date.is_(None), P.end_promo_date >= day),
+    )
+
+
+def effective_price_query(day: date):
+    P = models.Product
+    active = promo_active_on(day)
+    return select(
+        P.id.label("product_id"),
+        P.vendor_id,
+        P.sku,
+        P.pricing_unit,
+        P.price,
+        case((active, True), else_=False).label("promo_active"),
+        case((and_(active, P.promo_cut_cost.isnot(None)), P.promo_cut_cost), else_=P.price).label("cut_cost"),
+        case((and_(active, P.promo_roll_cost.isnot(None)), P.promo_roll_cost), else_=P.price).label("roll_cost"),
+        case((active, P.end_promo_date), else_=None).label("promo_ends"),
+    )
+
+
+def resolve_effective_prices(db: Session, skus: list[str], day: date, vendor_id: int | None = None) -> list[dict]:
+    """Resolve cut/roll cost for many SKUs with one indexed IN query per chunk."""
+    P = models.Product
+    unique = list(dict.fromkeys(s for s in skus if s))
+    out = []
+    for i in range(0, len(unique), SKU_LOOKUP_CHUNK):
+        stmt = effective_price_query(day).where(P.sku.in_(unique[i:i + SKU_LOOKUP_CHUNK]))
+        if vendor_id is not None:
+            stmt = stmt.where(P.vendor_id == vendor_id)
+        out.extend(dict(r._mapping) for r in db.execute(stmt))
+    return out
+
+
+@router.get("/effective-price", response_model=list[schemas.EffectivePrice])
+def get_effective_prices(
+    sku: list[str] = Query(...),
+    on: date | None = None,
+    vendor_id: int | None = None,
+    db: Session = Depends(get_db),
+):
+    """Current cut/roll cost for the given SKUs, honouring promo windows active on `on` (default today)."""
+    day = on or date.today()
+    if len(sku) > CACHED_SKU_LOOKUP_MAX:
+        return resolve_effective_prices(db, sku, day, vendor_id)
+    return cache.get_or_load(
+        PRODUCTS, ("effective-price", frozenset(sku), day, vendor_id),
+        lambda: resolve_effective_prices(db, sku, day, vendor_id),
+    )
+
+
+@router.post("/effective-price", response_model=list[schemas.EffectivePrice])
+def post_effective_prices(query: schemas.EffectivePriceQuery, db: Session = Depends(get_db)):
+    """Bulk form of GET /products/effective-price for thousands of SKUs."""
+    return resolve_effective_prices(db, query.skus, query.on or date.today(), query.vendor_id)
+
+
+@router.get("/promotions", response_model=list[schemas.EffectivePrice])
+def get_active_promotions(on: date | None = None, vendor_id: int | None = None, db: Session = Depends(get_db)):
+    """Every product whose promo window covers `on` (default today)."""
+    day = on or date.today()
+    stmt = effective_price_query(day).where(promo_active_on(day))
+    if vendor_id is not None:
+        stmt = stmt.where(models.Product.vendor_id == vendor_id)
+    return cache.get_or_load(
+        PRODUCTS, ("promotions", day, vendor_id),
+        lambda: [dict(r._mapping) for r in db.execute(stmt)],
+    )
+
+
+# ---------- Unit cost ----------
+
+@router.get("/by-cost-per-sf")
+def list_products_by_cost_per_sf(
+    product_type: str | None = None,
+    vendor_id: int | None = None,
+    min_cost: float | None = Query(None, ge=0),
+    max_cost: float | None = Query(None, ge=0),
+    descending: bool = False,
+    include_dropped: bool = False,
+    limit: int = Query(50, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Products ordered by normalized_cost_per_sf (see unit_cost.py), cheapest first.
+    Products without a per-SF cost are left out. With product_type given this is a
+    range scan of (product_type, normalized_cost_per_sf).
+    """
+    P = models.Product
+    cost = P.normalized_cost_per_sf
+    stmt = select(P).where(cost.isnot(None))
+    if product_type is not None:
+        stmt = stmt.where(P.product_type == product_type)
+    if vendor_id is not None:
+        stmt = stmt.where(P.vendor_id == vendor_id)
+    if min_cost is not None:
+        stmt = stmt.where(cost >= min_cost)
+    if max_cost is not None:
+        stmt = stmt.where(cost <= max_cost)
+    if not include_dropped:
+        stmt = stmt.where(or_(P.is_dropped.is_(None), P.is_dropped == false()))
+    order = cost.desc() if descending else cost.asc()
+    return db.scalars(stmt.order_by(order, P.id).limit(limit).offset(offset)).all()
+
+
+# ---------- Point-of-sale lookup ----------
+# async: an index hit is a couple of dict reads, so skip the threadpool hop;
+# only the SQL fallback (index rebuilding) is sent to a thread.
+
+async def find_products(barcodes: list[str], skus: list[tuple[int, str]]) -> tuple[list, list]:
+    found = product_lookup.find(barcodes, skus)
+    if found is None:
+        found = await asyncio.to_thread(product_lookup.find_in_db, barcodes, skus)
+    return found
+
+
+@router.get("/lookup")
+async def lookup_product(barcode: str | None = None, vendor_id: int | None = None, sku: str | None = None):
+    """One product by `barcode`, or by `vendor_id` and `sku` (see lookup.py)."""
+    if barcode is not None:
+        (product,), _ = await find_products([barcode], [])
+    elif vendor_id is not None and sku is not None:
+        _, (product,) = await find_products([], [(vendor_id, sku)])
+    else:
+        raise HTTPException(status_code=400, detail="Give barcode, or vendor_id and sku")
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    # Records are already JSON-ready; skip the per-object encoder
+    return JSONResponse(product)
+
+
+@router.post("/lookup")
+async def lookup_products(query: schemas.ProductLookupBatch):
+    """
+    Many lookups in one call: {"barcodes": [...], "skus": [{"vendor_id": 3, "sku": "..."}]}.
+    Answers in request order, with "product": null for codes that match nothing.
+    """
+    skus = [(item.vendor_id, item.sku) for item in query.skus]
+    by_barcode, by_sku = await find_products(query.barcodes, skus)
+    return JSONResponse({
+        "barcodes": [{"barcode": code, "product": product} for code, product in zip(query.barcodes, by_barcode)],
+        "skus": [
+            {"vendor_id": vendor_id, "sku": sku, "product": product}
+            for (vendor_id, sku), product in zip(skus, by_sku)
+        ],
+    })
+
+
+# ---------- Bulk mutations ----------
+# Each request runs as one transaction on the writer: one set-based statement,
+# or one per chunk of a long `ids`/`skus` list.
+
+BULK_FILTER_CHUNK = 500  # values per IN list, well under any bound-parameter limit
+
+
+def chunked(values: list) -> list[list]:
+    values = list(dict.fromkeys(values))  # a repeated value must not land in two chunks
+    return [values[i:i + BULK_FILTER_CHUNK] for i in range(0, len(values), BULK_FILTER_CHUNK)]
+
+
+def product_filter_clauses(f: schemas.ProductFilter) -> list:
+    """WHERE clauses, one per statement; each matching product falls under exactly one."""
+    P = models.Product
+    conditions, in_lists = [], []
+    if f.ids is not None:
+        in_lists.append([P.id.in_(chunk) for chunk in chunked(f.ids)])
+    if f.skus is not None:
+        in_lists.append([P.sku.in_(chunk) for chunk in chunked(f.skus)])
+    for name in ("vendor_id", "product_type", "pricing_unit", "is_dropped", "is_promo"):
+        value = getattr(f, name)
+        if value is not None:
+            conditions.append(getattr(P, name) == value)
+    if not conditions and not in_lists:
+        raise HTTPException(
+            status_code=400,
+            detail="filter needs at least one condition (DELETE /products/clear-all removes everything)",
+        )
+    return [and_(*conditions, *chunks) for chunks in itertools.product(*in_lists)]
+
+
+def bulk_changed(vendor_ids: set | None) -> None:
+    """After a bulk commit: drop cached reads; None means the vendors touched are unknown."""
+    cache.invalidate(PRODUCTS)
+    if vendor_ids is None:
+        analytics.mark_all_dirty()
+    else:
+        analytics.mark_dirty(vendor_ids=vendor_ids)
+    catalog_snapshot.mark_stale()
+    product_lookup.mark_stale()
+
+
+def filtered_vendor_ids(f: schemas.ProductFilter) -> set | None:
+    return None if f.vendor_id is None else {f.vendor_id}
+
+
+def _bulk_insert(db: Session, rows: list[dict]) -> int:
+    if rows:
+        db.execute(insert(models.Product), [with_cost_per_sf(row) for row in rows])
+    return len(rows)
+
+
+def _bulk_update(db: Session, wheres: list, values: dict) -> int:
+    if any(name in values for name in COST_INPUTS):
+        values = {**values, "normalized_cost_per_sf": cost_per_sf_sql(models.Product.__table__, values)}
+    updated = 0
+    for where in wheres:
+        stmt = update(models.Product).where(where).values(values).execution_options(synchronize_session=False)
+        updated += db.execute(stmt).rowcount
+    return updated
+
+
+def _bulk_delete(db: Session, wheres: list) -> int:
+    Item = models.PriceListItem
+    deleted = 0
+    for where in wheres:
+        db.execute(
+            delete(Item)
+            .where(Item.product_id.in_(select(models.Product.id).where(where)))
+            .execution_options(synchronize_session=False)
+        )
+        stmt = delete(models.Product).where(where).execution_options(synchronize_session=False)
+        deleted += db.execute(stmt).rowcount
+    return deleted
+
+
+@router.post("/bulk")
+def bulk_create_products(products: list[schemas.ProductCreate]):
+    """Insert many products in one transaction."""
+    created = coordinator.submit(_bulk_insert, [p.dict() for p in products]).result()
+    bulk_changed({p.vendor_id for p in products})
+    return {"created": created}
+
+
+@router.patch("/bulk")
+def bulk_update_products(change: schemas.ProductBulkUpdate):
+    """
+    Update every product matching `filter`: write the fields given in `set` and/or
+    scale the price, e.g. {"filter": {"vendor_id": 3, "product_type": "CER"},
+    "adjust_price": {"multiply": 1.05}}.
+    """
+    wheres = product_filter_clauses(change.filter)
+    values = change.set.dict(exclude_unset=True)
+    adjust = change.adjust_price
+    if adjust is not None:
+        price = models.Product.price * adjust.multiply + adjust.add
+        values["price"] = func.round(price, adjust.round) if adjust.round is not None else price
+    if not values:
+        raise HTTPException(status_code=400, detail="Nothing to update: give `set` fields or `adjust_price`")
+
+    updated = coordinator.submit(_bulk_update, wheres, values).result()
+    vendor_ids = filtered_vendor_ids(change.filter)
+    if vendor_ids is not None and "vendor_id" in values:
+        vendor_ids.add(values["vendor_id"])  # products moved to another vendor
+    bulk_changed(vendor_ids)
+    return {"updated": updated}
+
+
+@router.post("/bulk/delete")
+def bulk_delete_products(request: schemas.ProductBulkDelete):
+    """Delete every product matching `filter` (e.g. {"filter": {"ids": [...]}})."""
+    deleted = coordinator.submit(_bulk_delete, product_filter_clauses(request.filter)).result()
+    bulk_changed(filtered_vendor_ids(request.filter))
+    return {"deleted": deleted}
+
+
+@router.get("/{product_id}")
+def get_product(product_id: int, db: Session = Depends(get_db)):
+    if catalog_snapshot.enabled:
+        product = catalog_snapshot.get(product_id)
+    else:
+        product = db.get(models.Product, product_id)
+    if product is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+
+def _delete_all_products(db: Session) -> int:
+    # Single set-based DELETE; no ORM session synchronization needed
+    db.execute(delete(models.PriceListItem).execution_options(synchronize_session=False))
+    return db.execute(delete(models.Product).execution_options(synchronize_session=False)).rowcount
 
 @router.delete("/clear-all")
-def clear_all_products(db: Session = Depends(get_db)):
-    db.query(models.Product).delete()
-    db.commit()
+def clear_all_products():
+    coordinator.submit(_delete_all_products).result()
+    cache.invalidate(PRODUCTS)
+    analytics.mark_all_dirty()
+    catalog_snapshot.mark_stale()
+    product_lookup.mark_stale()
     return {"message": "All products deleted successfully"}
 
 @router.delete("/{product_id}", status_code=204)
@@ -38,5 +366,11 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     product = db.query(models.Product).filter(models.Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    vendor_id = product.vendor_id
+    db.execute(delete(models.PriceListItem).where(models.PriceListItem.product_id == product_id))
     db.delete(product)
     db.commit()
+    cache.invalidate(PRODUCTS)
+    analytics.mark_dirty(vendor_ids=[vendor_id])
+    catalog_snapshot.removed(product_id)
+    product_lookup.removed(product_id)
@@ -1,9 +1,16 @@
 import csv
-from fastapi import APIRouter, UploadFile, Depends
+from fastapi import APIRouter, UploadFile, Depends, Form, Header, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.backend import database
 from app.backend import models
+from app.backend import catalog_export
+from app.backend import catalog_import
+from app.backend import charset
+from app.backend import compression
+from app.backend import profiling
+from app.backend.dedupe import DEFAULT_DEDUPE_KEY, DEFAULT_DEDUPE_POLICY, parse_dedupe_options
+from app.backend.routers.b2b_import_export import safe_filename
 
 router = APIRouter(prefix="/qfloors", tags=["QFloors Import/Export"])
 
@@ -15,31 +22,93 @@ def get_db():
         db.close()
 
 @router.post("/import")
-async def import_qfloors(file: UploadFile, db: Session = Depends(get_db)):
-    contents = await file.read()
-    lines = contents.decode().splitlines()
+async def import_qfloors(
+    file: UploadFile,
+    mode: str = Form("append"),
+    dedupe: str = Form(DEFAULT_DEDUPE_POLICY),
+    dedupe_key: str = Form(DEFAULT_DEDUPE_KEY),
+):
+    if mode not in catalog_import.IMPORT_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(catalog_import.IMPORT_MODES)}")
+    policy, key_fields = parse_dedupe_options(dedupe, dedupe_key)
+
+    contents = await compression.read_upload(file)
+    # Decoding and parsing are CPU-bound: keep them off the event loop
+    text, _ = await profiling.to_thread(charset.decode, contents)
+    lines = text.splitlines()
     reader = csv.DictReader(lines)
 
-    for row in reader:
-        vendor_name = row.get("Manufacturer")
-        vendor = db.query(models.Vendor).filter_by(name=vendor_name).first()
-        if not vendor:
-            vendor = models.Vendor(name=vendor_name)
-            db.add(vendor)
-            db.commit()
-            db.refresh(vendor)
-
-        product = models.Product(
-            sku=row["SKU"],
-            style=row.get("Style Name", ""),
-            color=row.get("Color Name", ""),
-            product_type=row.get("Product Type", ""),
-            pricing_unit=row.get("Pricing Unit", ""),
-            price=float(row.get("Price", 0.0)),
-            vendor_id=vendor.id
+    parsed_rows = (
+        (
+            row.get("Manufacturer"),
+            dict(
+                sku=row["SKU"],
+                style=row.get("Style Name", ""),
+                color=row.get("Color Name", ""),
+                product_type=row.get("Product Type", ""),
+                pricing_unit=row.get("Pricing Unit", ""),
+                price=float(row.get("Price", 0.0)),
+            ),
         )
-        db.add(product)
-    db.commit()
-    return {"status": "QFloors CSV imported"}
+        for row in reader
+    )
+
+    dedupe_stage = catalog_import.import_deduplicator(policy, key_fields)
+    rows = await profiling.to_thread(lambda: list(dedupe_stage.apply(parsed_rows)))
+
+    result = await catalog_import.write_products(rows, mode)
+
+    return {
+        "status": "QFloors CSV imported",
+        "mode": mode,
+        **result,
+        "duplicates_removed": dedupe_stage.removed,
+    }
+
+
+# Same columns /qfloors/import reads
+QFLOORS_HEADERS = [
+    "Manufacturer",
+    "Style Name",
+    "Color Name",
+    "SKU",
+    "Product Type",
+    "Pricing Unit",
+    "Price",
+]
+
+
+def product_to_qfloors(row) -> dict:
+    blank = catalog_export.blank
+    return {
+        "Manufacturer": row.vendor_name or "Unknown Vendor",
+        "Style Name": blank(row.style),
+        "Color Name": blank(row.color),
+        "SKU": blank(row.sku),
+        "Product Type": blank(row.product_type),
+        "Pricing Unit": blank(row.pricing_unit),
+        "Price": blank(row.price),
+    }
+
 
+@router.get("/export")
+def export_qfloors(
+    vendor: list[str] = Query(None),
+    filename: str = Query(None),
+    compress: str = Query(None),
+    accept_encoding: str = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream the catalog in the QFloors layout from a server-side cursor
+    (constant memory). `vendor` (name) may be repeated to filter.
+    `compress=gzip` returns a .csv.gz file (see compression.py).
+    """
+    delivery = compression.negotiate(compress, accept_encoding)
+    stmt = catalog_export.catalog_query(vendor)
+    rows = catalog_export.iter_catalog(db, stmt)
 
+    return compression.csv_response(
+        catalog_export.stream_csv(QFLOORS_HEADERS, rows, product_to_qfloors),
+        safe_filename(filename, "qfloors_export.csv"), delivery,
+    )
@@ -0,0 +1,390 @@
+# app/backend/routers/uploads.py
+"""
+Chunked, resumable uploads feeding the B2B convert/import pipeline.
+
+    POST   /b2b/uploads                    create (filename, purpose, options)
+    PUT    /b2b/uploads/{id}?offset=N      store a chunk (raw request body)
+    GET    /b2b/uploads/{id}               acknowledged offset and parse progress
+    POST   /b2b/uploads/{id}/finalize      run the conversion or import
+    DELETE /b2b/uploads/{id}               abort
+
+A chunk is acknowledged once it is on disk (see upload_store.py). After a
+dropped connection the client reads `received` and resumes from there.
+
+Parsing is pipelined with the upload. Once a chunk is stored, a background
+thread advances a per-upload ChunkParser over the new bytes. Encoding and
+format are detected as soon as the first 60 lines are in (see charset.py;
+header and delimiter detection look no further). Rows are then decoded
+incrementally, split into CSV records and converted while the rest of the
+file is still arriving, so finalize only has to parse the tail.
+
+gzip and zstd uploads are inflated chunk by chunk ahead of the parser (see
+compression.py), so a compressed upload is parsed while it arrives too.
+
+XLSX workbooks cannot be read before the zip directory at the end arrives,
+so they are parsed on finalize. A worker that receives a chunk for an upload
+it has not parsed catches up from the spool file.
+"""
+
+import asyncio
+import codecs
+import csv
+import io
+import logging
+import threading
+from typing import TYPE_CHECKING
+
+from fastapi import APIRouter, Form, Header, HTTPException, Query, Request
+
+from app.backend import catalog_import, charset, compression, upload_store
+from app.backend.dedupe import DEFAULT_DEDUPE_KEY, DEFAULT_DEDUPE_POLICY, parse_dedupe_options
+from app.backend.routers import b2b_import_export as b2b
+
+if TYPE_CHECKING:
+    from app.backend.formats import FileFormat
+
+router = APIRouter(prefix="/b2b/uploads", tags=["B2B Chunked Uploads"])
+
+logger = logging.getLogger("b2b_import_export")
+
+UPLOAD_PURPOSES = ("convert", "import")
+DETECT_LINES = 60  # find_header_row scans 50 lines, the delimiter sample 10 more
+DETECT_MAX_BYTES = 1024 * 1024
+CATCH_UP_BLOCK = 1024 * 1024
+CHUNK_SIZE_HINT = 4 * 1024 * 1024
+
+
+# ============================================================
+# ---------------- INCREMENTAL PARSER -------------------------
+# ============================================================
+
+class ChunkParser:
+    """
+    Turns the spooled bytes of one upload into converted rows, one block at a
+    time, with the same results as build_reader over the whole file.
+    """
+
+    def __init__(self, meta: dict):
+        self.upload_id = meta["upload_id"]
+        self.filename = compression.plain_name(meta.get("filename"))
+        self.purpose = meta["purpose"]
+        self.manufacturer = meta.get("manufacturer")
+        self.force_manufacturer = meta.get("force_manufacturer", False)
+        self.lock = threading.Lock()
+        self.error: Exception | None = None
+        self.parsed_offset = 0     # spool bytes consumed
+        self.head = bytearray()    # spool bytes held until compression is detected
+        self.compression: str | None = None  # "gzip", "zstd" or "none" once known
+        self.decompressor: compression.Decompressor | None = None
+        self.prefix = bytearray()  # bytes held until the encoding and format are known
+        self.deferred = False      # XLSX: parsed on finalize
+        self.fingerprint: str | None = None
+        self.encoding: str | None = None
+        self.decoder = None
+        self.fmt: "FileFormat | None" = None
+        self.pending = ""          # decoded text after the last complete line
+        self.line_no = 0
+        self.record: list[str] = []  # lines of a record whose quotes are still open
+        self.quotes = 0
+        self.fieldnames: list[str] | None = None
+        self.rows: list = []
+
+    # ---------- driving ----------
+
+    def advance(self, upto: int) -> None:
+        """Background step after a chunk is stored; errors are kept for finalize."""
+        try:
+            self.catch_up(upto, final=False)
+        except Exception as e:
+            logger.warning(f"Upload {self.upload_id}: parsing failed at byte {self.parsed_offset}: {e}")
+            self.error = e
+
+    def catch_up(self, upto: int, final: bool) -> None:
+        with self.lock:
+            if self.error is not None:
+                raise self.error
+            while self.parsed_offset < upto:
+                end = min(upto, self.parsed_offset + CATCH_UP_BLOCK)
+                self.feed(self.inflate(upload_store.read_range(self.upload_id, self.parsed_offset, end)))
+                self.parsed_offset = end
+            if final:
+                self.feed(self.inflate(b"", final=True), final=True)
+
+    def inflate(self, data: bytes, final: bool = False) -> bytes:
+        """Spool bytes to plain file bytes: decompressed for gzip/zstd uploads, else as is."""
+        if self.compression is None:
+            self.head += data
+            if len(self.head) < 4 and not final:
+                return b""
+            data, self.head = bytes(self.head), bytearray()
+            method = compression.detect(data[:4])
+            self.compression = method or "none"
+            if method:
+                self.decompressor = compression.Decompressor(method)
+        if self.decompressor is None:
+            return data
+        data = self.decompressor.decompress(data)
+        if final:
+            self.decompressor.finish()
+        return data
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        if self.deferred:
+            if final:
+                self._parse_whole_file()
+            return
+
+        if self.decoder is None:
+            self.prefix += data
+            if not self._prefix_complete(final):
+                return
+            data, self.prefix = bytes(self.prefix), bytearray()
+            from app.backend import formats  # loaded on first use (see b2b_import_export)
+            self.fingerprint = formats.fingerprint(data)
+            self.encoding = charset.detect_encoding(data)
+            self.decoder = charset.incremental_decoder(self.encoding)
+
+        self._consume_text(self.decoder.decode(data, final), final)
+
+    def _prefix_complete(self, final: bool) -> bool:
+        """True once enough leading bytes are buffered for encoding and format detection."""
+        if len(self.prefix) < 4 and not final:
+            return False
+        if self.prefix[:4] == b"PK\x03\x04" or b2b.is_xlsx(b"", self.filename):
+            self.deferred = True
+            if final:
+                self._parse_whole_file()
+            return False
+        return final or self.prefix.count(b"\n") >= DETECT_LINES or len(self.prefix) >= DETECT_MAX_BYTES
+
+    # ---------- rows ----------
+
+    def _consume_text(self, text: str, final: bool) -> None:
+        lines, self.pending = b2b.split_lines(self.pending + text, final)
+
+        if self.fmt is None:
+            from app.backend import formats
+            self.fmt = formats.registry.resolve(self.fingerprint, lines, self.encoding, b2b.detect_text_format)
+
+        records = []
+        for line in lines:
+            self.line_no += 1
+            if self.line_no <= self.fmt.header_index:
+                continue
+            self.record.append(line + "\n")
+            self.quotes += line.count('"')
+            if self.quotes % 2 == 0:
+                records.extend(self.record)
+                self.record, self.quotes = [], 0
+
+        if final and self.record:
+            records.extend(self.record)
+            self.record, self.quotes = [], 0
+
+        for cells in csv.reader(records, delimiter=self.fmt.delimiter):
+            if self.fieldnames is None:
+                self.fieldnames = [b2b.normalize_key(h) for h in cells]
+                logger.info("Normalized headers: %s", self.fieldnames)
+            elif cells:
+                self._handle(self._as_dict(cells), self.fmt.is_soho)
+
+    def _as_dict(self, cells: list[str]) -> dict:
+        """Same shape as csv.DictReader rows."""
+        row = dict(zip(self.fieldnames, cells))
+        if len(cells) > len(self.fieldnames):
+            row[None] = cells[len(self.fieldnames):]
+        else:
+            for key in self.fieldnames[len(cells):]:
+                row[key] = None
+        return row
+
+    def _handle(self, raw_row: dict, is_soho: bool) -> None:
+        row = b2b.normalize_row(raw_row)
+        if self.purpose == "convert":
+            self.rows.append(b2b.convert_row(row, is_soho, self.manufacturer, self.force_manufacturer))
+        else:
+            vendor_name = b2b.resolve_manufacturer(row) or "Unknown Vendor"
+            self.rows.append((vendor_name, b2b.import_product_fields(row, is_soho)))
+
+    def _parse_whole_file(self) -> None:
+        reader = b2b.build_reader(compression.decompress(upload_store.read_all(self.upload_id)), self.filename)
+        for raw_row in reader:
+            self._handle(raw_row, reader.is_soho)
+
+    def progress(self) -> dict:
+        if self.deferred:
+            detected = "deferred until finalize (xlsx)"
+        elif self.fmt is None:
+            detected = None
+        else:
+            detected = {
+                "header_index": self.fmt.header_index,
+                "delimiter": self.fmt.delimiter,
+                "encoding": self.fmt.encoding,
+                "format_type": self.fmt.format_type,
+            }
+        return {
+            "parsed_bytes": self.parsed_offset,
+            "compression": self.compression,
+            "rows_parsed": len(self.rows),
+            "format": detected,
+            "error": str(getattr(self.error, "detail", self.error)) if self.error else None,
+        }
+
+
+_parsers: dict[str, ChunkParser] = {}
+_parsers_lock = threading.Lock()
+
+
+def get_parser(meta: dict) -> ChunkParser:
+    with _parsers_lock:
+        parser = _parsers.get(meta["upload_id"])
+        if parser is None:
+            parser = _parsers[meta["upload_id"]] = ChunkParser(meta)
+        return parser
+
+
+def drop_upload(upload_id: str) -> None:
+    with _parsers_lock:
+        _parsers.pop(upload_id, None)
+    upload_store.remove(upload_id)
+
+
+def purge_expired() -> None:
+    """
+    Purge uploads untouched for UPLOAD_TTL_SECONDS, with this worker's parsers
+    for them. Parsers whose spool another worker purged or finalized go too.
+    """
+    upload_store.purge_expired()
+    with _parsers_lock:
+        for upload_id in [upload_id for upload_id in _parsers if not upload_store.exists(upload_id)]:
+            del _parsers[upload_id]
+
+
+# ============================================================
+# ---------------- ENDPOINTS ----------------------------------
+# ============================================================
+
+@router.post("")
+def create_upload(
+    filename: str = Form(...),
+    purpose: str = Form("convert"),
+    total_size: int = Form(None),
+    manufacturer: str = Form(None),
+    force_manufacturer: bool = Form(False),
+):
+    """
+    Start a chunked upload. `purpose` is `convert` (finalize returns the B2B
+    CSV) or `import` (finalize writes the rows to the catalog). The conversion
+    options are fixed here, so rows can be converted while chunks arrive.
+    """
+    if purpose not in UPLOAD_PURPOSES:
+        raise HTTPException(status_code=400, detail=f"purpose must be one of {', '.join(UPLOAD_PURPOSES)}")
+    if total_size is not None and not 0 <= total_size <= upload_store.UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {upload_store.UPLOAD_MAX_BYTES} bytes")
+
+    purge_expired()
+    meta = upload_store.create({
+        "filename": filename,
+        "purpose": purpose,
+        "total_size": total_size,
+        "manufacturer": manufacturer,
+        "force_manufacturer": force_manufacturer,
+    })
+    return {"upload_id": meta["upload_id"], "received": 0, "chunk_size_hint": CHUNK_SIZE_HINT}
+
+
+@router.put("/{upload_id}")
+async def put_chunk(upload_id: str, request: Request, offset: int = Query(..., ge=0)):
+    """Store the request body at `offset`. Retried chunks are acknowledged without rewriting."""
+    meta = upload_store.load(upload_id)
+    data = await request.body()
+    received = await asyncio.to_thread(upload_store.write_chunk, upload_id, offset, data)
+
+    # Parse the new bytes in the background; the ack does not wait for it
+    parser = get_parser(meta)
+    asyncio.get_running_loop().run_in_executor(None, parser.advance, received)
+
+    return {"upload_id": upload_id, "received": received, "total_size": meta.get("total_size")}
+
+
+@router.get("/{upload_id}")
+def get_upload(upload_id: str):
+    meta = upload_store.load(upload_id)
+    with _parsers_lock:
+        parser = _parsers.get(upload_id)
+    return {
+        "upload_id": upload_id,
+        "filename": meta.get("filename"),
+        "purpose": meta["purpose"],
+        "received": upload_store.received(upload_id),
+        "total_size": meta.get("total_size"),
+        "parse": parser.progress() if parser else None,
+    }
+
+
+@router.delete("/{upload_id}", status_code=204)
+def abort_upload(upload_id: str):
+    upload_store.load(upload_id)
+    drop_upload(upload_id)
+
+
+@router.post("/{upload_id}/finalize")
+async def finalize_upload(
+    upload_id: str,
+    mode: str = Form("append"),
+    dedupe: str = Form(DEFAULT_DEDUPE_POLICY),
+    dedupe_key: str = Form(DEFAULT_DEDUPE_KEY),
+    filename: str = Form(None),
+    compress: str = Form(None),
+    accept_encoding: str = Header(None),
+):
+    """
+    Parse whatever is left and hand the rows to the conversion (CSV download)
+    or import (`mode` append/replace) pipeline, then delete the upload.
+    `compress` / Accept-Encoding choose gzip output as for /b2b/convert-to-b2b.
+    """
+    meta = upload_store.load(upload_id)
+    policy, key_fields = parse_dedupe_options(dedupe, dedupe_key)
+    delivery = compression.negotiate(compress, accept_encoding)
+    if meta["purpose"] == "import" and mode not in catalog_import.IMPORT_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(catalog_import.IMPORT_MODES)}")
+
+    received = upload_store.received(upload_id)
+    total_size = meta.get("total_size")
+    if total_size is not None and received != total_size:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": f"Upload incomplete: {received} of {total_size} bytes", "received": received},
+        )
+
+    parser = get_parser(meta)
+    try:
+        await asyncio.to_thread(parser.catch_up, received, True)
+    except HTTPException:
+        drop_upload(upload_id)
+        raise
+
+    if meta["purpose"] == "import":
+        dedupe_stage = catalog_import.import_deduplicator(policy, key_fields)
+        rows = list(dedupe_stage.apply(parser.rows))
+        drop_upload(upload_id)
+        result = await catalog_import.write_products(rows, mode)
+        return {
+            "status": "✅ B2B CSV imported successfully",
+            "mode": mode,
+            **result,
+            "duplicates_removed": dedupe_stage.removed,
+        }
+
+    dedupe_stage = b2b.b2b_deduplicator(policy, key_fields)
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=b2b.B2B_HEADERS)
+    writer.writeheader()
+    writer.writerows(dedupe_stage.apply(parser.rows))
+    drop_upload(upload_id)
+
+    return compression.csv_response(
+        iter([output.getvalue()]), b2b.safe_filename(filename), delivery,
+        {"X-Duplicates-Removed": str(dedupe_stage.removed)},
+    )
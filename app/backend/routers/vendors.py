@@ -1,7 +1,13 @@
 # app/backend/routers/vendors.py
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 from app.backend import database, models, schemas
+from app.backend.analytics import analytics
+from app.backend.cache import PRODUCTS, VENDORS, cache
+from app.backend.lookup import product_lookup
+from app.backend.snapshot import catalog_snapshot
+from app.backend.writer import coordinator
 
 router = APIRouter(prefix="/vendors", tags=["Vendors"])
 
@@ -21,12 +27,29 @@ def create_vendor(vendor: schemas.VendorCreate, db: Session = Depends(get_db)):
     except:
         db.rollback()
         raise HTTPException(status_code=400, detail="Vendor with this name already exists")
+    cache.invalidate(VENDORS)
     db.refresh(db_vendor)
     return db_vendor
 
 @router.get("/", response_model=list[schemas.Vendor])
 def list_vendors(db: Session = Depends(get_db)):
-    return db.query(models.Vendor).all()
+    return cache.get_or_load(
+        VENDORS, "all",
+        lambda: [schemas.Vendor.from_orm(v).dict() for v in db.query(models.Vendor).all()],
+    )
+
+def _delete_all_vendors(db: Session) -> int:
+    return db.execute(delete(models.Vendor).execution_options(synchronize_session=False)).rowcount
+
+# Declared before /{vendor_id} so "clear-all" is not parsed as an id
+@router.delete("/clear-all")
+def clear_all_vendors():
+    coordinator.submit(_delete_all_vendors).result()
+    cache.invalidate(VENDORS, PRODUCTS)
+    analytics.mark_all_dirty()
+    catalog_snapshot.mark_stale()
+    product_lookup.mark_stale()
+    return {"message": "All vendors deleted successfully"}
 
 @router.delete("/{vendor_id}", status_code=204)
 def delete_vendor(vendor_id: int, db: Session = Depends(get_db)):
@@ -35,10 +58,10 @@ def delete_vendor(vendor_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Vendor not found")
     db.delete(vendor)
     db.commit()
+    cache.invalidate(VENDORS, PRODUCTS)
+    # The ORM delete unassigns the vendor's products (vendor_id = NULL)
+    analytics.mark_dirty(vendor_ids=[vendor_id, None])
+    catalog_snapshot.mark_stale()
+    product_lookup.mark_stale()
     return {"detail": "Vendor deleted successfully"}
 
-@router.delete("/clear-all")
-def clear_all_vendors(db: Session = Depends(get_db)):
-    db.query(models.Vendor).delete()
-    db.commit()
-    return {"message": "All vendors deleted successfully"}
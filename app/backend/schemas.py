@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, create_model
 from typing import Optional
-from datetime import date
+from datetime import date, datetime
 
 
 # ---------- Vendor Schemas ----------
@@ -37,7 +37,7 @@ class ProductBase(BaseModel):
     promo_cut_cost: Optional[float] = None
     promo_roll_cost: Optional[float] = None
     is_dropped: Optional[bool] = False
-    retail_formula: Optional[float] = None
+    retail_formula: Optional[str] = None
     display_tags: Optional[bool] = True
     comments: Optional[str] = None
     private_style: Optional[str] = None
@@ -51,6 +51,7 @@ class ProductBase(BaseModel):
     freight: Optional[float] = None
     picture_url: Optional[str] = None
     barcode: Optional[str] = None
+    sf_per_carton: Optional[float] = None
 
     vendor_id: Optional[int] = None
 
@@ -61,7 +62,99 @@ class ProductCreate(ProductBase):
 
 class Product(ProductBase):
     id: int
+    normalized_cost_per_sf: Optional[float] = None
     vendor: Optional[Vendor] = None
 
     class Config:
         orm_mode = True
+
+
+# ---------- Bulk Product Schemas ----------
+class ProductFilter(BaseModel):
+    """Conditions are ANDed; an unset field matches everything."""
+    ids: Optional[list[int]] = None
+    skus: Optional[list[str]] = None
+    vendor_id: Optional[int] = None
+    product_type: Optional[str] = None
+    pricing_unit: Optional[str] = None
+    is_dropped: Optional[bool] = None
+    is_promo: Optional[bool] = None
+
+
+class PriceAdjustment(BaseModel):
+    """price = round(price * multiply + add, round); NULL prices stay NULL."""
+    multiply: float = 1.0
+    add: float = 0.0
+    round: Optional[int] = 2
+
+
+# Every product field, all optional: only the fields sent are written
+ProductPatch = create_model(
+    "ProductPatch",
+    **{name: (Optional[field.outer_type_], None) for name, field in ProductBase.__fields__.items()},
+)
+
+
+class ProductBulkUpdate(BaseModel):
+    filter: ProductFilter
+    set: ProductPatch = ProductPatch()
+    adjust_price: Optional[PriceAdjustment] = None
+
+
+class ProductBulkDelete(BaseModel):
+    filter: ProductFilter
+
+
+# ---------- Effective Price Schemas ----------
+class EffectivePriceQuery(BaseModel):
+    skus: list[str]
+    on: Optional[date] = None
+    vendor_id: Optional[int] = None
+
+
+class EffectivePrice(BaseModel):
+    product_id: int
+    vendor_id: Optional[int] = None
+    sku: Optional[str] = None
+    pricing_unit: Optional[str] = None
+    price: Optional[float] = None
+    promo_active: bool
+    cut_cost: Optional[float] = None
+    roll_cost: Optional[float] = None
+    promo_ends: Optional[date] = None
+
+
+# ---------- Lookup Schemas ----------
+LOOKUP_BATCH_MAX = 1000
+
+
+class VendorSku(BaseModel):
+    vendor_id: int
+    sku: str
+
+
+class ProductLookupBatch(BaseModel):
+    barcodes: list[str] = Field(default_factory=list, max_items=LOOKUP_BATCH_MAX)
+    skus: list[VendorSku] = Field(default_factory=list, max_items=LOOKUP_BATCH_MAX)
+
+
+# ---------- Price List Schemas ----------
+class PriceListBase(BaseModel):
+    name: str
+    formula: str
+    vendor_id: Optional[int] = None
+    product_type: Optional[str] = None
+    use_product_formula: Optional[bool] = True
+
+
+class PriceListCreate(PriceListBase):
+    pass
+
+
+class PriceList(PriceListBase):
+    id: int
+    created_at: Optional[datetime] = None
+    generated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,379 @@
+# app/backend/snapshot.py
+"""
+Read-only, in-process columnar copy of the products table for hot reads
+(GET /products/ and product lookups). It is off unless CATALOG_SNAPSHOT=1.
+
+Each column is one typed array holding a single value per product. Floats,
+ints, booleans and dates are stored unboxed. Strings are dictionary-encoded:
+the array holds codes into the column's list of distinct values, so a pricing
+unit, product type or style shared by thousands of products is stored once.
+A product costs a few bytes per column instead of a full ORM object.
+
+Products are ordered by id, so a lookup is a binary search. Mutation paths
+keep the snapshot current after they commit:
+
+* `added(product)` appends a created product;
+* `removed(product_id)` tombstones a deleted one;
+* `mark_stale()` covers everything else (imports, clear-all, vendor deletes).
+  The next read then rebuilds the snapshot with one streamed SELECT. Patches
+  that arrive while a rebuild is running are replayed on the new copy.
+
+Another worker's product changes (CACHE_SYNC=db) also mark it stale.
+Records come out JSON-ready, with dates as ISO strings.
+"""
+
+import bisect
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+from datetime import date
+
+from sqlalchemy import Boolean, Date, Float, Integer, String, select
+
+from app.backend import database, models
+from app.backend.cache import PRODUCTS, cache
+
+logger = logging.getLogger("snapshot")
+
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", "").lower() in ("1", "true", "yes")
+SNAPSHOT_BUILD_CHUNK = 5000
+
+INT_NULL = -(2 ** 63)
+
+
+# ---------- columns ----------
+
+class FloatColumn:
+    """NaN marks NULL (SQLite stores NaN as NULL, so no real value collides)."""
+
+    def __init__(self):
+        self.values = array("d")
+
+    def append(self, value) -> None:
+        self.values.append(math.nan if value is None else value)
+
+    def extend(self, values: list) -> None:
+        self.values.extend([math.nan if v is None else v for v in values])
+
+    def get(self, i: int):
+        value = self.values[i]
+        return None if value != value else value
+
+    def take(self, rows: list[int]) -> list:
+        values = self.values
+        return [None if v != v else v for v in (values[i] for i in rows)]
+
+    def nbytes(self) -> int:
+        return self.values.itemsize * len(self.values)
+
+
+class IntColumn:
+    def __init__(self):
+        self.values = array("q")
+
+    def append(self, value) -> None:
+        self.values.append(INT_NULL if value is None else value)
+
+    def extend(self, values: list) -> None:
+        self.values.extend([INT_NULL if v is None else v for v in values])
+
+    def get(self, i: int):
+        value = self.values[i]
+        return None if value == INT_NULL else value
+
+    def take(self, rows: list[int]) -> list:
+        values = self.values
+        return [None if v == INT_NULL else v for v in (values[i] for i in rows)]
+
+    def nbytes(self) -> int:
+        return self.values.itemsize * len(self.values)
+
+
+class BoolColumn:
+    def __init__(self):
+        self.values = array("b")
+
+    def append(self, value) -> None:
+        self.values.append(-1 if value is None else int(bool(value)))
+
+    def extend(self, values: list) -> None:
+        self.values.extend([-1 if v is None else int(bool(v)) for v in values])
+
+    def get(self, i: int):
+        value = self.values[i]
+        return None if value < 0 else bool(value)
+
+    def take(self, rows: list[int]) -> list:
+        decoded = (False, True, None)  # index -1 is NULL
+        values = self.values
+        return [decoded[values[i]] for i in rows]
+
+    def nbytes(self) -> int:
+        return len(self.values)
+
+
+class DateColumn:
+    """Proleptic ordinals; 0 marks NULL."""
+
+    def __init__(self):
+        self.values = array("i")
+
+    def append(self, value) -> None:
+        self.values.append(value.toordinal() if value is not None else 0)
+
+    def extend(self, values: list) -> None:
+        self.values.extend([v.toordinal() if v is not None else 0 for v in values])
+
+    def get(self, i: int):
+        value = self.values[i]
+        return date.fromordinal(value).isoformat() if value else None
+
+    def take(self, rows: list[int]) -> list:
+        return [self.get(i) for i in rows]
+
+    def nbytes(self) -> int:
+        return self.values.itemsize * len(self.values)
+
+
+class StrColumn:
+    """Dictionary-encoded strings; code 0 is NULL."""
+
+    def __init__(self):
+        self.codes = array("I")
+        self.strings: list[str | None] = [None]
+        self.index: dict[str | None, int] = {None: 0}
+
+    def code(self, value) -> int:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def append(self, value) -> None:
+        self.codes.append(self.code(value))
+
+    def extend(self, values: list) -> None:
+        index, code = self.index, self.code
+        self.codes.extend([index[v] if v in index else code(v) for v in values])
+
+    def get(self, i: int):
+        return self.strings[self.codes[i]]
+
+    def take(self, rows: list[int]) -> list:
+        strings, codes = self.strings, self.codes
+        return [strings[codes[i]] for i in rows]
+
+    def nbytes(self) -> int:
+        return (self.codes.itemsize * len(self.codes)
+                + sys.getsizeof(self.strings) + sys.getsizeof(self.index)
+                + sum(sys.getsizeof(s) for s in self.strings if s is not None))
+
+
+COLUMN_TYPES = ((Boolean, BoolColumn), (Integer, IntColumn), (Float, FloatColumn), (Date, DateColumn), (String, StrColumn))
+
+
+def column_for(sql_type):
+    for sql_class, column_class in COLUMN_TYPES:
+        if isinstance(sql_type, sql_class):
+            return column_class()
+    raise TypeError(f"No snapshot column for {sql_type!r}")
+
+
+class _Table:
+    """One immutable-schema copy of the products table; rows are appended in id order."""
+
+    def __init__(self):
+        self.names = [c.name for c in models.Product.__table__.columns]
+        self.columns = {c.name: column_for(c.type) for c in models.Product.__table__.columns}
+        self.ids: IntColumn = self.columns["id"]
+        self.id_position = self.names.index("id")
+        self.alive = bytearray()
+        self.live = 0
+
+    def __len__(self) -> int:
+        return len(self.alive)
+
+    def append(self, row) -> bool:
+        """Add a row (mapping of column values); False if its id is not past the last one."""
+        ids = self.ids.values
+        if ids and row["id"] <= ids[-1]:
+            return False
+        for name in self.names:
+            if name != "id":
+                self.columns[name].append(row[name])
+        # ids, then alive: len(self) is len(alive), so readers never see a half-appended row
+        self.ids.append(row["id"])
+        self.alive.append(1)
+        self.live += 1
+        return True
+
+    def extend(self, rows: list) -> None:
+        """Bulk-append rows (tuples in `names` order, ids ascending past the last one)."""
+        for j, name in enumerate(self.names):
+            if name != "id":
+                self.columns[name].extend([row[j] for row in rows])
+        self.ids.extend([row[self.id_position] for row in rows])
+        self.alive.extend(b"\x01" * len(rows))  # last, as in append
+        self.live += len(rows)
+
+    def position(self, product_id: int) -> int | None:
+        ids = self.ids.values
+        i = bisect.bisect_left(ids, product_id, 0, len(self.alive))
+        if i < len(self.alive) and ids[i] == product_id and self.alive[i]:
+            return i
+        return None
+
+    def remove(self, product_id: int) -> None:
+        i = self.position(product_id)
+        if i is not None:
+            self.alive[i] = 0
+            self.live -= 1
+
+    def record(self, i: int) -> dict:
+        return {name: self.columns[name].get(i) for name in self.names}
+
+    def records(self, rows: list[int]) -> list[dict]:
+        """Records for many positions, decoded one column at a time."""
+        values = [self.columns[name].take(rows) for name in self.names]
+        return [dict(zip(self.names, record)) for record in zip(*values)]
+
+    def nbytes(self) -> int:
+        return len(self.alive) + sum(c.nbytes() for c in self.columns.values())
+
+
+# ---------- snapshot ----------
+
+class CatalogSnapshot:
+    def __init__(self, enabled: bool = CATALOG_SNAPSHOT):
+        self.enabled = enabled
+        self._lock = threading.Lock()        # table swap and patches
+        self._build_lock = threading.Lock()  # one rebuild at a time; other readers wait for it
+        self._table: _Table | None = None
+        self._stale = True
+        self._pending: list | None = None    # patches received while a rebuild runs
+        self.builds = 0
+        self.patches = 0
+        self.last_build_ms = 0.0
+
+    # ---------- mutation hooks (call after commit) ----------
+
+    def added(self, product) -> None:
+        if self.enabled:
+            self._patch(("add", {name: getattr(product, name) for name in models.Product.__table__.columns.keys()}))
+
+    def removed(self, product_id: int) -> None:
+        if self.enabled:
+            self._patch(("remove", product_id))
+
+    def mark_stale(self, *_) -> None:
+        with self._lock:
+            self._stale = True
+
+    # ---------- reads ----------
+
+    def get(self, product_id: int) -> dict | None:
+        table = self._current()
+        i = table.position(product_id)
+        return None if i is None else table.record(i)
+
+    def products(self, vendor_id: int | None = None, product_type: str | None = None,
+                 skus: list[str] | None = None) -> list[dict]:
+        """Live products in id order, optionally filtered (all filters must match)."""
+        table = self._current()
+        alive = table.alive
+        rows = [i for i in range(len(table)) if alive[i]]
+
+        if vendor_id is not None:
+            values = table.columns["vendor_id"].values
+            rows = [i for i in rows if values[i] == vendor_id]
+        if product_type is not None:
+            types = table.columns["product_type"]
+            code = types.index.get(product_type, -1)
+            rows = [i for i in rows if types.codes[i] == code]
+        if skus:
+            sku_column = table.columns["sku"]
+            codes = {sku_column.index[s] for s in skus if s in sku_column.index}
+            rows = [i for i in rows if sku_column.codes[i] in codes]
+
+        return table.records(rows)
+
+    def stats(self) -> dict:
+        with self._lock:
+            table, stale = self._table, self._stale
+        rows = table.live if table else 0
+        nbytes = table.nbytes() if table else 0
+        return {
+            "enabled": self.enabled,
+            "stale": stale,
+            "products": rows,
+            "tombstones": len(table) - rows if table else 0,
+            "bytes": nbytes,
+            "bytes_per_product": round(nbytes / rows, 1) if rows else None,
+            "builds": self.builds,
+            "patches": self.patches,
+            "last_build_ms": self.last_build_ms,
+        }
+
+    # ---------- internals ----------
+
+    def _patch(self, op: tuple) -> None:
+        with self._lock:
+            self.patches += 1
+            if self._pending is not None:
+                self._pending.append(op)
+            if self._table is not None and not self._stale:
+                self._apply(self._table, op)
+
+    def _apply(self, table: _Table, op: tuple) -> None:
+        kind, arg = op
+        if kind == "remove":
+            table.remove(arg)
+        elif table.position(arg["id"]) is None and not table.append(arg):
+            # An id at or below the last one (SQLite reused a deleted max id): rebuild
+            self._stale = True
+
+    def _current(self) -> _Table:
+        cache.poll()
+        with self._lock:
+            if not self._stale:
+                return self._table
+        with self._build_lock:
+            with self._lock:
+                if not self._stale:
+                    return self._table
+                self._stale = False
+                self._pending = []
+            try:
+                table = self._build()
+            except Exception:
+                with self._lock:
+                    self._stale, self._pending = True, None
+                raise
+            with self._lock:
+                for op in self._pending:
+                    self._apply(table, op)
+                self._table, self._pending = table, None
+                return table
+
+    def _build(self) -> _Table:
+        started = time.perf_counter()
+        table = _Table()
+        stmt = select(models.Product.__table__).order_by(models.Product.id)
+        with database.engine.connect() as conn:
+            result = conn.execution_options(yield_per=SNAPSHOT_BUILD_CHUNK).execute(stmt)
+            for rows in result.partitions():
+                table.extend(rows)
+        self.builds += 1
+        self.last_build_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Catalog snapshot rebuilt: {table.live} products, {table.nbytes()} bytes in {self.last_build_ms} ms")
+        return table
+
+
+catalog_snapshot = CatalogSnapshot()
+
+cache.on_remote_invalidate(lambda namespace: namespace == PRODUCTS and catalog_snapshot.mark_stale())
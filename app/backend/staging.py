@@ -0,0 +1,153 @@
+# app/backend/staging.py
+"""
+Atomic per-vendor catalog replacement.
+
+Imports in "replace" mode bulk-load their rows into `products_staging` under a
+batch id, validate them there, and then swap them into `products` for the
+affected vendors in one short transaction. Readers see either the old catalog
+or the new one, never a half-loaded one, and the write lock is only held for
+the DELETE + INSERT ... SELECT, not for parsing the file.
+"""
+
+import logging
+import time
+import uuid
+from typing import Iterable
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.backend import models
+
+logger = logging.getLogger("b2b_import_export")
+
+STAGING_CHUNK_SIZE = 5000
+
+staging = models.products_staging
+PRODUCT_COLUMNS = [c.name for c in models.Product.__table__.columns if c.name != "id"]
+
+# Core inserts skip ORM column defaults, so apply them explicitly when staging.
+PRODUCT_DEFAULTS = {
+    c.name: c.default.arg
+    for c in models.Product.__table__.columns
+    if c.default is not None and c.default.is_scalar
+}
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+def stage_products(db: Session, batch_id: str, rows: Iterable[dict]) -> int:
+    """Bulk insert product dicts into the staging table. Commits; returns rows staged."""
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append({**PRODUCT_DEFAULTS, **row, "batch_id": batch_id})
+        if len(chunk) >= STAGING_CHUNK_SIZE:
+            db.execute(insert(staging), chunk)
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(staging), chunk)
+        count += len(chunk)
+    db.commit()
+    return count
+
+
+def discard_batch(db: Session, batch_id: str, new_vendor_ids: list[int] = ()) -> None:
+    """Drop a batch's staged rows, and the vendors created for it that still have no products."""
+    db.execute(delete(staging).where(staging.c.batch_id == batch_id))
+    if new_vendor_ids:
+        has_products = select(models.Product.id).where(models.Product.vendor_id == models.Vendor.id).exists()
+        db.execute(
+            delete(models.Vendor)
+            .where(models.Vendor.id.in_(new_vendor_ids), ~has_products)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+
+
+def validate_batch(db: Session, batch_id: str, new_vendor_ids: list[int] = ()) -> None:
+    """Refuse to swap in a batch that would wipe or corrupt a vendor's catalog."""
+    in_batch = staging.c.batch_id == batch_id
+    total, missing_vendor, negative_price = db.execute(
+        select(
+            func.count(),
+            func.count().filter(staging.c.vendor_id.is_(None)),
+            func.count().filter(staging.c.price < 0),
+        ).where(in_batch)
+    ).one()
+
+    problems = []
+    if not total:
+        problems.append("no rows to import")
+    if missing_vendor:
+        problems.append(f"{missing_vendor} rows without a vendor")
+    if negative_price:
+        problems.append(f"{negative_price} rows with a negative price")
+
+    if problems:
+        discard_batch(db, batch_id, new_vendor_ids)
+        raise HTTPException(status_code=400, detail="Import rejected: " + ", ".join(problems))
+
+
+def swap_vendor_catalog(db: Session, batch_id: str, new_vendor_ids: list[int] = ()) -> dict:
+    """
+    Replace the products of every vendor present in the batch with the staged
+    rows, in a single transaction.
+    """
+    in_batch = staging.c.batch_id == batch_id
+    vendor_ids = select(staging.c.vendor_id).where(in_batch).distinct()
+    cols = [staging.c[name] for name in PRODUCT_COLUMNS]
+
+    started = time.perf_counter()
+    try:
+        # The replaced products' price list items would otherwise be orphaned (see models.PriceListItem)
+        db.execute(
+            delete(models.PriceListItem)
+            .where(models.PriceListItem.product_id.in_(
+                select(models.Product.id).where(models.Product.vendor_id.in_(vendor_ids))
+            ))
+            .execution_options(synchronize_session=False)
+        )
+        replaced = db.execute(
+            delete(models.Product)
+            .where(models.Product.vendor_id.in_(vendor_ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        inserted = db.execute(
+            insert(models.Product).from_select(
+                PRODUCT_COLUMNS, select(*cols).where(in_batch).order_by(staging.c.row_id)
+            )
+        ).rowcount
+        vendors = db.execute(select(func.count()).select_from(vendor_ids.subquery())).scalar()
+        db.execute(delete(staging).where(in_batch))
+        db.commit()
+    except Exception:
+        db.rollback()
+        discard_batch(db, batch_id, new_vendor_ids)
+        raise
+    swap_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    logger.info(f"Swapped batch {batch_id}: {inserted} rows for {vendors} vendors in {swap_ms}ms")
+    return {"replaced": replaced, "imported": inserted, "vendors": vendors, "swap_ms": swap_ms}
+
+
+def replace_vendor_catalogs(db: Session, rows: Iterable[dict], new_vendor_ids: list[int] = ()) -> dict:
+    """
+    Stage, validate and swap in one call. Rows are product column dicts.
+    `new_vendor_ids` lists vendors created while resolving the rows (it may
+    fill up as `rows` is consumed); they are removed again if the batch is
+    rejected or the swap fails.
+    """
+    batch_id = new_batch_id()
+    try:
+        stage_products(db, batch_id, rows)
+    except Exception:
+        db.rollback()  # also undoes vendors created in this transaction
+        discard_batch(db, batch_id)
+        raise
+    validate_batch(db, batch_id, new_vendor_ids)
+    return swap_vendor_catalog(db, batch_id, new_vendor_ids)
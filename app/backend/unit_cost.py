@@ -0,0 +1,73 @@
+# app/backend/unit_cost.py
+"""
+Cost per square foot, for comparing products priced in different units.
+
+    SF   price
+    SY   price / 9
+    CT   price / sf_per_carton
+    LF   price / width   (roll width in feet)
+
+CT divides by `sf_per_carton` only, never by `width`. The B2B
+"Width/Quant-Carton" value behind `width` is often a piece count (pcs/cn,
+pcs/box, buy qty), so a carton price over it is not a cost per SF. Imports set
+`sf_per_carton` only from columns known to hold SF per carton (SF_PER_CARTON_FIELDS).
+
+Other units (EA, ...) and a missing or zero divisor have no per-SF cost (NULL).
+
+`products.normalized_cost_per_sf` is a stored column, indexed for sorting and
+range filters. Each write path fills it: ORM saves through the mapper events
+in models.py, imports and bulk inserts with `with_cost_per_sf`, and bulk
+UPDATEs with `cost_per_sf_sql` over the new values.
+"""
+
+from sqlalchemy import case, func, literal
+from sqlalchemy.sql import ClauseElement
+
+SQ_FT_PER_SQ_YD = 9.0
+SF_PER_CARTON_FIELDS = ["sf/cn"]
+COST_INPUTS = ("price", "pricing_unit", "width", "sf_per_carton")
+
+
+def cost_per_sf(price: float | None, pricing_unit: str | None, width: float | None,
+                sf_per_carton: float | None = None) -> float | None:
+    if price is None or not pricing_unit:
+        return None
+    unit = pricing_unit.upper()
+    if unit == "SF":
+        return price
+    if unit == "SY":
+        return price / SQ_FT_PER_SQ_YD
+    if unit == "CT" and sf_per_carton:
+        return price / sf_per_carton
+    if unit == "LF" and width:
+        return price / width
+    return None
+
+
+def with_cost_per_sf(fields: dict) -> dict:
+    """Product column values plus their normalized_cost_per_sf, for Core inserts."""
+    return {
+        **fields,
+        "normalized_cost_per_sf": cost_per_sf(*(fields.get(name) for name in COST_INPUTS)),
+    }
+
+
+def cost_per_sf_sql(table, values: dict):
+    """
+    `cost_per_sf` as a SQL expression for an UPDATE of `table` that sets
+    `values`: inputs being set are taken from `values`, the rest from the row.
+    """
+    def new_value(name):
+        if name not in values:
+            return table.c[name]
+        value = values[name]
+        return value if isinstance(value, ClauseElement) else literal(value, table.c[name].type)
+
+    price, unit, width, sf_per_carton = (new_value(name) for name in COST_INPUTS)
+    unit = func.upper(unit)
+    return case(
+        (unit == "SF", price),
+        (unit == "SY", price / SQ_FT_PER_SQ_YD),
+        (unit == "CT", price / func.nullif(sf_per_carton, 0)),
+        (unit == "LF", price / func.nullif(width, 0)),
+    )
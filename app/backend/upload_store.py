@@ -0,0 +1,147 @@
+# app/backend/upload_store.py
+"""
+On-disk spool for chunked, resumable uploads.
+
+Each upload is `<id>.part` (the bytes received so far) plus `<id>.json` (its
+metadata) under UPLOAD_DIR. The size of the .part file is the acknowledged
+offset. A client whose connection dropped asks for it and resumes from there,
+and any worker sharing the directory can take the next chunk. Uploads not
+touched for UPLOAD_TTL_SECONDS are purged.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+
+from fastapi import HTTPException
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process only
+    fcntl = None
+
+logger = logging.getLogger("uploads")
+
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "./uploads"))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(512 * 1024 * 1024)))
+UPLOAD_TTL_SECONDS = int(os.getenv("UPLOAD_TTL_SECONDS", str(24 * 3600)))
+
+UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _paths(upload_id: str) -> tuple[Path, Path]:
+    if not UPLOAD_ID_RE.match(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return UPLOAD_DIR / f"{upload_id}.part", UPLOAD_DIR / f"{upload_id}.json"
+
+
+@contextlib.contextmanager
+def _locked(fh):
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(fh, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def create(meta: dict) -> dict:
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    meta = {**meta, "upload_id": upload_id, "created_at": time.time()}
+    part, info = _paths(upload_id)
+    part.touch()
+    info.write_text(json.dumps(meta))
+    return meta
+
+
+def load(upload_id: str) -> dict:
+    _, info = _paths(upload_id)
+    try:
+        return json.loads(info.read_text())
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+
+def exists(upload_id: str) -> bool:
+    part, _ = _paths(upload_id)
+    return part.exists()
+
+
+def received(upload_id: str) -> int:
+    part, _ = _paths(upload_id)
+    try:
+        return part.stat().st_size
+    except OSError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+
+def write_chunk(upload_id: str, offset: int, data: bytes) -> int:
+    """
+    Store `data` at `offset` and return the new acknowledged size. Bytes below
+    the current size were already received (a retried chunk) and are skipped;
+    a gap beyond it is rejected with 409 and the offset to resume from.
+    """
+    part, _ = _paths(upload_id)
+    try:
+        fh = open(part, "r+b")
+    except OSError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+
+    with fh, _locked(fh):
+        size = fh.seek(0, os.SEEK_END)
+        if offset > size:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": f"Chunk at offset {offset} leaves a gap; resume from {size}", "received": size},
+                headers={"Upload-Offset": str(size)},
+            )
+        new = data[size - offset:]
+        if size + len(new) > UPLOAD_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"Upload exceeds {UPLOAD_MAX_BYTES} bytes")
+        if new:
+            fh.write(new)
+            fh.flush()
+            os.fsync(fh.fileno())
+        return size + len(new)
+
+
+def read_range(upload_id: str, start: int, end: int) -> bytes:
+    part, _ = _paths(upload_id)
+    with open(part, "rb") as fh:
+        fh.seek(start)
+        return fh.read(max(0, end - start))
+
+
+def read_all(upload_id: str) -> bytes:
+    part, _ = _paths(upload_id)
+    return part.read_bytes()
+
+
+def remove(upload_id: str) -> None:
+    for path in _paths(upload_id):
+        path.unlink(missing_ok=True)
+
+
+def purge_expired() -> int:
+    if not UPLOAD_DIR.exists():
+        return 0
+    cutoff = time.time() - UPLOAD_TTL_SECONDS
+    removed = 0
+    for part in UPLOAD_DIR.glob("*.part"):
+        try:
+            if part.stat().st_mtime < cutoff:
+                remove(part.stem)
+                removed += 1
+        except (OSError, HTTPException):
+            continue
+    if removed:
+        logger.info(f"Purged {removed} expired uploads")
+    return removed
@@ -0,0 +1,203 @@
+# app/backend/writer.py
+"""
+Single-writer coordinator for imports and bulk mutations.
+
+SQLite allows one writer at a time. Instead of letting every request race for
+the write lock (and fail with "database is locked"), write jobs are queued and
+executed by one writer thread per process. Queued jobs are drained in batches
+and committed together; if any job in a batch fails, the batch is rolled back
+and its jobs are re-run one transaction each, so a bad job cannot take the
+others down with it. When several uvicorn workers share the same SQLite file,
+an advisory file lock next to the database serializes the writer threads of
+all processes. Reads never go through the coordinator.
+
+Jobs are plain functions `fn(db, *args)` that must not commit; jobs submitted
+with `exclusive=True` run alone and may manage their own transactions. A job
+runs in a copy of the submitter's context variables, so its statements are
+attributed to the request that queued it (see query_stats.py).
+"""
+
+import asyncio
+import contextlib
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.backend import database
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, in-process queue only
+    fcntl = None
+
+logger = logging.getLogger("writer")
+
+MAX_BATCH_JOBS = 32
+
+
+@dataclass
+class WriteJob:
+    fn: Callable[..., Any]
+    args: tuple
+    exclusive: bool
+    future: Future = field(default_factory=Future)
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+
+class WriteCoordinator:
+    def __init__(self, session_factory=database.SessionLocal, lock_path: str | None = None, max_batch: int = MAX_BATCH_JOBS):
+        self.session_factory = session_factory
+        self.lock_path = lock_path
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[WriteJob]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._held: WriteJob | None = None
+        self.jobs = 0
+        self.failed = 0
+        self.batches = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    # ---------- public API ----------
+
+    def submit(self, fn: Callable[..., Any], *args, exclusive: bool = False) -> Future:
+        """Queue `fn(db, *args)`; the future resolves after the job's batch commits."""
+        self._ensure_started()
+        job = WriteJob(fn, args, exclusive)
+        self._queue.put(job)
+        return job.future
+
+    async def run(self, fn: Callable[..., Any], *args, exclusive: bool = False):
+        return await asyncio.wrap_future(self.submit(fn, *args, exclusive=exclusive))
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "jobs": self.jobs,
+                "failed": self.failed,
+                "batches": self.batches,
+                "avg_jobs_per_batch": round(self.jobs / self.batches, 2) if self.batches else 0.0,
+                "avg_wait_ms": round(self.total_wait / self.jobs * 1000, 2) if self.jobs else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "avg_run_ms": round(self.total_run / self.jobs * 1000, 2) if self.jobs else 0.0,
+            }
+
+    # ---------- writer thread ----------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> list[WriteJob]:
+        first = self._held or self._queue.get()
+        self._held = None
+        if first.exclusive:
+            return [first]
+
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job.exclusive:
+                self._held = job  # runs alone, right after this batch
+                break
+            batch.append(job)
+        return batch
+
+    @contextlib.contextmanager
+    def _process_lock(self):
+        if self.lock_path is None or fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            try:
+                with self._process_lock():
+                    outcomes = self._run_batch(batch)
+            except Exception as e:
+                logger.exception("Write batch failed")
+                outcomes = [(None, e) for _ in batch]
+            finished = time.perf_counter()
+
+            with self._stats_lock:
+                self.batches += 1
+                for job, (_, error) in zip(batch, outcomes):
+                    wait = started - job.enqueued_at
+                    self.jobs += 1
+                    self.total_wait += wait
+                    self.max_wait = max(self.max_wait, wait)
+                    self.failed += error is not None
+                self.total_run += finished - started
+
+            for job, (result, error) in zip(batch, outcomes):
+                if error is not None:
+                    job.future.set_exception(error)
+                else:
+                    job.future.set_result(result)
+
+    def _run_batch(self, batch: list[WriteJob]) -> list[tuple[Any, BaseException | None]]:
+        if len(batch) == 1:
+            return [self._run_single(batch[0])]
+
+        db: Session = self.session_factory()
+        try:
+            results = [job.context.run(job.fn, db, *job.args) for job in batch]
+            db.commit()
+            return [(result, None) for result in results]
+        except Exception:
+            db.rollback()
+        finally:
+            db.close()
+
+        # Something in the batch failed: nothing was committed, so run each
+        # job on its own to isolate the failure.
+        return [self._run_single(job) for job in batch]
+
+    def _run_single(self, job: WriteJob) -> tuple[Any, BaseException | None]:
+        db: Session = self.session_factory()
+        try:
+            result = job.context.run(job.fn, db, *job.args)
+            db.commit()
+            return result, None
+        except Exception as e:
+            db.rollback()
+            return None, e
+        finally:
+            db.close()
+
+
+def default_lock_path() -> str | None:
+    url = database.engine.url
+    if url.get_backend_name() == "sqlite" and url.database and url.database != ":memory:":
+        return f"{url.database}.writer.lock"
+    return None
+
+
+coordinator = WriteCoordinator(lock_path=default_lock_path())
@@ -0,0 +1,108 @@
+"""
+Startup benchmark: how long a fresh worker takes to import the app and to
+become healthy/ready. Run from the repository root:
+
+    python benchmarks/bench_startup.py --runs 5 --json startup.json
+
+The database must already be migrated (`alembic upgrade head`) for /readyz
+to report ready.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_import() -> float:
+    code = "import time; t = time.perf_counter(); import app.backend.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def wait_for(url: str, started: float, timeout: float) -> float | None:
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as res:
+                if res.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    return None
+
+
+def time_boot(timeout: float) -> tuple[float | None, float | None]:
+    port = free_port()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.backend.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        healthy = wait_for(f"http://127.0.0.1:{port}/healthz", started, timeout)
+        ready = wait_for(f"http://127.0.0.1:{port}/readyz", started, timeout) if healthy else None
+        return healthy, ready
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def summarize(values: list[float | None]) -> dict:
+    ok = [v for v in values if v is not None]
+    if not ok:
+        return {"runs": len(values), "failed": len(values)}
+    return {
+        "runs": len(values),
+        "failed": len(values) - len(ok),
+        "min_ms": round(min(ok) * 1000, 1),
+        "median_ms": round(statistics.median(ok) * 1000, 1),
+        "max_ms": round(max(ok) * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds to wait for each server to boot")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    imports = [time_import() for _ in range(args.runs)]
+    boots = [time_boot(args.timeout) for _ in range(args.runs)]
+
+    results = {
+        "python": sys.version.split()[0],
+        "import": summarize(imports),
+        "healthy": summarize([h for h, _ in boots]),
+        "ready": summarize([r for _, r in boots]),
+    }
+
+    for name in ("import", "healthy", "ready"):
+        r = results[name]
+        if "median_ms" in r:
+            print(f"{name:8s} median {r['median_ms']:8.1f} ms  (min {r['min_ms']}, max {r['max_ms']}, failed {r['failed']}/{r['runs']})")
+        else:
+            print(f"{name:8s} failed {r['failed']}/{r['runs']}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
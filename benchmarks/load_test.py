@@ -0,0 +1,299 @@
+"""
+Load test: replay a weighted mix of API calls at a target request rate and
+report latency percentiles, throughput and error rate per route. Run from the
+repository root:
+
+    python benchmarks/load_test.py --start-server --rate 20 --duration 60 --json load.json
+    python benchmarks/load_test.py --base-url http://127.0.0.1:8000 --mix products=5,preview=3,convert=2
+    python benchmarks/load_test.py --start-server --json new.json --compare load.json
+
+Requests are scheduled open-loop: every request has a fixed start time, and
+latency is measured from that time. A server that falls behind therefore shows
+up as higher latency instead of a lower request rate. Upload routes send
+synthetic vendor CSVs (see --rows).
+
+`import` requests write products (vendor "Loadtest Vendor") into whatever
+database the server uses. Point the server at a scratch copy, or drop
+`import` from the mix.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_startup import ROOT, free_port, wait_for  # noqa: E402
+
+DEFAULT_MIX = "products=30,vendors=20,preview=20,convert=20,import=10"
+LOADTEST_VENDOR = "Loadtest Vendor"
+
+STYLES = ["Harbor Oak", "Stone Ridge", "Cascade", "Windsor", "Alder Plank", "Mesa"]
+COLORS = ["Natural", "Grey Mist", "Walnut", "Ivory", "Charcoal", "Sand"]
+TYPES = ["Carpet", "LVP", "Laminate", "Hardwood", "Tile"]
+
+
+# ---------------- SYNTHETIC FILES ----------------
+
+def vendor_csv(rows: int, manufacturer: str, seed: int = 0) -> bytes:
+    """A typical vendor price list: title rows above the header, mixed units."""
+    rnd = random.Random(seed)
+    out = io.StringIO()
+    out.write(f"{manufacturer} Price List\nEffective {datetime.now():%m/%d/%Y}\n\n")
+    writer = csv.writer(out)
+    writer.writerow(["Manufacturer", "SKU", "Style Name", "Color Name", "Product Type",
+                     "Width", "Cut Cost", "Roll Cost", "Pricing Unit"])
+    for i in range(rows):
+        ptype = rnd.choice(TYPES)
+        cost = round(rnd.uniform(0.9, 6.5), 2)
+        writer.writerow([
+            manufacturer,
+            f"LT-{seed}-{i:06d}",
+            rnd.choice(STYLES),
+            rnd.choice(COLORS),
+            ptype,
+            "12'" if ptype == "Carpet" else "",
+            cost,
+            round(cost * 0.92, 2),
+            "SY" if ptype == "Carpet" else "SF",
+        ])
+    return out.getvalue().encode("utf-8")
+
+
+def multipart(files: dict[str, tuple[str, bytes]], fields: dict[str, str] | None = None) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in (fields or {}).items():
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data) in files.items():
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: text/csv\r\n\r\n".encode()
+        )
+        body.write(data)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode())
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+# ---------------- ROUTES ----------------
+
+class Route:
+    def __init__(self, name: str, method: str, path: str, build=None):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.build = build  # () -> (body, content_type)
+
+    def request(self, base_url: str) -> urllib.request.Request:
+        body, content_type = self.build() if self.build else (None, None)
+        req = urllib.request.Request(base_url + self.path, data=body, method=self.method)
+        if content_type:
+            req.add_header("Content-Type", content_type)
+        return req
+
+
+def build_routes(rows: int) -> dict[str, Route]:
+    upload = vendor_csv(rows, "Loadtest Mills", seed=1)
+    import_file = vendor_csv(rows, LOADTEST_VENDOR, seed=2)
+
+    def form(data: bytes, **fields):
+        body = multipart({"file": ("pricelist.csv", data)}, fields)
+        return lambda: body
+
+    return {
+        "products": Route("products", "GET", "/products/"),
+        "vendors": Route("vendors", "GET", "/vendors/"),
+        "preview": Route("preview", "POST", "/b2b/preview", form(upload)),
+        "convert": Route("convert", "POST", "/b2b/convert-to-b2b", form(upload)),
+        "import": Route("import", "POST", "/b2b/import/csv", form(import_file, mode="append")),
+    }
+
+
+def parse_mix(spec: str, routes: dict[str, Route]) -> list[tuple[Route, float]]:
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in routes:
+            raise SystemExit(f"unknown route {name!r} in --mix (choose from {', '.join(routes)})")
+        mix.append((routes[name], float(weight or 1)))
+    if not mix or sum(w for _, w in mix) <= 0:
+        raise SystemExit("--mix needs at least one route with a positive weight")
+    return mix
+
+
+# ---------------- RUNNER ----------------
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: dict[str, list[tuple[float, bool, str | None]]] = {}
+
+    def add(self, route: str, latency: float, ok: bool, error: str | None) -> None:
+        with self.lock:
+            self.samples.setdefault(route, []).append((latency, ok, error))
+
+
+def call(route: Route, base_url: str, scheduled: float, timeout: float, recorder: Recorder) -> None:
+    error = None
+    try:
+        with urllib.request.urlopen(route.request(base_url), timeout=timeout) as res:
+            res.read()
+            ok = 200 <= res.status < 300
+    except urllib.error.HTTPError as e:
+        ok, error = False, f"HTTP {e.code}"
+    except Exception as e:
+        ok, error = False, e.__class__.__name__
+    recorder.add(route.name, time.perf_counter() - scheduled, ok, error)
+
+
+def run(base_url: str, mix: list[tuple[Route, float]], rate: float, duration: float,
+        concurrency: int, timeout: float, seed: int) -> tuple[Recorder, float]:
+    rnd = random.Random(seed)
+    routes, weights = zip(*mix)
+    recorder = Recorder()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = scheduled = time.perf_counter()
+        while scheduled - started < duration:
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            route = rnd.choices(routes, weights)[0]
+            pool.submit(call, route, base_url, scheduled, timeout, recorder)
+            scheduled += rnd.expovariate(rate)  # Poisson arrivals at the target rate
+    elapsed = time.perf_counter() - started
+    return recorder, elapsed
+
+
+# ---------------- REPORTING ----------------
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(samples: list[tuple[float, bool, str | None]], elapsed: float) -> dict:
+    latencies = sorted(s[0] for s in samples)
+    errors = [s[2] or "non-2xx" for s in samples if not s[1]]
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        "error_kinds": {kind: errors.count(kind) for kind in sorted(set(errors))},
+    }
+
+
+def print_table(results: dict, baseline: dict | None) -> None:
+    print(f"{'route':10s} {'reqs':>6s} {'rps':>7s} {'err%':>6s} {'p50':>9s} {'p95':>9s} {'p99':>9s}")
+    for name, r in results["routes"].items():
+        line = (f"{name:10s} {r['requests']:6d} {r['throughput_rps']:7.2f} {r['error_rate'] * 100:6.2f} "
+                f"{r['p50_ms']:9.1f} {r['p95_ms']:9.1f} {r['p99_ms']:9.1f}")
+        old = (baseline or {}).get("routes", {}).get(name)
+        if old and old.get("p95_ms"):
+            line += f"   p95 {(r['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100:+.1f}% vs baseline"
+        print(line)
+        for kind, count in r["error_kinds"].items():
+            print(f"{'':10s}   {count} x {kind}")
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def start_server(workers: int, timeout: float) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.backend.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    if wait_for(f"{base_url}/healthz", time.perf_counter(), timeout) is None:
+        proc.terminate()
+        raise SystemExit("server did not become healthy")
+    return proc, base_url
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="server to test (default: start one with --start-server)")
+    parser.add_argument("--start-server", action="store_true", help="boot uvicorn from this checkout on a free port")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --start-server")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route=weight list (default {DEFAULT_MIX})")
+    parser.add_argument("--rate", type=float, default=10.0, help="target requests per second (all routes)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of traffic")
+    parser.add_argument("--rows", type=int, default=500, help="rows per synthetic upload")
+    parser.add_argument("--concurrency", type=int, default=64, help="max in-flight requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json results to compare p95 against")
+    args = parser.parse_args()
+
+    if not args.base_url and not args.start_server:
+        parser.error("pass --base-url or --start-server")
+
+    mix = parse_mix(args.mix, build_routes(args.rows))
+    baseline = json.load(open(args.compare)) if args.compare else None
+
+    proc = None
+    base_url = args.base_url.rstrip("/") if args.base_url else None
+    if args.start_server:
+        proc, base_url = start_server(args.workers, timeout=30.0)
+    try:
+        recorder, elapsed = run(base_url, mix, args.rate, args.duration, args.concurrency, args.timeout, args.seed)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    all_samples = [s for samples in recorder.samples.values() for s in samples]
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        "elapsed_s": round(elapsed, 2),
+        "routes": {name: summarize(samples, elapsed) for name, samples in sorted(recorder.samples.items())},
+        "total": summarize(all_samples, elapsed),
+    }
+
+    print_table(results, baseline)
+    t = results["total"]
+    print(f"{'total':10s} {t['requests']:6d} {t['throughput_rps']:7.2f} {t['error_rate'] * 100:6.2f} "
+          f"{t['p50_ms']:9.1f} {t['p95_ms']:9.1f} {t['p99_ms']:9.1f}   (target {args.rate:.1f} rps)")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
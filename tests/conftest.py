@@ -0,0 +1,69 @@
+# conftest.py
+import atexit
+import os
+import shutil
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database (and upload/profile directories) before
+# any app module creates its engine; tests must never touch ./flooring.db.
+TEST_DIR = tempfile.mkdtemp(prefix="floor-pricing-tests-")
+atexit.register(shutil.rmtree, TEST_DIR, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{TEST_DIR}/test.db"
+os.environ["UPLOAD_DIR"] = os.path.join(TEST_DIR, "uploads")
+os.environ["PROFILE_DIR"] = os.path.join(TEST_DIR, "profiles")
+
+from app.backend import database, models  # noqa: E402,F401  (models registers the tables)
+
+
+def _delete_all_rows(db):
+    for table in reversed(database.Base.metadata.sorted_tables):
+        db.execute(table.delete())
+
+
+def reset_app_state():
+    """Empty every table and drop what the module-level caches remember about them."""
+    from app.backend import formats
+    from app.backend.analytics import analytics
+    from app.backend.cache import cache
+    from app.backend.lookup import product_lookup
+    from app.backend.snapshot import catalog_snapshot
+    from app.backend.writer import coordinator
+
+    database.Base.metadata.create_all(bind=database.engine)
+    # Through the writer, after any registry entry still queued for persisting
+    coordinator.submit(_delete_all_rows).result(timeout=30)
+    formats.registry.invalidate()
+    cache.clear()
+    analytics.mark_all_dirty()
+    catalog_snapshot.mark_stale()
+    product_lookup.mark_stale()
+
+
+@pytest.fixture
+def db():
+    reset_app_state()
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(db):
+    from fastapi.testclient import TestClient
+
+    from app.backend.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def pytest_sessionfinish(session):
+    from app.backend.routers import b2b_import_export
+
+    # Stop the batch-convert workers before interpreter shutdown tears their manager down
+    if b2b_import_export._batch_pool is not None:
+        b2b_import_export._batch_pool.shutdown()
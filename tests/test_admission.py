@@ -0,0 +1,222 @@
+# test_admission.py
+import asyncio
+
+import pytest
+
+from app.backend import admission as admission_module
+from app.backend import debug_auth
+from app.backend.admission import AdmissionController, AdmissionMiddleware, Rejected, heavy_route
+
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10))
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_requests_wait_in_fifo_order():
+    async def scenario():
+        controller = AdmissionController(slots=1, max_bytes=100, queue_size=4, queue_timeout=5)
+        assert await controller.acquire(60) == 0.0
+        order = []
+
+        async def heavy(name, nbytes):
+            await controller.acquire(nbytes)
+            order.append(name)
+
+        tasks = [asyncio.create_task(heavy(name, n)) for name, n in (("big", 50), ("small", 10), ("third", 10))]
+        await settle()
+        assert controller.stats()["waiting"] == 3
+
+        for nbytes in (60, 50, 10):
+            controller.release(nbytes, 0.0)
+            await settle()
+        await asyncio.gather(*tasks)
+        return order, controller.stats()
+
+    order, stats = run(scenario())
+    assert order == ["big", "small", "third"]
+    assert (stats["active"], stats["inflight_bytes"], stats["admitted"]) == (1, 10, 4)
+
+
+def test_large_request_at_the_head_is_not_overtaken():
+    async def scenario():
+        controller = AdmissionController(slots=2, max_bytes=100, queue_size=4, queue_timeout=5)
+        await controller.acquire(60)
+        big = asyncio.create_task(controller.acquire(50))
+        await settle()
+        small = asyncio.create_task(controller.acquire(10))  # fits the budget, but queues behind big
+        await settle()
+        assert not big.done() and not small.done()
+
+        controller.release(60, 0.0)
+        await asyncio.gather(big, small)
+        return controller.stats()
+
+    stats = run(scenario())
+    assert (stats["active"], stats["inflight_bytes"], stats["queued"]) == (2, 60, 2)
+
+
+def test_oversized_request_runs_alone():
+    async def scenario():
+        controller = AdmissionController(slots=4, max_bytes=10, queue_size=4, queue_timeout=5)
+        await controller.acquire(1000)
+        waiter = asyncio.create_task(controller.acquire(1))
+        await settle()
+        assert not waiter.done()
+        controller.release(1000, 0.0)
+        await waiter
+
+    run(scenario())
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        controller = AdmissionController(slots=1, max_bytes=100, queue_size=1, queue_timeout=5)
+        await controller.acquire(1)
+        waiter = asyncio.create_task(controller.acquire(1))
+        await settle()
+        with pytest.raises(Rejected) as rejected:
+            await controller.acquire(1)
+        controller.release(1, 0.0)
+        await waiter
+        return rejected.value, controller.stats()
+
+    rejected, stats = run(scenario())
+    assert (rejected.status, rejected.retry_after) == (429, 2)  # two ahead of it, one slot, ~1 s each
+    assert stats["rejected_queue_full"] == 1
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def scenario():
+        controller = AdmissionController(slots=1, max_bytes=100, queue_size=4, queue_timeout=0.05)
+        await controller.acquire(90)
+        with pytest.raises(Rejected) as rejected:
+            await controller.acquire(50)
+        return rejected.value, controller.stats()
+
+    rejected, stats = run(scenario())
+    assert rejected.status == 503
+    assert rejected.retry_after >= 1
+    assert (stats["rejected_timeout"], stats["waiting"], stats["active"]) == (1, 0, 1)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        controller = AdmissionController(slots=1, max_bytes=100, queue_size=4, queue_timeout=5)
+        await controller.acquire(1)
+        waiter = asyncio.create_task(controller.acquire(1))
+        await settle()
+        waiter.cancel()
+        await settle()
+        return controller.stats()
+
+    stats = run(scenario())
+    assert (stats["waiting"], stats["active"]) == (0, 1)
+
+
+def test_heavy_routes():
+    def scope(method, path):
+        return {"type": "http", "method": method, "path": path}
+
+    assert heavy_route(scope("POST", "/b2b/convert-to-b2b"))
+    assert heavy_route(scope("GET", "/qfloors/export/"))
+    assert heavy_route(scope("POST", f"/b2b/uploads/{'a' * 32}/finalize")).group("upload_id") == "a" * 32
+    assert heavy_route(scope("PUT", f"/b2b/uploads/{'a' * 32}")) is None
+    assert heavy_route(scope("GET", "/products/")) is None
+
+
+class Exchange:
+    """One ASGI request against the middleware: a body in pieces and the messages sent back."""
+
+    def __init__(self, body_parts=(b"",), headers=()):
+        self.scope = {"type": "http", "method": "POST", "path": "/b2b/preview",
+                      "headers": [(b"content-length", str(sum(map(len, body_parts))).encode()), *headers]}
+        self.body = [{"type": "http.request", "body": part, "more_body": i < len(body_parts) - 1}
+                     for i, part in enumerate(body_parts)]
+        self.sent = []
+
+    async def receive(self):
+        return self.body.pop(0) if self.body else {"type": "http.disconnect"}
+
+    async def send(self, message):
+        self.sent.append(message)
+
+    @property
+    def status(self):
+        return self.sent[0]["status"]
+
+    @property
+    def headers(self):
+        return dict(self.sent[0]["headers"])
+
+
+def test_middleware_holds_the_slot_until_the_body_is_sent():
+    async def scenario():
+        controller = AdmissionController(slots=1, max_bytes=1000, queue_size=0, queue_timeout=5)
+        release_body = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await release_body.wait()
+            await send({"type": "http.response.body", "body": b"ok"})
+
+        middleware = AdmissionMiddleware(app, controller)
+        first = Exchange([b"abc"])
+        running = asyncio.create_task(middleware(first.scope, first.receive, first.send))
+        await settle()
+
+        second = Exchange([b"x" * 10, b"y" * 10])
+        await middleware(second.scope, second.receive, second.send)
+        release_body.set()
+        await running
+        return controller, first, second
+
+    controller, first, second = run(scenario())
+    assert first.status == 200
+    assert b"x-queue-wait-ms" in first.headers
+    assert second.status == 429
+    assert second.headers[b"retry-after"] == b"1"
+    assert b"connection" not in second.headers
+    assert second.body == []  # the upload was drained before answering
+    assert (controller.active, controller.inflight_bytes) == (0, 0)
+
+
+@pytest.mark.parametrize("headers, parts", [
+    ([(b"expect", b"100-continue")], [b"abc"]),
+    ([], [b"x" * 64, b"y" * 64]),
+])
+def test_middleware_closes_instead_of_draining(monkeypatch, headers, parts):
+    monkeypatch.setattr(admission_module, "ADMISSION_DRAIN_MAX_BYTES", 100)
+
+    async def scenario():
+        controller = AdmissionController(slots=1, max_bytes=1000, queue_size=0, queue_timeout=5)
+        await controller.acquire(1)
+        exchange = Exchange(parts, headers)
+        await AdmissionMiddleware(None, controller)(exchange.scope, exchange.receive, exchange.send)
+        return exchange
+
+    exchange = run(scenario())
+    assert exchange.status == 429
+    assert exchange.headers[b"connection"] == b"close"
+    assert exchange.body  # left unread
+
+
+def test_heavy_responses_report_the_queue_wait(client):
+    res = client.post("/b2b/convert-to-b2b", files={"file": ("a.csv", "Manufacturer,SKU\nAcme,A1\n")})
+    assert res.status_code == 200
+    assert float(res.headers["x-queue-wait-ms"]) >= 0
+    assert "x-queue-wait-ms" not in client.get("/vendors/").headers
+
+
+def test_admission_stats_need_the_token(client, monkeypatch):
+    assert client.get("/debug/admission").status_code == 404
+    monkeypatch.setattr(debug_auth, "DEBUG_TOKEN", "s3cret")
+    assert client.get("/debug/admission", headers={"X-Debug-Token": "wrong"}).status_code == 403
+
+    stats = client.get("/debug/admission", headers={"X-Debug-Token": "s3cret"}).json()
+    assert stats["active"] == 0
+    assert set(stats["queue_wait_ms"]) == {"p50", "p95", "p99", "max"}
@@ -0,0 +1,117 @@
+# test_analytics.py
+import pytest
+
+from app.backend import models
+from app.backend.analytics import CatalogAnalytics, analytics
+
+
+def seed(db):
+    acme, birch = models.Vendor(name="Acme"), models.Vendor(name="birch")
+    db.add_all([
+        models.Product(vendor=acme, sku="A1", product_type="CPT", price=1.0),
+        models.Product(vendor=acme, sku="A2", product_type="CPT", price=3.0, is_promo=True),
+        models.Product(vendor=acme, sku="A3", product_type="LVT", price=10.0, is_dropped=True),
+        models.Product(vendor=acme, sku="A4", product_type="LVT"),
+        models.Product(vendor=birch, sku="B1", product_type="CPT", price=2.0),
+        models.Product(vendor=birch, sku="B2", product_type="CPT", price=6.0),
+        models.Product(sku="X1", price=4.0),
+    ])
+    db.commit()
+    return acme, birch
+
+
+def without_refresh_info(report: dict) -> dict:
+    return {k: v for k, v in report.items() if k not in ("catalog_version", "computed_at", "refresh")}
+
+
+def test_report_numbers(db):
+    acme, birch = seed(db)
+    report = CatalogAnalytics().report(db)
+
+    assert report["totals"] == {
+        "products": 7, "priced": 6, "min_cost": 1.0, "max_cost": 10.0, "avg_cost": 4.3333,
+        "dropped": 1, "promo": 1,
+    }
+    by_vendor = {r["vendor"]: r for r in report["by_vendor"]}
+    assert [r["vendor"] for r in report["by_vendor"]] == [None, "Acme", "birch"]
+    assert by_vendor["Acme"] == {
+        "vendor_id": acme.id, "vendor": "Acme", "products": 4, "priced": 3, "min_cost": 1.0, "max_cost": 10.0,
+        "avg_cost": 4.6667, "dropped": 1, "promo": 1, "median_cost": 3.0,
+    }
+    assert by_vendor["birch"]["median_cost"] == 4.0  # even count: mean of the middle two
+    by_type = {r["product_type"]: r for r in report["by_product_type"]}
+    assert by_type["CPT"]["products"] == 4
+    assert by_type["CPT"]["median_cost"] == 2.5
+    assert by_type["LVT"]["median_cost"] == 10.0
+    assert by_type[None]["products"] == 1
+
+
+def test_unchanged_catalog_is_cached(db):
+    seed(db)
+    reports = CatalogAnalytics()
+    first = reports.report(db)
+    second = reports.report(db, group_by="vendor")
+    assert (first["refresh"]["mode"], second["refresh"]["mode"]) == ("full", "cached")
+    assert "by_product_type" not in second
+    assert reports.stats()["refreshes"] == {"cached": 1, "incremental": 0, "full": 1}
+
+
+@pytest.mark.parametrize("by_name", [False, True])
+def test_incremental_refresh_matches_a_full_one(db, by_name):
+    acme, birch = seed(db)
+    reports = CatalogAnalytics()
+    reports.report(db)
+
+    db.add_all([
+        models.Product(vendor=birch, sku="B3", product_type="LVT", price=20.0, is_promo=True),
+        models.Product(vendor=birch, sku="B4", product_type="SHT", price=0.5),
+    ])
+    db.query(models.Product).filter_by(sku="B1").delete()
+    db.commit()
+    if by_name:
+        reports.mark_dirty(vendor_names=["birch"])
+    else:
+        reports.mark_dirty(vendor_ids=[birch.id])
+
+    incremental = reports.report(db)
+    assert incremental["refresh"]["mode"] == "incremental"
+    full = CatalogAnalytics().report(db)
+    assert without_refresh_info(incremental) == without_refresh_info(full)
+    # Acme's LVT median was recomputed with birch's new LVT product
+    assert {r["product_type"]: r["median_cost"] for r in incremental["by_product_type"]}["LVT"] == 15.0
+
+
+def test_expired_results_are_recomputed(db):
+    seed(db)
+    reports = CatalogAnalytics(max_age=0)
+    reports.report(db)
+    assert reports.report(db)["refresh"]["mode"] == "full"
+
+
+def test_endpoint_follows_catalog_writes(client):
+    assert client.get("/analytics/catalog", params={"group_by": "color"}).status_code == 400
+    assert client.get("/analytics/catalog").json()["totals"]["products"] == 0
+
+    vendor_id = client.post("/vendors/", json={"name": "Acme"}).json()["id"]
+    product = {"sku": "A1", "style": "Oak", "price": 2.0, "vendor_id": vendor_id}
+    assert client.post("/products/", json=product).status_code == 200
+    report = client.get("/analytics/catalog").json()
+    assert report["refresh"]["mode"] == "incremental"
+    assert report["by_vendor"][0]["median_cost"] == 2.0
+
+    client.post("/qfloors/import", files={"file": ("q.csv", "Manufacturer,SKU,Price\nBirch,B1,4.0\n")})
+    report = client.get("/analytics/catalog", params={"group_by": "vendor"}).json()
+    assert report["refresh"]["mode"] == "incremental"
+    assert [(r["vendor"], r["products"]) for r in report["by_vendor"]] == [("Acme", 1), ("Birch", 1)]
+
+    version = analytics.stats()["catalog_version"]
+    assert client.delete("/vendors/clear-all").status_code == 200
+    assert analytics.stats()["catalog_version"] > version
+    report = client.get("/analytics/catalog").json()
+    assert report["refresh"]["mode"] == "full"
+    assert [r["vendor"] for r in report["by_vendor"]] == [None, None]  # products outlive their vendors
+
+    assert client.delete("/products/clear-all").status_code == 200
+    report = client.get("/analytics/catalog").json()
+    assert report["refresh"]["mode"] == "full"
+    assert report["totals"]["products"] == 0
@@ -0,0 +1,93 @@
+# test_batch_convert.py
+import gzip
+import io
+import json
+import zipfile
+
+from app.backend.routers import b2b_import_export
+
+VENDOR_CSV = (
+    b"Spring Price List\n\n"
+    b"Manufacturer,Style Name,Color Name,SKU,Product Type,Pricing Unit,Cut Cost,Roll Cost\n"
+    b"Acme,Oak,Natural,A1,Flooring,SF,3.25,3.00\n"
+    b"Acme,Oak,Dark,A2,Carpet,SY,12.50,11.00\n"
+)
+OTHER_CSV = (
+    b"Manufacturer,Style Name,Color Name,SKU,Product Type,Pricing Unit,Cut Cost,Roll Cost\n"
+    b"Birch Co,Loft,Grey,B1,Carpet,SY,9.00,8.50\n"
+    b"Birch Co,Loft,Grey,B1,Carpet,SY,9.50,8.50\n"
+)
+
+
+def zip_of(members: dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buf.getvalue()
+
+
+def convert_one(client, name, data, **form):
+    res = client.post("/b2b/convert-to-b2b", files={"file": (name, data)}, data=form)
+    assert res.status_code == 200
+    return res.content
+
+
+def test_batch_matches_single_file_conversion(client):
+    res = client.post(
+        "/b2b/convert-batch",
+        files=[
+            ("files", ("acme.csv", VENDOR_CSV)),
+            ("files", ("more.zip", zip_of({"lists/birch.csv": OTHER_CSV, "__MACOSX/._birch.csv": b"x"}))),
+        ],
+        data={"manufacturers": ["Acme Override", ""], "force_manufacturer": "true", "dedupe": "first"},
+    )
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/zip"
+
+    with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        outputs = {m["source"]: archive.read(m["output"]) for m in manifest["files"]}
+
+    assert [m["source"] for m in manifest["files"]] == ["acme.csv", "birch.csv"]
+    assert [m["rows"] for m in manifest["files"]] == [2, 1]
+    assert manifest["total_rows"] == 3
+    assert manifest["duplicates_removed"] == 1
+    assert manifest["failed"] == 0
+
+    assert outputs["acme.csv"] == convert_one(
+        client, "acme.csv", VENDOR_CSV, manufacturer="Acme Override", force_manufacturer="true", dedupe="first"
+    )
+    assert outputs["birch.csv"] == convert_one(client, "birch.csv", OTHER_CSV, dedupe="first")
+
+
+def test_bad_file_is_reported_without_failing_the_batch(client):
+    res = client.post(
+        "/b2b/convert-batch",
+        files=[("files", ("good.csv", OTHER_CSV)), ("files", ("empty.csv", b""))],
+    )
+    assert res.status_code == 200
+
+    with zipfile.ZipFile(io.BytesIO(res.content)) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        names = archive.namelist()
+
+    good, empty = manifest["files"]
+    assert good["error"] is None and good["output"] in names
+    assert empty["error"] and empty["output"] is None
+    assert manifest["failed"] == 1
+
+
+def test_invalid_zip_is_rejected(client):
+    res = client.post("/b2b/convert-batch", files=[("files", ("broken.zip", b"PK\x03\x04not a zip"))])
+    assert res.status_code == 400
+    assert "Invalid zip archive" in res.json()["detail"]
+
+
+def test_zip_members_are_expanded_and_inflated():
+    jobs = b2b_import_export.expand_batch_uploads([
+        ("prices.csv", VENDOR_CSV, None),
+        ("bundle.zip", zip_of({"a/prices.csv.gz": gzip.compress(OTHER_CSV)}), "Birch"),
+    ])
+    assert [(name, manuf) for name, _, manuf in jobs] == [("prices.csv", None), ("prices.csv", "Birch")]
+    assert jobs[1][1] == OTHER_CSV
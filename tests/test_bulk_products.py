@@ -0,0 +1,95 @@
+# test_bulk_products.py
+import pytest
+
+from app.backend import models
+
+
+def create(client, vendor_id, count, prefix="S", **fields) -> list[int]:
+    products = [{"sku": f"{prefix}{i}", "style": "Oak", "vendor_id": vendor_id, **fields} for i in range(count)]
+    assert client.post("/products/bulk", json=products).json() == {"created": count}
+    return [p["id"] for p in client.get("/products/", params={"vendor_id": vendor_id}).json()
+            if p["sku"].startswith(prefix)]
+
+
+def prices(client) -> dict:
+    return {p["sku"]: p["price"] for p in client.get("/products/").json()}
+
+
+@pytest.fixture
+def vendors(client):
+    return [client.post("/vendors/", json={"name": name}).json()["id"] for name in ("Acme", "Birch")]
+
+
+def test_bulk_create(client, vendors):
+    ids = create(client, vendors[0], 3, price=2.0, product_type="CPT")
+    assert len(ids) == 3
+    assert client.post("/products/bulk", json=[]).json() == {"created": 0}
+    assert client.post("/products/bulk", json=[{"sku": "no style"}]).status_code == 422
+    assert set(prices(client).values()) == {2.0}
+
+
+def test_update_by_filter(client, vendors):
+    acme, birch = vendors
+    create(client, acme, 2, "A", price=10.0, product_type="CPT")
+    create(client, acme, 1, "L", price=10.0, product_type="LVT")
+    create(client, birch, 1, "B", price=10.0, product_type="CPT")
+
+    res = client.patch("/products/bulk", json={
+        "filter": {"vendor_id": acme, "product_type": "CPT"},
+        "adjust_price": {"multiply": 1.0333, "add": 0.5},
+    })
+    assert res.json() == {"updated": 2}
+    assert prices(client) == {"A0": 10.83, "A1": 10.83, "L0": 10.0, "B0": 10.0}
+
+    res = client.patch("/products/bulk", json={"filter": {"skus": ["B0", "Z9"]}, "set": {"is_promo": True}})
+    assert res.json() == {"updated": 1}
+    res = client.patch("/products/bulk", json={"filter": {"is_promo": True}, "set": {"vendor_id": acme}})
+    assert res.json() == {"updated": 1}
+    assert client.get("/products/", params={"vendor_id": birch}).json() == []
+
+
+def test_null_prices_stay_null(client, vendors):
+    create(client, vendors[0], 1, price=None)
+    client.patch("/products/bulk", json={"filter": {"vendor_id": vendors[0]}, "adjust_price": {"add": 1}})
+    assert list(prices(client).values()) == [None]
+
+
+def test_filters_by_thousands_of_ids(client, vendors):
+    ids = create(client, vendors[0], 3000, price=1.0)
+    # Split into IN lists of BULK_FILTER_CHUNK; a repeated id must still be updated once
+    wanted = ids[::2] + list(range(10_000_000, 10_002_000)) + ids[:1]
+    res = client.patch("/products/bulk", json={"filter": {"ids": wanted}, "adjust_price": {"multiply": 2}})
+    assert res.json() == {"updated": 1500}
+    assert set(prices(client).values()) == {1.0, 2.0}
+
+    res = client.post("/products/bulk/delete", json={"filter": {"ids": wanted, "vendor_id": vendors[0]}})
+    assert res.json() == {"deleted": 1500}
+    assert set(prices(client).values()) == {1.0}
+
+    skus = [f"S{i}" for i in range(1, 3000, 2)]
+    assert client.post("/products/bulk/delete", json={"filter": {"skus": skus}}).json() == {"deleted": 1500}
+    assert prices(client) == {}
+
+
+def test_delete_removes_price_list_items(client, db, vendors):
+    ids = create(client, vendors[0], 2, price=4.0)
+    price_list = models.PriceList(name="Retail", formula="cost * 2")
+    db.add(price_list)
+    db.flush()
+    db.add_all([models.PriceListItem(price_list_id=price_list.id, product_id=i, formula="cost * 2") for i in ids])
+    db.commit()
+
+    assert client.post("/products/bulk/delete", json={"filter": {"ids": ids[:1]}}).json() == {"deleted": 1}
+    db.expire_all()
+    assert [item.product_id for item in db.query(models.PriceListItem)] == ids[1:]
+
+
+@pytest.mark.parametrize("path, method, body, detail", [
+    ("/products/bulk", "PATCH", {"filter": {}, "set": {"price": 1}}, "filter needs at least one condition"),
+    ("/products/bulk/delete", "POST", {"filter": {}}, "filter needs at least one condition"),
+    ("/products/bulk", "PATCH", {"filter": {"ids": [1]}}, "Nothing to update"),
+])
+def test_requests_that_would_touch_everything_or_nothing(client, path, method, body, detail):
+    res = client.request(method, path, json=body)
+    assert res.status_code == 400
+    assert res.json()["detail"].startswith(detail)
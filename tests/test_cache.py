@@ -0,0 +1,109 @@
+# test_cache.py
+from app.backend import debug_auth
+from app.backend.cache import PRODUCTS, VENDORS, ReadCache, cache
+from app.backend.writer import coordinator
+
+
+class Loader:
+    def __init__(self, value="v"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hits_after_the_first_load():
+    reads = ReadCache(ttl=60, sync=False)
+    loader = Loader()
+    assert reads.get_or_load(VENDORS, "all", loader) == "v"
+    assert reads.get_or_load(VENDORS, "all", loader) == "v"
+    assert loader.calls == 1
+
+    stats = reads.stats()
+    assert stats["namespaces"][VENDORS] == {
+        "entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5, "invalidations": 0, "evictions": 0,
+    }
+
+
+def test_expired_entries_are_reloaded():
+    reads = ReadCache(ttl=0, sync=False)
+    loader = Loader()
+    reads.get_or_load(VENDORS, "all", loader)
+    reads.get_or_load(VENDORS, "all", loader)
+    assert loader.calls == 2
+
+
+def test_least_recently_used_entries_are_evicted():
+    reads = ReadCache(ttl=60, max_entries=2, sync=False)
+    for key in ("a", "b"):
+        reads.get_or_load(PRODUCTS, key, Loader(key))
+    reads.get_or_load(PRODUCTS, "a", Loader())  # "a" is now the most recent
+    reads.get_or_load(PRODUCTS, "c", Loader("c"))
+
+    loader = Loader("b2")
+    assert reads.get_or_load(PRODUCTS, "a", Loader()) == "a"
+    assert reads.get_or_load(PRODUCTS, "b", loader) == "b2"
+    assert reads.stats()["namespaces"][PRODUCTS]["evictions"] == 2
+
+
+def test_invalidation_is_per_namespace_and_wins_over_a_running_load():
+    reads = ReadCache(ttl=60, sync=False)
+    reads.get_or_load(VENDORS, "all", Loader())
+    reads.get_or_load(PRODUCTS, "p", Loader())
+
+    def stale_loader():
+        reads.invalidate(PRODUCTS)  # a write commits while the read is in flight
+        return "stale"
+
+    assert reads.get_or_load(PRODUCTS, "q", stale_loader) == "stale"
+    fresh = Loader("fresh")
+    assert reads.get_or_load(PRODUCTS, "q", fresh) == "fresh"
+    assert fresh.calls == 1
+
+    vendors = Loader()
+    reads.get_or_load(VENDORS, "all", vendors)
+    assert vendors.calls == 0
+
+
+def test_other_workers_drop_entries_when_the_generation_moves(db):
+    worker_a = ReadCache(ttl=60, sync=True, sync_interval=0)
+    worker_b = ReadCache(ttl=60, sync=True, sync_interval=0)
+    heard = []
+    worker_b.on_remote_invalidate(heard.append)
+
+    worker_b.get_or_load(VENDORS, "all", Loader("old"))
+    worker_a.invalidate(VENDORS)
+    coordinator.submit(lambda db: None).result(timeout=10)  # the generation bump has committed
+
+    assert worker_b.get_or_load(VENDORS, "all", Loader("new")) == "new"
+    assert heard == [VENDORS]
+    assert worker_b.stats()["remote_invalidations"] == 1
+
+
+def test_vendor_list_is_cached_until_a_write(client):
+    client.get("/vendors/")
+    before = cache.stats()["namespaces"][VENDORS]
+    client.get("/vendors/")
+    assert cache.stats()["namespaces"][VENDORS]["hits"] == before["hits"] + 1
+
+    assert client.post("/vendors/", json={"name": "Acme"}).status_code == 200
+    assert [v["name"] for v in client.get("/vendors/").json()] == ["Acme"]
+
+    client.post("/qfloors/import", files={"file": ("q.csv", "Manufacturer,SKU,Price\nBirch,B1,2.0\n")})
+    assert [v["name"] for v in client.get("/vendors/").json()] == ["Acme", "Birch"]
+
+    assert client.delete("/vendors/clear-all").status_code == 200
+    assert client.get("/vendors/").json() == []
+
+
+def test_debug_cache_routes_need_the_token(client, monkeypatch):
+    assert client.delete("/debug/cache").status_code == 404
+    monkeypatch.setattr(debug_auth, "DEBUG_TOKEN", "s3cret")
+    assert client.delete("/debug/cache", headers={"X-Debug-Token": "nope"}).status_code == 403
+
+    client.get("/vendors/")
+    auth = {"X-Debug-Token": "s3cret"}
+    assert client.delete("/debug/cache", headers=auth).json() == {"message": "Cache cleared"}
+    assert client.get("/debug/cache", headers=auth).json()["namespaces"][VENDORS]["entries"] == 0
@@ -0,0 +1,140 @@
+# test_catalog_diff.py
+import csv
+import io
+import random
+
+import pytest
+
+from app.backend import catalog_diff
+from app.backend.catalog_diff import DIFF_HEADERS, CatalogDiff, DiffRow
+from app.backend.routers import b2b_import_export as b2b
+
+
+def row(sku: str, price: float | None) -> DiffRow:
+    return DiffRow(sku=sku, manufacturer="Acme", style="Oak", color="Natural",
+                   product_type="FLOORING", pricing_unit="SF", price=price)
+
+
+def price_lists(n: int = 300, seed: int = 1) -> tuple[list[DiffRow], list[DiffRow]]:
+    """Overlapping old/new lists with repeats, blank SKUs and case-only SKU changes."""
+    rng = random.Random(seed)
+    old = [row(f"SKU{i}", round(rng.uniform(1, 20), 2)) for i in range(n)]
+    new = []
+    for i in range(n // 3, n + n // 3):
+        price = old[i].price if i < n and rng.random() < 0.5 else round(rng.uniform(1, 20), 2)
+        new.append(row(f"sku{i}" if i % 11 == 0 else f"SKU{i}", price))
+    old += [row("SKU5", 99.0), row("", 1.0)]
+    new += [row("SKU200", 1.0), row(" ", 2.0), row(f"SKU{n}", None)]
+    rng.shuffle(new)
+    return old, new
+
+
+def diff_all(diff: CatalogDiff, old, new) -> list[dict]:
+    return list(diff.records(iter(old), iter(new)))
+
+
+def test_records_and_stats():
+    old = [row("A", 10.0), row("B", 5.0), row("C", 2.0), row("A", 11.0)]
+    new = [row("a", 12.5), row("C", 2.0), row("D", 1.0), row("D", 3.0)]
+    diff = CatalogDiff()
+    records = diff_all(diff, old, new)
+
+    assert [(r["Change"], r["SKU"]) for r in records] == [("changed", "a"), ("added", "D"), ("removed", "B")]
+    assert records[0]["Old Price"] == 10.0
+    assert records[0]["Delta"] == 2.5
+    assert records[0]["Delta %"] == 25.0
+    assert records[1]["Old Price"] == records[1]["Delta"] == ""
+    assert diff.stats == catalog_diff.DiffStats(old_rows=4, new_rows=4, added=1, removed=1, changed=1,
+                                                unchanged=1, duplicates=2)
+
+
+def test_min_change_and_unchanged_rows():
+    old = [row("A", 100.0), row("B", 100.0), row("C", 4.0)]
+    new = [row("A", 100.5), row("B", 110.0), row("C", 4.0)]
+    assert [r["SKU"] for r in diff_all(CatalogDiff(min_change_pct=1.0), old, new)] == ["B"]
+    assert [r["Change"] for r in diff_all(CatalogDiff(include_unchanged=True), old, new)] == [
+        "changed", "changed", "unchanged",
+    ]
+
+
+@pytest.mark.parametrize("memory_rows, partitions", [(1, 1), (8, 4), (50, 7), (150, 3)])
+def test_spilled_join_matches_in_memory_join(memory_rows, partitions):
+    old, new = price_lists()
+    in_memory = CatalogDiff()
+    expected = diff_all(in_memory, old, new)
+    assert not in_memory.stats.spilled
+
+    spilled = CatalogDiff(memory_rows=memory_rows, partitions=partitions)
+    records = diff_all(spilled, old, new)
+    assert spilled.stats.spilled
+
+    # Partitions change the order, not the result
+    key = lambda r: (r["Change"], r["SKU"])  # noqa: E731
+    assert sorted(records, key=key) == sorted(expected, key=key)
+    assert spilled.stats == catalog_diff.DiffStats(**{**vars(in_memory.stats), "spilled": True})
+
+
+def test_spill_while_streaming_the_new_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(catalog_diff.tempfile, "tempdir", str(tmp_path))
+    old = [row(f"O{i}", 1.0) for i in range(5)]
+    new = [row(f"N{i}", 2.0) for i in range(20)] + [row("O1", 1.5), row("N3", 9.0)]
+
+    diff = CatalogDiff(memory_rows=10, partitions=4)
+    records = diff_all(diff, old, new)
+    assert diff.stats.spilled
+    assert sorted(r["SKU"] for r in records if r["Change"] == "added") == sorted(f"N{i}" for i in range(20))
+    assert [r["SKU"] for r in records if r["Change"] == "changed"] == ["O1"]
+    assert diff.stats.removed == 4
+    assert diff.stats.duplicates == 1
+    assert list(tmp_path.iterdir()) == []  # partition files are gone
+
+
+def test_spill_round_trips_prices_and_text():
+    old = [DiffRow("A,1", 'Say "hi"', "Line\nbreak", "", "", "", 0.1 + 0.2), row("B", None)]
+    new = [DiffRow("A,1", 'Say "hi"', "Line\nbreak", "", "", "", 0.3), row("B", None), row("C", 1.0)]
+    expected = diff_all(CatalogDiff(), old, new)
+    spilled = CatalogDiff(memory_rows=0, partitions=2)
+    records = diff_all(spilled, old, new)
+    assert spilled.stats.spilled
+    assert sorted(records, key=lambda r: r["SKU"]) == sorted(expected, key=lambda r: r["SKU"])
+
+
+def vendor_csv(rows: int) -> bytes:
+    lines = ["Acme Price List", "", "Manufacturer,Style Name,Color Name,SKU,Product Type,Pricing Unit,Cut Cost"]
+    lines += [f"Acme,Style {i},Café {i},SKU{i:05d},Carpet,SY,{i / 8:.2f}" for i in range(rows)]
+    return ("\r\n".join(lines) + "\r\n").encode("cp1252")
+
+
+@pytest.mark.parametrize("block_chars", [1, 7, 4096])
+def test_stream_reader_matches_build_reader(db, monkeypatch, block_chars):
+    monkeypatch.setattr(b2b, "STREAM_BLOCK_CHARS", block_chars)
+    data = vendor_csv(500)
+    streamed = b2b.build_stream_reader(io.BytesIO(data), "acme.csv")
+    whole = b2b.build_reader(data, "acme.csv")
+    assert streamed.fieldnames == whole.fieldnames
+    assert streamed.is_soho == whole.is_soho
+    assert list(streamed) == list(whole)
+
+
+def test_text_lines_split_like_splitlines(monkeypatch):
+    text = "a\r\nb\rc\n\nd\x0ce f\r"
+    for block_chars in (1, 2, 3, 100):
+        monkeypatch.setattr(b2b, "STREAM_BLOCK_CHARS", block_chars)
+        assert list(b2b.iter_text_lines(io.StringIO(text, newline=""))) == text.splitlines()
+
+
+def test_diff_endpoint(client):
+    old = vendor_csv(30)
+    new = vendor_csv(40).replace(b"SKU00003,Carpet,SY,0.38", b"SKU00003,Carpet,SY,0.50")
+    res = client.post("/b2b/diff", files={"old": ("old.csv", old), "new": ("new.csv", new)},
+                      data={"filename": "changes.csv"})
+    assert res.status_code == 200
+    assert res.headers["content-disposition"] == 'attachment; filename="changes.csv"'
+
+    reader = csv.DictReader(io.StringIO(res.text))
+    assert reader.fieldnames == DIFF_HEADERS
+    records = list(reader)
+    assert [r["SKU"] for r in records if r["Change"] == "added"] == [f"SKU{i:05d}" for i in range(30, 40)]
+    changed = [r for r in records if r["Change"] == "changed"]
+    assert [(r["SKU"], r["Old Price"], r["New Price"]) for r in changed] == [("SKU00003", "0.38", "0.5")]
+    assert all(r["Change"] != "removed" for r in records)
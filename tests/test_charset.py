@@ -0,0 +1,57 @@
+# test_charset.py
+import codecs
+
+import pytest
+
+from app.backend import charset
+
+TEXT = "Manufacturer,SKU,Style\nAcme,A1,Café crème\n"
+
+
+@pytest.mark.parametrize("data, expected", [
+    (b"SKU,Price\n1,2\n", "utf-8"),
+    (TEXT.encode("utf-8"), "utf-8"),
+    (codecs.BOM_UTF8 + TEXT.encode("utf-8"), "utf-8-sig"),
+    (TEXT.encode("utf-16"), "utf-16"),
+    (TEXT.encode("utf-16-le"), "utf-16-le"),
+    (TEXT.encode("utf-16-be"), "utf-16-be"),
+    (TEXT.encode("latin-1"), "latin-1"),
+    ("Acme – “Premium” Oak\n".encode("cp1252"), "cp1252"),
+    (b"caf\xe9 \x81\x93\n", "latin-1"),
+    ("SKU,Style\nA1,Café\n".encode("utf-8")[:-3], "utf-8"),  # é cut in half at the prefix end
+])
+def test_detect_encoding(data, expected):
+    assert charset.detect_encoding(data) == expected
+
+
+def test_only_the_prefix_decides():
+    data = b"SKU,Price\n" * (charset.ENCODING_PREFIX_BYTES // 10 + 1) + "Café\n".encode("latin-1")
+    assert charset.detect_encoding(data) == "utf-8"
+
+    # The stray byte past the prefix decodes as cp1252 instead of failing
+    text, encoding = charset.decode(data)
+    assert encoding == "utf-8"
+    assert text.endswith("Café\n")
+
+
+def test_invalid_bytes_fall_back_to_cp1252():
+    text, _ = charset.decode(b"\x93quoted\x94 \x81", "utf-8")
+    assert text == "“quoted” \x81"
+
+
+def test_incremental_decoding_matches_whole_file_decoding():
+    data = ("Style,Color\n" + "Café,“Grey” – mist\n" * 50).encode("utf-8") + b"\xe9\n"
+    decoder = charset.incremental_decoder("utf-8")
+    pieces = [decoder.decode(data[i:i + 3]) for i in range(0, len(data), 3)]
+    pieces.append(decoder.decode(b"", final=True))
+    assert "".join(pieces) == charset.decode(data, "utf-8")[0]
+
+
+def test_convert_reads_every_encoding_alike(client):
+    csv_text = "Manufacturer,SKU,Product Type,Pricing Unit,Cut Cost\nCrème Floors,A1,Carpet,SY,9.00\n"
+    outputs = {
+        encoding: client.post("/b2b/convert-to-b2b", files={"file": ("a.csv", csv_text.encode(encoding))}).content
+        for encoding in ("utf-8", "utf-8-sig", "utf-16", "cp1252")
+    }
+    assert len(set(outputs.values())) == 1
+    assert "Crème Floors" in outputs["cp1252"].decode("utf-8")
@@ -0,0 +1,144 @@
+# test_compression.py
+import gzip
+import io
+import sys
+
+import pytest
+from fastapi import HTTPException
+
+from app.backend import compression
+from app.backend.compression import Decompressor
+
+CSV = "Manufacturer,SKU,Product Type,Pricing Unit,Cut Cost\n" + "".join(
+    f"Acme,A{i},Carpet,SY,{i}.50\n" for i in range(200)
+)
+
+
+def inflate(data: bytes, block: int, max_bytes: int = 10 ** 9) -> bytes:
+    decompressor = Decompressor("gzip", max_bytes)
+    out = b"".join(decompressor.decompress(data[i:i + block]) for i in range(0, len(data), block))
+    decompressor.finish()
+    return out
+
+
+@pytest.mark.parametrize("block", [1, 7, 4096])
+def test_concatenated_members_and_padding(block):
+    data = gzip.compress(b"first,") + gzip.compress(b"second") + b"\x00" * 4
+    assert inflate(data, block) == b"first,second"
+
+
+def test_truncated_and_corrupt_data_are_400():
+    data = gzip.compress(CSV.encode())
+    with pytest.raises(HTTPException) as truncated:
+        inflate(data[:-10], 64)
+    assert (truncated.value.status_code, truncated.value.detail) == (400, "Truncated gzip data")
+
+    with pytest.raises(HTTPException) as corrupt:
+        inflate(data[:10] + b"\xff" * 50, 64)
+    assert corrupt.value.status_code == 400
+    assert corrupt.value.detail.startswith("Corrupt gzip data")
+
+
+def test_decompression_bomb_is_413():
+    bomb = gzip.compress(b"\x00" * 1_000_000)
+    assert len(bomb) < 2000
+    with pytest.raises(HTTPException) as too_big:
+        inflate(bomb, 256, max_bytes=100_000)
+    assert too_big.value.status_code == 413
+
+
+def test_zstd_needs_its_package(monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    with pytest.raises(HTTPException) as missing:
+        Decompressor("zstd")
+    assert missing.value.status_code == 400
+
+
+def test_zstd_frames():
+    zstandard = pytest.importorskip("zstandard")
+    frames = zstandard.ZstdCompressor().compress(b"a,b\n") + zstandard.ZstdCompressor().compress(b"1,2\n")
+    assert compression.decompress(frames) == b"a,b\n1,2\n"
+
+
+def test_detection_and_names():
+    assert compression.detect(gzip.compress(b"x")[:4]) == "gzip"
+    assert compression.detect(b"\x28\xb5\x2f\xfd") == "zstd"
+    assert compression.detect(b"SKU,") is None
+    assert compression.decompress(b"SKU,Price\n") == b"SKU,Price\n"
+    assert compression.plain_name("List.CSV.GZ") == "List.CSV"
+    assert compression.plain_name("list.xlsx") == "list.xlsx"
+    assert compression.plain_name(None) is None
+
+
+def test_spool_file():
+    plain = io.BytesIO(CSV.encode())
+    assert compression.spool_file(plain) is plain
+
+    spooled = compression.spool_file(io.BytesIO(gzip.compress(CSV.encode())))
+    assert spooled.read() == CSV.encode()
+    spooled.close()
+
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    (None, False),
+    ("gzip", True),
+    ("deflate, GZIP;q=0.5", True),
+    ("gzip;q=0", False),
+    ("br, *", True),
+    ("identity", False),
+])
+def test_accepts_gzip(accept_encoding, expected):
+    assert compression.accepts_gzip(accept_encoding) is expected
+
+
+def test_negotiate():
+    assert compression.negotiate("gzip", None) == "file"
+    assert compression.negotiate(None, "gzip") == "encoding"
+    assert compression.negotiate("none", "gzip") is None
+    assert compression.negotiate(None, None) is None
+    with pytest.raises(HTTPException):
+        compression.negotiate("brotli", None)
+
+
+def test_gzip_chunks_stream_text_and_bytes():
+    chunks = list(compression.gzip_chunks(["a,b\n", b"1,2\n", ""]))
+    assert gzip.decompress(b"".join(chunks)) == b"a,b\n1,2\n"
+
+
+def convert(client, data: bytes, upload_name: str = "list.csv", headers=None, **form):
+    return client.post("/b2b/convert-to-b2b", files={"file": (upload_name, data)}, data=form, headers=headers)
+
+
+def test_gzip_uploads_convert_like_plain_ones(client):
+    plain = convert(client, CSV.encode(), headers={"Accept-Encoding": "identity"})
+    # Recognized by magic bytes, whatever the file is called
+    for name in ("list.csv.gz", "list.csv"):
+        res = convert(client, gzip.compress(CSV.encode()), name, headers={"Accept-Encoding": "identity"})
+        assert res.status_code == 200
+        assert res.content == plain.content
+
+    assert convert(client, gzip.compress(CSV.encode())[:-8]).status_code == 400
+
+
+def test_oversized_upload_is_413(client, monkeypatch):
+    monkeypatch.setattr(Decompressor.__init__, "__defaults__", (1000,))  # max_bytes=MAX_DECOMPRESSED_BYTES
+    res = convert(client, gzip.compress(CSV.encode()))
+    assert res.status_code == 413
+
+
+def test_download_compression(client):
+    encoded = convert(client, CSV.encode(), headers={"Accept-Encoding": "gzip"})
+    assert encoded.headers["content-encoding"] == "gzip"
+    assert encoded.headers["vary"] == "Accept-Encoding"
+    plain = convert(client, CSV.encode(), headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert encoded.content == plain.content  # the client undid the encoding
+
+    as_file = convert(client, CSV.encode(), compress="gzip", filename="out.csv")
+    assert as_file.headers["content-type"] == "application/gzip"
+    assert as_file.headers["content-disposition"] == 'attachment; filename="out.csv.gz"'
+    assert gzip.decompress(as_file.content) == plain.content
+
+    kept_plain = convert(client, CSV.encode(), headers={"Accept-Encoding": "gzip"}, compress="none")
+    assert "content-encoding" not in kept_plain.headers
+    assert convert(client, CSV.encode(), compress="brotli").status_code == 400
@@ -0,0 +1,105 @@
+# test_dedupe.py
+import csv
+import io
+
+import pytest
+from fastapi import HTTPException
+
+from app.backend.dedupe import Deduplicator, as_cost, key_digest, parse_dedupe_options
+
+ROWS = [
+    {"sku": "A1", "cost": "5.00", "n": 1},
+    {"sku": "A2", "cost": "3.00", "n": 2},
+    {"sku": "a1 ", "cost": "$1,250.00", "n": 3},
+    {"sku": "", "cost": "1.00", "n": 4},
+    {"sku": "A1", "cost": "4.50", "n": 5},
+    {"sku": "", "cost": "1.00", "n": 6},
+    {"sku": "A2", "cost": "", "n": 7},
+]
+
+
+def run(policy):
+    dedupe = Deduplicator(policy, key_of=lambda r: [r["sku"]], cost_of=lambda r: r["cost"])
+    kept = [r["n"] for r in dedupe.apply(ROWS)]
+    return kept, dedupe.removed
+
+
+@pytest.mark.parametrize("policy, kept, removed", [
+    ("none", [1, 2, 3, 4, 5, 6, 7], 0),
+    ("first", [1, 2, 4, 6], 3),
+    ("last", [5, 7, 4, 6], 3),
+    ("lowest-cost", [5, 2, 4, 6], 3),
+])
+def test_policies(policy, kept, removed):
+    assert run(policy) == (kept, removed)
+
+
+def test_error_policy_names_the_duplicate():
+    with pytest.raises(HTTPException) as rejected:
+        run("error")
+    assert rejected.value.status_code == 400
+    assert rejected.value.detail == "Duplicate key ['a1 '] at data row 3"
+
+
+def test_keys_are_normalized_and_empty_keys_never_match():
+    assert key_digest(["Acme", "A1"]) == key_digest([" acme", "a1 "])
+    assert key_digest(["Acme", "A1"]) != key_digest(["Acme", "A1 x"])
+    assert key_digest(["Acme", ""]) is None
+    assert key_digest(["Acme", None]) is None
+    assert len(key_digest(["Acme", "A1"])) == 8
+
+
+def test_costs_are_read_like_the_converter_reads_them():
+    assert as_cost("$1,250.00") == 1250.0
+    assert as_cost(" 3.5 ") == 3.5
+    assert as_cost(2) == 2.0
+    assert as_cost("call") is None
+    assert as_cost(None) is None
+
+
+def test_options_are_validated():
+    assert parse_dedupe_options(None, None) == ("none", ["manufacturer", "sku"])
+    assert parse_dedupe_options(" Lowest-Cost ", "SKU, color") == ("lowest-cost", ["sku", "color"])
+    for policy, key in (("newest", None), ("first", "sku,price"), ("first", " , ")):
+        with pytest.raises(HTTPException):
+            parse_dedupe_options(policy, key)
+
+
+VENDOR_CSV = (
+    "Manufacturer,Style Name,SKU,Product Type,Pricing Unit,Cut Cost\n"
+    "Acme,Oak,A1,Carpet,SY,$12.00\n"
+    "Acme,Oak,A2,Carpet,SY,9.00\n"
+    "Acme,Oak,A1,Carpet,SY,$10.50\n"
+)
+
+
+def test_convert_reports_removed_duplicates(client):
+    res = client.post("/b2b/convert-to-b2b", files={"file": ("acme.csv", VENDOR_CSV)}, data={"dedupe": "lowest-cost"})
+    assert res.status_code == 200
+    assert res.headers["x-duplicates-removed"] == "1"
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [(r["SKU"], r["Cut Cost"]) for r in rows] == [("A1", "10.5"), ("A2", "9.0")]
+
+    res = client.post("/b2b/convert-to-b2b", files={"file": ("acme.csv", VENDOR_CSV)}, data={"dedupe": "error"})
+    assert res.status_code == 400
+
+
+def test_duplicates_are_kept_unless_asked(client):
+    res = client.post("/b2b/convert-to-b2b", files={"file": ("acme.csv", VENDOR_CSV)})
+    assert res.headers["x-duplicates-removed"] == "0"
+    assert [r["SKU"] for r in csv.DictReader(io.StringIO(res.text))] == ["A1", "A2", "A1"]
+
+    preview = client.post("/b2b/preview", files={"file": ("acme.csv", VENDOR_CSV)}).json()
+    assert (len(preview["rows_preview"]), preview["duplicates_removed"]) == (3, 0)
+
+    imported = client.post("/b2b/import/csv", files={"file": ("acme.csv", VENDOR_CSV)}).json()
+    assert (imported["imported"], imported["duplicates_removed"]) == (3, 0)
+
+
+def test_import_reports_removed_duplicates(client):
+    qfloors = "Manufacturer,SKU,Price\nAcme,A1,3.0\nAcme,A1,2.0\nBirch,A1,4.0\n"
+    res = client.post("/qfloors/import", files={"file": ("q.csv", qfloors)}, data={"dedupe": "last"})
+    assert res.status_code == 200
+    assert res.json()["duplicates_removed"] == 1
+    prices = sorted(p["price"] for p in client.get("/products/").json())
+    assert prices == [2.0, 4.0]
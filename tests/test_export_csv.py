@@ -0,0 +1,63 @@
+# test_export_csv.py
+import csv
+import io
+
+from app.backend import catalog_export, models
+from app.backend.routers.b2b_import_export import B2B_HEADERS
+
+
+def seed(db):
+    acme = models.Vendor(name="Acme")
+    birch = models.Vendor(name="Birch")
+    db.add_all([
+        models.Product(vendor=acme, sku="A1", style="Oak", product_type="FLOORING", pricing_unit="SF",
+                       price=3.25, is_promo=True, display_online=False, barcode="0001"),
+        models.Product(vendor=acme, sku="A2", style="Oak, \"Dark\"", product_type="CARPET", price=12.5),
+        models.Product(vendor=birch, sku="B1", product_type="CARPET", price=9.0, is_dropped=True),
+        models.Product(sku="X1", product_type="CARPET"),
+    ])
+    db.commit()
+
+
+def read_csv(text: str) -> list[dict]:
+    reader = csv.DictReader(io.StringIO(text))
+    assert reader.fieldnames == B2B_HEADERS
+    return list(reader)
+
+
+def test_exports_every_product_in_the_b2b_layout(client, db):
+    seed(db)
+    res = client.get("/b2b/export/csv")
+    assert res.status_code == 200
+    assert res.headers["content-disposition"] == 'attachment; filename="b2b_export.csv"'
+
+    rows = read_csv(res.text)
+    assert [r["SKU"] for r in rows] == ["A1", "A2", "B1", "X1"]
+    first = rows[0]
+    assert first["~~Manufacturer"] == "Acme"
+    assert first["Cut Cost"] == first["Roll Cost"] == "3.25"
+    assert (first["Is Promo"], first["Is Dropped"], first["Display Online"]) == ("1", "0", "0")
+    assert first["Barcode"] == "0001"
+    assert rows[1]["Style Name"] == 'Oak, "Dark"'
+    assert rows[2]["Is Dropped"] == "1"
+    assert rows[3]["~~Manufacturer"] == "Unknown Vendor"
+    assert rows[3]["Cut Cost"] == ""
+
+
+def test_filters_by_vendor_and_product_type(client, db):
+    seed(db)
+    rows = read_csv(client.get("/b2b/export/csv", params={"vendor": ["Acme", "Birch"], "product_type": "carpet"}).text)
+    assert [r["SKU"] for r in rows] == ["A2", "B1"]
+
+    rows = read_csv(client.get("/b2b/export/csv", params={"vendor": "Nobody"}).text)
+    assert rows == []
+
+
+def test_stream_csv_flushes_in_chunks(db, monkeypatch):
+    seed(db)
+    monkeypatch.setattr(catalog_export, "CSV_FLUSH_BYTES", 16)
+    rows = list(catalog_export.iter_catalog(db, catalog_export.catalog_query(), batch_size=2))
+
+    chunks = list(catalog_export.stream_csv(["sku", "price"], rows, lambda r: {"sku": r.sku, "price": r.price}))
+    assert len(chunks) > 1
+    assert "".join(chunks).splitlines() == ["sku,price", "A1,3.25", "A2,12.5", "B1,9.0", "X1,"]
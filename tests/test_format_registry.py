@@ -0,0 +1,103 @@
+# test_format_registry.py
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.backend import database, formats, models
+from app.backend.routers import b2b_import_export
+from app.backend.writer import WriteCoordinator
+
+LINES = ["Acme price list", "", "SKU;Style;Cut Cost", "A1;Oak;3.25"]
+
+
+def make_registry(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'formats.db'}", connect_args={"check_same_thread": False})
+    database.configure_sqlite(engine)
+    database.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    writer = WriteCoordinator(session_factory=Session)
+    return Session, writer, formats.FormatRegistry(session_factory=Session, writer=writer)
+
+
+class CountingDetect:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, lines, encoding):
+        self.calls += 1
+        return b2b_import_export.detect_text_format(lines, encoding)
+
+
+def wait_for_writer(writer):
+    writer.submit(lambda db: None).result(timeout=10)
+
+
+def test_detects_once_and_persists_through_the_writer(tmp_path):
+    Session, writer, registry = make_registry(tmp_path)
+    detect = CountingDetect()
+    fp = formats.fingerprint("\n".join(LINES).encode())
+
+    first = registry.resolve(fp, LINES, "utf-8", detect)
+    second = registry.resolve(fp, LINES, "utf-8", detect)
+    assert first == second
+    assert (first.header_index, first.delimiter) == (2, ";")
+    assert detect.calls == 1
+    assert registry.stats()["hits"] == 1
+
+    wait_for_writer(writer)
+    with Session() as db:
+        row = db.get(models.VendorFormat, fp)
+    assert (row.header_index, row.delimiter, row.encoding) == (2, ";", "utf-8")
+
+    # A new process starts from the table, not from detection
+    restarted = formats.FormatRegistry(session_factory=Session, writer=writer)
+    assert restarted.resolve(fp, LINES, "utf-8", detect) == first
+    assert detect.calls == 1
+
+
+def test_changed_header_or_encoding_redetects(tmp_path):
+    _, writer, registry = make_registry(tmp_path)
+    detect = CountingDetect()
+    fp = formats.fingerprint(LINES[0].encode())
+    registry.resolve(fp, LINES, "utf-8", detect)
+
+    moved = ["Acme price list", "SKU;Style;Cut Cost;Roll Cost", "A1;Oak;3.25;3"]
+    fmt = registry.resolve(fp, moved, "utf-8", detect)
+    assert fmt.header_index == 1
+    registry.resolve(fp, moved, "cp1252", detect)
+    assert detect.calls == 3
+    assert registry.stats()["stale"] == 2
+
+
+def test_invalidate_removes_stored_entries(tmp_path):
+    Session, writer, registry = make_registry(tmp_path)
+    detect = CountingDetect()
+    for name in ("a", "b"):
+        registry.resolve(formats.fingerprint(name.encode()), LINES, "utf-8", detect)
+    wait_for_writer(writer)
+
+    assert registry.invalidate(formats.fingerprint(b"a")) == 1
+    assert registry.invalidate() == 1
+    assert registry.list() == []
+    assert registry.stats()["cached_entries"] == 0
+
+
+def test_fingerprint_ignores_everything_after_the_first_line():
+    assert formats.fingerprint(b"SKU,Price\r\n1,2\n") == formats.fingerprint(b"SKU,Price\n3,4\n")
+    assert formats.fingerprint(b"SKU,Price\n") != formats.fingerprint(b"SKU;Price\n")
+
+
+def test_batch_pool_spawns_its_workers():
+    pool = b2b_import_export.get_batch_pool()
+    assert pool._mp_context.get_start_method() == "spawn"
+    assert b2b_import_export.get_batch_pool() is pool
+
+
+def test_formats_endpoints(client):
+    data = "\n".join(LINES).encode()
+    assert client.post("/b2b/preview", files={"file": ("acme.csv", data)}).status_code == 200
+    formats.registry.writer.submit(lambda db: None).result(timeout=10)
+
+    listed = client.get("/b2b/formats").json()
+    assert [f["fingerprint"] for f in listed["formats"]] == [formats.fingerprint(data)]
+    assert client.delete(f"/b2b/formats/{formats.fingerprint(data)}").status_code == 200
+    assert client.delete("/b2b/formats/unknown").status_code == 404
@@ -0,0 +1,79 @@
+# test_health.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.backend import database, health
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Only needed by particular endpoints; a booting worker should not pay for them
+DEFERRED_MODULES = (
+    "openpyxl", "multiprocessing", "concurrent.futures.process", "cProfile", "pstats", "alembic",
+    "app.backend.formats",
+)
+
+
+@pytest.fixture
+def unmigrated(db, monkeypatch):
+    engine = database.engine
+    monkeypatch.setattr(health, "_schema_ok", False)
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+
+def stamp(*revisions):
+    with database.engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL)"))
+        conn.execute(text("DELETE FROM alembic_version"))
+        for revision in revisions:
+            conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": revision})
+
+
+def test_healthz_does_not_need_the_database(client, monkeypatch):
+    monkeypatch.setattr(database, "engine", None)
+    assert client.get("/healthz").json() == {"status": "ok"}
+
+
+def test_readyz_waits_for_the_latest_migration(client, unmigrated):
+    heads = sorted(health.expected_heads())
+    assert len(heads) == 1
+
+    res = client.get("/readyz")
+    assert res.status_code == 503
+    assert res.json()["schema_revision"] == []
+
+    stamp("c27d90f4e1b8")
+    res = client.get("/readyz")
+    assert res.status_code == 503
+    assert res.json()["schema_revision"] == ["c27d90f4e1b8"]
+    assert res.json()["expected_revision"] == heads
+
+    stamp(*heads)
+    res = client.get("/readyz")
+    assert res.status_code == 200
+    assert res.json() == {"status": "ready", "database": "ok", "schema": "ok"}
+
+
+def test_readyz_reports_an_unreachable_database(client, unmigrated, monkeypatch, tmp_path):
+    monkeypatch.setattr(database, "engine", create_engine(f"sqlite:///{tmp_path}/missing/dir.db"))
+    res = client.get("/readyz")
+    assert res.status_code == 503
+    assert res.json()["database"] == "unavailable: OperationalError"
+
+
+def test_importing_the_app_defers_heavy_modules(tmp_path):
+    code = (
+        "import sys, app.backend.main; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{tmp_path}/import.db"},
+    )
+    assert out.stdout.strip() == ""
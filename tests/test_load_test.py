@@ -0,0 +1,96 @@
+# test_load_test.py
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+import load_test  # noqa: E402
+
+from app.backend.routers.b2b_import_export import convert_contents  # noqa: E402
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(500 if self.path == "/fail" else 200)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_synthetic_price_lists_are_reproducible_and_convertible(db):
+    data = load_test.vendor_csv(50, "Loadtest Mills", seed=3)
+    assert data == load_test.vendor_csv(50, "Loadtest Mills", seed=3)
+    assert data != load_test.vendor_csv(50, "Loadtest Mills", seed=4)
+
+    _, rows, removed = convert_contents(data, source_name="pricelist.csv")
+    assert (rows, removed) == (50, 0)
+
+
+def test_multipart_bodies_are_accepted_by_the_api(client):
+    routes = load_test.build_routes(rows=20)
+    for name in ("preview", "convert", "import"):
+        route = routes[name]
+        body, content_type = route.build()
+        res = client.request(route.method, route.path, content=body, headers={"Content-Type": content_type})
+        assert res.status_code == 200, name
+    assert client.get("/vendors/").json()[0]["name"] == load_test.LOADTEST_VENDOR
+
+
+def test_mix_parsing():
+    routes = load_test.build_routes(rows=1)
+    mix = load_test.parse_mix(load_test.DEFAULT_MIX, routes)
+    assert [(route.name, weight) for route, weight in mix] == [
+        ("products", 30.0), ("vendors", 20.0), ("preview", 20.0), ("convert", 20.0), ("import", 10.0),
+    ]
+    assert load_test.parse_mix("vendors", routes)[0][1] == 1.0
+    with pytest.raises(SystemExit):
+        load_test.parse_mix("checkout=5", routes)
+    with pytest.raises(SystemExit):
+        load_test.parse_mix("products=0", routes)
+
+
+def test_percentiles_interpolate():
+    values = [0.1, 0.2, 0.3, 0.4]
+    assert load_test.percentile([], 50) == 0.0
+    assert load_test.percentile(values, 0) == 0.1
+    assert load_test.percentile(values, 50) == pytest.approx(0.25)
+    assert load_test.percentile(values, 100) == 0.4
+
+
+def test_summary_counts_errors_by_kind():
+    samples = [(0.010, True, None), (0.030, False, "HTTP 503"), (0.020, True, None), (0.050, False, "HTTP 503")]
+    summary = load_test.summarize(samples, elapsed=2.0)
+    assert summary["requests"] == 4
+    assert summary["error_rate"] == 0.5
+    assert summary["throughput_rps"] == 2.0
+    assert summary["max_ms"] == 50.0
+    assert summary["error_kinds"] == {"HTTP 503": 2}
+
+
+def test_open_loop_run_records_every_request(server):
+    ok = load_test.Route("ok", "GET", "/ok")
+    fail = load_test.Route("fail", "GET", "/fail")
+    recorder, elapsed = load_test.run(server, [(ok, 3), (fail, 1)], rate=200, duration=0.3,
+                                      concurrency=8, timeout=5, seed=1)
+
+    assert elapsed >= 0.3
+    samples = recorder.samples
+    assert set(samples) == {"ok", "fail"}
+    assert all(s[1] for s in samples["ok"])
+    assert all(s == (s[0], False, "HTTP 500") for s in samples["fail"])
+    assert 20 < len(samples["ok"]) + len(samples["fail"]) < 150
@@ -0,0 +1,179 @@
+# test_lookup.py
+import time
+
+import pytest
+
+from app.backend import database, debug_auth, models
+from app.backend.lookup import ProductLookup, product_lookup
+
+
+def seed(db):
+    acme, birch = models.Vendor(name="Acme"), models.Vendor(name="Birch")
+    db.add_all([acme, birch])
+    db.flush()
+    db.add_all([
+        models.Product(vendor=acme, sku="A1", barcode="0001", style="Oak", price=3.0, is_dropped=True),
+        models.Product(vendor=acme, sku="A1", barcode="0001", style="Oak", price=3.5),
+        models.Product(vendor=acme, sku="A2", barcode="0002", style="Ash", price=4.0),
+        models.Product(vendor=birch, sku="A2", barcode=" 0003 ", style="Elm", price=None),
+        models.Product(sku="X1", barcode=None, style="Loose"),
+    ])
+    db.commit()
+    return acme.id, birch.id
+
+
+def wait_ready(lookup: ProductLookup) -> None:
+    deadline = time.monotonic() + 10
+    while not lookup.stats()["ready"]:
+        assert time.monotonic() < deadline, "lookup index was not built"
+        time.sleep(0.01)
+
+
+def built(lookup: ProductLookup = None) -> ProductLookup:
+    lookup = lookup or ProductLookup()
+    lookup.warm()
+    wait_ready(lookup)
+    return lookup
+
+
+def ids(found: tuple[list, list]) -> tuple[list, list]:
+    return tuple([record and record["id"] for record in records] for records in found)
+
+
+def test_first_lookup_starts_the_build_and_falls_back_to_sql(db):
+    seed(db)
+    lookup = ProductLookup()
+    assert lookup.stats()["building"] is False
+    assert lookup.find(["0001"]) is None  # not built: the caller asks SQL
+    wait_ready(lookup)
+    assert lookup.find(["0001"]) is not None
+    assert lookup.stats()["builds"] == 1
+
+
+def test_index_and_sql_agree(db):
+    acme, birch = seed(db)
+    lookup = built()
+    barcodes = ["0001", "0002", "0003\n", "", "9999", "0001"]
+    skus = [(acme, "A1"), (acme, " A2 "), (birch, "A2"), (birch, "A1"), (acme, ""), (None, "X1")]
+
+    from_index = lookup.find(barcodes, skus)
+    assert from_index == lookup.find_in_db(barcodes, skus)
+    # Live products before dropped ones, whatever the id order
+    assert ids(from_index) == ([2, 3, 4, None, None, 2], [2, 3, 4, None, None, None])
+    assert from_index[0][0]["is_dropped"] is False
+    assert lookup.stats()["index_lookups"] == 1
+    assert lookup.stats()["sql_lookups"] == 1
+
+
+def test_patches_keep_the_index_current(db):
+    acme, _ = seed(db)
+    lookup = built()
+
+    live = db.get(models.Product, 2)
+    db.delete(live)
+    db.commit()
+    lookup.removed(2)
+    assert ids(lookup.find(["0001"], [(acme, "A1")])) == ([1], [1])  # only the dropped one is left
+
+    product = models.Product(vendor_id=acme, sku="A1", barcode="0001", style="Oak")
+    db.add(product)
+    db.commit()
+    lookup.added(product)
+    assert ids(lookup.find(["0001"])) == ([product.id], [])
+    assert lookup.stats()["builds"] == 1
+
+
+def test_patches_during_a_rebuild_are_replayed(db, monkeypatch):
+    acme, _ = seed(db)
+    lookup = built()
+    build = lookup._build
+
+    def build_then_race():
+        # A create and a delete commit after the rebuild's SELECT has read the table
+        index = build()
+        with database.SessionLocal() as session:
+            product = models.Product(vendor_id=acme, sku="N1", barcode="0100", style="New")
+            session.add(product)
+            session.delete(session.get(models.Product, 3))
+            session.commit()
+            lookup.added(product)
+        lookup.removed(3)
+        return index
+
+    monkeypatch.setattr(lookup, "_build", build_then_race)
+    lookup.mark_stale()
+    wait_ready(lookup)
+    monkeypatch.undo()
+
+    barcodes, skus = ["0100", "0002"], [(acme, "N1"), (acme, "A2")]
+    assert ids(lookup.find(barcodes, skus)) == ([6, None], [6, None])
+    assert lookup.find(barcodes, skus) == lookup.find_in_db(barcodes, skus)
+
+
+def test_change_during_a_rebuild_builds_again(db, monkeypatch):
+    seed(db)
+    lookup = built()
+    build = lookup._build
+    calls = []
+
+    def build_then_change():
+        calls.append(1)
+        index = build()
+        if len(calls) == 1:
+            lookup.mark_stale()  # e.g. an import committed mid-build
+        return index
+
+    monkeypatch.setattr(lookup, "_build", build_then_change)
+    lookup.mark_stale()
+    wait_ready(lookup)
+    assert len(calls) == 2
+
+
+def test_endpoints(client, db, monkeypatch):
+    acme, _ = seed(db)
+    product_lookup.mark_stale()
+    wait_ready(product_lookup)
+
+    res = client.get("/products/lookup", params={"barcode": "0001"})
+    assert res.json()["id"] == 2
+    assert client.get("/products/lookup", params={"vendor_id": acme, "sku": "A2"}).json()["style"] == "Ash"
+    assert client.get("/products/lookup", params={"barcode": "9999"}).status_code == 404
+    assert client.get("/products/lookup", params={"sku": "A2"}).status_code == 400
+
+    res = client.post("/products/lookup", json={"barcodes": ["0002", "9999"], "skus": [{"vendor_id": acme, "sku": "A1"}]})
+    assert [(b["barcode"], b["product"] and b["product"]["id"]) for b in res.json()["barcodes"]] == [
+        ("0002", 3), ("9999", None),
+    ]
+    assert res.json()["skus"][0]["product"]["id"] == 2
+
+    # An import marks the index stale; lookups keep answering while it rebuilds
+    client.post("/qfloors/import", files={"file": ("q.csv", "Manufacturer,SKU,Price\nAcme,A9,2.0\n")})
+    assert client.get("/products/lookup", params={"vendor_id": acme, "sku": "A9"}).json()["price"] == 2.0
+
+    monkeypatch.setattr(debug_auth, "DEBUG_TOKEN", "s3cret")
+    stats = client.get("/debug/lookup", headers={"X-Debug-Token": "s3cret"}).json()
+    assert stats["index_lookups"] + stats["sql_lookups"] >= 5
+
+
+def test_no_startup_warm_up_by_default():
+    from app.backend.main import app
+
+    assert "warm_lookup_index" not in [handler.__name__ for handler in app.router.on_startup]
+
+
+def test_vendor_clear_all_rebuilds_the_index(client, db):
+    seed(db)
+    product_lookup.mark_stale()
+    wait_ready(product_lookup)
+    builds = product_lookup.stats()["builds"]
+
+    assert client.delete("/vendors/clear-all").status_code == 200
+    wait_ready(product_lookup)
+    assert product_lookup.stats()["builds"] == builds + 1
+
+
+@pytest.mark.parametrize("code", [None, "", "  "])
+def test_blank_barcodes_match_nothing(db, code):
+    seed(db)
+    lookup = built()
+    assert lookup.find([code]) == ([None], [])
@@ -0,0 +1,167 @@
+# test_pricing_formula.py
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from app.backend import models, pricing
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[1] / "alembic"
+
+
+@pytest.mark.parametrize("formula, cost, freight, expected", [
+    ("cost * 1.85 + freight", 10.0, 1.0, 19.5),
+    ("2.1", 10.0, 0.0, 21.0),
+    ("* 1.8 + 0.5", 10.0, 0.0, 18.5),
+    ("x2", 3.0, 0.0, 6.0),
+    ("end_in(cost * 2, 0.99)", 5.5, 0.0, 11.99),
+    ("ceil_to(cost * 1.6, 0.05)", 3.33, 0.0, 5.35),
+    ("round_to(cost, 0.25)", 3.1, 0.0, 3.0),
+    ("max(cost * 1.1, cost + 2)", 10.0, 0.0, 12.0),
+    ("abs(-4) - cost", 1.0, 0.0, 3.0),
+    ("- 0.5 * 2", 10.0, 0.0, 9.0),
+    ("cost - 0.5", 10.0, 0.0, 9.5),
+])
+def test_formulas_compile_and_evaluate(formula, cost, freight, expected):
+    assert pricing.evaluate_batch(formula, [(cost, freight)]) == [expected]
+
+
+@pytest.mark.parametrize("formula, message", [
+    ("__import__('os').system('true')", "may be called"),
+    ("__import__", "Unknown name in formula: __import__"),
+    ("cost.__class__", "Unsupported syntax in formula: Attribute"),
+    ("(1).real", "Unsupported syntax in formula: Attribute"),
+    ("open('x')", "may be called"),
+    ("[c for c in ()]", "Unsupported syntax"),
+    ("lambda: 1", "Unsupported syntax in formula: Lambda"),
+    ("cost ** 99", "Unsupported syntax in formula: Pow"),
+    ("'a' * 3", "Only numeric constants are allowed"),
+    ("round(cost, ndigits=2)", "Keyword arguments are not allowed"),
+    ("cost *", "Invalid formula"),
+    ("  ", "Empty formula"),
+    ("-0.5", "Ambiguous formula '-0.5': write it as cost - 0.5 or cost * -0.5"),
+    ("+ 2", "Ambiguous formula"),
+])
+def test_unsafe_or_invalid_formulas_are_rejected(formula, message):
+    with pytest.raises(pricing.FormulaError) as rejected:
+        pricing.compile_formula(formula)
+    assert message in str(rejected.value)
+
+
+def test_failures_evaluate_to_none_and_groups_share_a_function():
+    assert pricing.evaluate_batch("cost / freight", [(1.0, 0.0), (1.0, 2.0)]) == [None, 0.5]
+
+    results = pricing.evaluate_grouped([
+        ("a", "cost * 2", 1.0, None),
+        ("b", "cost + freight", 1.0, 0.5),
+        ("c", "cost * 2", None, None),
+    ])
+    assert results == {"a": 2.0, "b": 1.5, "c": 0.0}
+    assert pricing.compile_formula("cost * 2") is pricing.compile_formula("cost * 2")
+
+
+def test_groups_are_evaluated_column_wise(monkeypatch):
+    calls = []
+    column_formula = pricing.compile_column_formula
+
+    def counted(text):
+        fn = column_formula(text)
+        return lambda columns: calls.append(text) or fn(columns)
+
+    monkeypatch.setattr(pricing, "compile_column_formula", counted)
+    items = [(i, "cost * 2" if i % 2 else "cost + freight", float(i), 1.0) for i in range(1000)]
+    results = pricing.evaluate_grouped(items)
+    assert sorted(calls) == ["cost * 2", "cost + freight"]
+    assert results[3] == 6.0 and results[4] == 5.0
+
+
+def seed(db):
+    acme = models.Vendor(name="Acme")
+    db.add_all([
+        models.Product(vendor=acme, sku="A1", product_type="CARPET", price=10.0, freight=1.0),
+        models.Product(vendor=acme, sku="A2", product_type="CARPET", price=4.0, retail_formula="cost * 3"),
+        models.Product(vendor=acme, sku="A3", product_type="CARPET", price=5.0, retail_formula="cost.real"),
+        models.Product(vendor=acme, sku="A4", product_type="TILE", price=8.0),
+    ])
+    db.commit()
+    return acme.id
+
+
+def test_generate_is_incremental(client, db):
+    vendor_id = seed(db)
+    res = client.post("/pricelists/", json={"name": "Retail", "formula": "cost * 2 + freight",
+                                            "vendor_id": vendor_id, "product_type": "CARPET"})
+    assert res.status_code == 200
+    pricelist_id = res.json()["id"]
+
+    first = client.post(f"/pricelists/{pricelist_id}/generate").json()
+    assert (first["products"], first["computed"], first["failed"]) == (3, 3, 0)
+    assert first["invalid_product_formulas"] == ["cost.real"]
+
+    items = client.get(f"/pricelists/{pricelist_id}/items").json()["items"]
+    assert [(i["sku"], i["retail_price"]) for i in items] == [("A1", 21.0), ("A2", 12.0), ("A3", 10.0)]
+
+    again = client.post(f"/pricelists/{pricelist_id}/generate").json()
+    assert (again["computed"], again["unchanged"]) == (0, 3)
+
+    db.query(models.Product).filter_by(sku="A1").update({"price": 20.0})
+    db.commit()
+    changed = client.post(f"/pricelists/{pricelist_id}/generate").json()
+    assert (changed["computed"], changed["unchanged"]) == (1, 2)
+
+
+def test_unsafe_list_formula_is_refused(client):
+    res = client.post("/pricelists/", json={"name": "Evil", "formula": "__import__('os').getcwd()"})
+    assert res.status_code == 400
+    assert client.get("/pricelists/").json() == []
+
+
+def item_count(db):
+    return db.query(models.PriceListItem).count()
+
+
+def test_deleting_products_deletes_their_items(client, db):
+    seed(db)
+    pricelist_id = client.post("/pricelists/", json={"name": "All", "formula": "2"}).json()["id"]
+    client.post(f"/pricelists/{pricelist_id}/generate")
+    assert item_count(db) == 4
+
+    a1 = db.query(models.Product).filter_by(sku="A1").one().id
+    assert client.delete(f"/products/{a1}").status_code == 204
+    assert item_count(db) == 3
+
+    a2 = db.query(models.Product).filter_by(sku="A2").one().id
+    assert client.post("/products/bulk/delete", json={"filter": {"ids": [a2]}}).status_code == 200
+    assert item_count(db) == 2
+
+    replacement = "Manufacturer,SKU,Price\nAcme,A9,7.0\n"
+    client.post("/qfloors/import", files={"file": ("acme.csv", replacement)}, data={"mode": "replace"})
+    assert item_count(db) == 0
+
+    client.post(f"/pricelists/{pricelist_id}/generate")
+    assert item_count(db) == 1
+    assert client.delete("/products/clear-all").status_code == 200
+    assert item_count(db) == 0
+
+
+def test_migration_drops_orphaned_items(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrate.db'}"
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "5d2a8f3c71e9")
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO vendors (id, name) VALUES (1, 'Acme')"))
+        conn.execute(text("INSERT INTO products (id, sku, vendor_id) VALUES (1, 'A1', 1)"))
+        conn.execute(text("INSERT INTO price_lists (id, name, formula) VALUES (1, 'Retail', '2')"))
+        conn.execute(text(
+            "INSERT INTO price_list_items (price_list_id, product_id, formula) VALUES (1, 1, '2'), (1, 2, '2'), (2, 1, '2')"
+        ))
+
+    command.upgrade(config, "7e4c1b9a2f56")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT price_list_id, product_id FROM price_list_items")).all() == [(1, 1)]
@@ -0,0 +1,90 @@
+# test_profiling.py
+import pytest
+
+from app.backend import debug_auth, profiling
+
+TOKEN = "s3cret"
+CSV = "Manufacturer,SKU,Cut Cost\nAcme,A1,3.25\n"
+
+
+@pytest.fixture
+def profiled(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(debug_auth, "DEBUG_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    return client
+
+
+def convert(client, **kwargs):
+    return client.post("/b2b/convert-to-b2b", files={"file": ("acme.csv", CSV)}, **kwargs)
+
+
+def test_requests_with_the_token_are_profiled(profiled):
+    res = convert(profiled, headers={"X-Debug-Token": TOKEN})
+    assert res.status_code == 200
+    profile_id = res.headers["x-profile-id"]
+    assert profiling.PROFILE_ID_RE.match(profile_id)
+    assert (profiling.PROFILE_DIR / f"{profile_id}.prof").exists()
+
+    by_query = convert(profiled, params={"profile": TOKEN})
+    assert "x-profile-id" in by_query.headers
+
+    auth = {"X-Debug-Token": TOKEN}
+    listed = profiled.get("/debug/profiles", headers=auth).json()
+    assert {p["id"] for p in listed} == {by_query.headers["x-profile-id"], profile_id}
+    assert all(p["path"] == "/b2b/convert-to-b2b" and p["status"] == 200 for p in listed)
+
+    summary = profiled.get(f"/debug/profiles/{profile_id}", headers=auth, params={"limit": 3}).json()
+    assert summary["total_calls"] > 0
+    assert len(summary["hot_functions"]) == 3
+
+    download = profiled.get(f"/debug/profiles/{profile_id}/download", headers=auth)
+    assert download.status_code == 200
+    assert download.content == (profiling.PROFILE_DIR / f"{profile_id}.prof").read_bytes()
+
+
+def test_parsing_in_worker_threads_is_profiled(profiled):
+    rows = "".join(f"Acme,A{i},3.25\n" for i in range(2000))
+    res = profiled.post(
+        "/b2b/convert-to-b2b", files={"file": ("acme.csv", CSV + rows)}, headers={"X-Debug-Token": TOKEN}
+    )
+    auth = {"X-Debug-Token": TOKEN}
+    summary = profiled.get(f"/debug/profiles/{res.headers['x-profile-id']}", headers=auth).json()
+    assert summary["worker_threads"] >= 1
+    hot = {f["function"] for f in summary["hot_functions"]}
+    assert hot & {"normalize_key", "get_any", "convert_row"}
+
+
+def test_other_requests_are_not_profiled(profiled):
+    assert "x-profile-id" not in convert(profiled).headers
+    assert "x-profile-id" not in convert(profiled, headers={"X-Debug-Token": "wrong"}).headers
+    assert "x-profile-id" not in profiled.get("/vendors/", headers={"X-Debug-Token": TOKEN}).headers
+    assert list(profiling.PROFILE_DIR.iterdir()) == []
+
+
+def test_concurrent_profile_requests_are_served_unprofiled(profiled):
+    assert profiling._busy.acquire(blocking=False)
+    try:
+        res = convert(profiled, headers={"X-Debug-Token": TOKEN})
+    finally:
+        profiling._busy.release()
+    assert res.status_code == 200
+    assert res.headers["x-profile-status"] == "busy"
+
+
+def test_profiles_beyond_profile_keep_are_pruned(profiled, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 2)
+    ids = [convert(profiled, headers={"X-Debug-Token": TOKEN}).headers["x-profile-id"] for _ in range(3)]
+    kept = {p.stem for p in profiling.PROFILE_DIR.glob("*.json")}
+    assert len(kept) == 2 and kept < set(ids)
+    assert len(list(profiling.PROFILE_DIR.glob("*.prof"))) == 2
+
+
+def test_profile_routes_need_the_token(profiled, monkeypatch):
+    assert profiled.get("/debug/profiles").status_code == 403
+    assert profiled.get("/debug/profiles", headers={"X-Debug-Token": "wrong"}).status_code == 403
+    assert profiled.get("/debug/profiles/../../etc", headers={"X-Debug-Token": TOKEN}).status_code == 404
+    assert profiled.get("/debug/profiles/20250101T000000-deadbeef", headers={"X-Debug-Token": TOKEN}).status_code == 404
+
+    monkeypatch.setattr(debug_auth, "DEBUG_TOKEN", "")
+    assert profiled.get("/debug/profiles", headers={"X-Debug-Token": ""}).status_code == 404
+    assert "x-profile-id" not in convert(profiled, headers={"X-Debug-Token": ""}).headers
@@ -0,0 +1,105 @@
+# test_promo_dates.py
+from datetime import date
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, text
+
+from app.backend import models
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[1] / "alembic"
+
+
+def alembic_config(url: str) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    config.set_main_option("sqlalchemy.url", url)
+    return config
+
+
+def test_upgrade_converts_mixed_format_promo_dates(tmp_path):
+    url = f"sqlite:///{tmp_path / 'promo.db'}"
+    config = alembic_config(url)
+    command.upgrade(config, "c27d90f4e1b8")
+
+    engine = create_engine(url)
+    raw = {
+        1: ("2025-03-01", "03/31/2025"),
+        2: ("4/1/25", "2025/04/30"),
+        3: ("01-May-2025", "2025-05-31 00:00:00"),
+        4: ("next week", None),
+        5: (None, " 2025-06-30 "),
+    }
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO vendors (id, name) VALUES (1, 'Acme')"))
+        for pk, (start, end) in raw.items():
+            conn.execute(
+                text("INSERT INTO products (id, sku, vendor_id, is_promo, start_promo_date, end_promo_date) "
+                     "VALUES (:pk, :sku, 1, 1, :start, :end)"),
+                {"pk": pk, "sku": f"S{pk}", "start": start, "end": end},
+            )
+        conn.execute(
+            text("INSERT INTO products_staging (batch_id, sku, start_promo_date) VALUES ('b', 'S9', '12/24/2025')")
+        )
+
+    command.upgrade(config, "d5b3e8a17f62")
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, start_promo_date, end_promo_date FROM products ORDER BY id")).all()
+        staged = conn.execute(text("SELECT start_promo_date FROM products_staging")).scalar()
+    assert rows == [
+        (1, "2025-03-01", "2025-03-31"),
+        (2, "2025-04-01", "2025-04-30"),
+        (3, "2025-05-01", "2025-05-31"),
+        (4, None, None),
+        (5, None, "2025-06-30"),
+    ]
+    assert staged == "2025-12-24"
+
+    indexes = {ix["name"] for ix in inspect(engine).get_indexes("products")}
+    assert {"ix_products_promo_window", "ix_products_sku"} <= indexes
+
+    # Back down and up again without losing the converted dates
+    command.downgrade(config, "c27d90f4e1b8")
+    command.upgrade(config, "d5b3e8a17f62")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT start_promo_date FROM products WHERE id = 1")).scalar() == "2025-03-01"
+
+
+def seed(db):
+    acme = models.Vendor(name="Acme")
+    db.add_all([
+        models.Product(vendor=acme, sku="P1", price=10.0, is_promo=True, promo_cut_cost=8.0, promo_roll_cost=7.0,
+                       start_promo_date=date(2025, 3, 1), end_promo_date=date(2025, 3, 31)),
+        models.Product(vendor=acme, sku="P2", price=5.0, is_promo=True, promo_cut_cost=4.0,
+                       start_promo_date=date(2025, 3, 15)),
+        models.Product(vendor=acme, sku="P3", price=6.0, is_promo=False, promo_cut_cost=1.0),
+    ])
+    db.commit()
+
+
+def by_sku(rows):
+    return {r["sku"]: (r["promo_active"], r["cut_cost"], r["roll_cost"], r["promo_ends"]) for r in rows}
+
+
+def test_effective_price_follows_the_promo_window(client, db):
+    seed(db)
+    params = {"sku": ["P1", "P2", "P3", "missing"]}
+
+    march_10 = by_sku(client.get("/products/effective-price", params={**params, "on": "2025-03-10"}).json())
+    assert march_10 == {
+        "P1": (True, 8.0, 7.0, "2025-03-31"),
+        "P2": (False, 5.0, 5.0, None),
+        "P3": (False, 6.0, 6.0, None),
+    }
+
+    april = by_sku(client.post("/products/effective-price", json={"skus": ["P1", "P2"], "on": "2025-04-02"}).json())
+    assert april == {"P1": (False, 10.0, 10.0, None), "P2": (True, 4.0, 5.0, None)}
+
+
+def test_promotions_lists_active_products(client, db):
+    seed(db)
+    active = client.get("/products/promotions", params={"on": "2025-03-20"}).json()
+    assert sorted(r["sku"] for r in active) == ["P1", "P2"]
+    assert client.get("/products/promotions", params={"on": "2025-02-01"}).json() == []
@@ -0,0 +1,72 @@
+# test_qfloors.py
+import csv
+import gzip
+import io
+
+from app.backend import models
+from app.backend.routers.qfloors_import_export import QFLOORS_HEADERS
+
+
+def seed(db):
+    acme = models.Vendor(name="Acme")
+    db.add_all([
+        models.Product(vendor=acme, sku="A1", style="Oak", color="Natural", product_type="FLOORING",
+                       pricing_unit="SF", price=3.25),
+        models.Product(vendor=models.Vendor(name="Birch"), sku="B1", style="Loft, \"Grey\"", price=9.0),
+        models.Product(sku="X1"),
+    ])
+    db.commit()
+
+
+def read_csv(text: str) -> list[dict]:
+    reader = csv.DictReader(io.StringIO(text))
+    assert reader.fieldnames == QFLOORS_HEADERS
+    return list(reader)
+
+
+def test_export_uses_the_import_layout(client, db):
+    seed(db)
+    res = client.get("/qfloors/export", params={"filename": "catalog.csv"})
+    assert res.status_code == 200
+    assert res.headers["content-disposition"] == 'attachment; filename="catalog.csv"'
+
+    rows = read_csv(res.text)
+    assert rows[0] == {
+        "Manufacturer": "Acme", "Style Name": "Oak", "Color Name": "Natural", "SKU": "A1",
+        "Product Type": "FLOORING", "Pricing Unit": "SF", "Price": "3.25",
+    }
+    assert rows[1]["Style Name"] == 'Loft, "Grey"'
+    assert rows[2]["Manufacturer"] == "Unknown Vendor"
+
+    only_birch = read_csv(client.get("/qfloors/export", params={"vendor": "Birch"}).text)
+    assert [r["SKU"] for r in only_birch] == ["B1"]
+
+
+def test_export_round_trips_through_import(client, db):
+    seed(db)
+    exported = client.get("/qfloors/export", params={"vendor": ["Acme", "Birch"], "compress": "gzip"})
+    assert exported.headers["content-type"] == "application/gzip"
+
+    res = client.post("/qfloors/import", files={"file": ("catalog.csv.gz", exported.content)}, data={"mode": "replace"})
+    assert res.status_code == 200
+    assert res.json() == {
+        "status": "QFloors CSV imported",
+        "mode": "replace",
+        "replaced": 2,
+        "imported": 2,
+        "vendors": 2,
+        "swap_ms": res.json()["swap_ms"],
+        "duplicates_removed": 0,
+    }
+    again = client.get("/qfloors/export", params={"vendor": ["Acme", "Birch"]}).text
+    assert read_csv(again) == read_csv(gzip.decompress(exported.content).decode())
+
+
+def test_import_modes_report_the_same_keys(client):
+    data = "Manufacturer,SKU,Price\nAcme,A1,3.0\nAcme,A1,3.5\n"
+    appended = client.post("/qfloors/import", files={"file": ("q.csv", data)}).json()
+    assert appended == {"status": "QFloors CSV imported", "mode": "append", "imported": 2, "duplicates_removed": 0}
+
+    replaced = client.post("/qfloors/import", files={"file": ("q.csv", data)}, data={"mode": "replace"}).json()
+    assert {"status", "mode", "imported", "duplicates_removed"} <= set(replaced)
+    assert replaced["mode"] == "replace"
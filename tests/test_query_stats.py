@@ -0,0 +1,146 @@
+# test_query_stats.py
+import logging
+import threading
+
+import pytest
+from sqlalchemy import create_engine, insert, select, text
+
+from app.backend import database, debug_auth, models
+from app.backend import query_stats as query_stats_module
+from app.backend.query_stats import QueryStats, describe_params, query_stats, statement_shape
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path/'x.db'}", connect_args={"check_same_thread": False})
+    database.configure_sqlite(engine)
+    models.Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def stats(engine):
+    stats = QueryStats()
+    stats.install(engine)
+    return stats
+
+
+def run_in_request(stats: QueryStats, label: str, work):
+    request, token = stats.start(label)
+    try:
+        work()
+    finally:
+        stats.finish(request, token)
+    return request
+
+
+def test_statement_shape_collapses_in_lists():
+    plain = "SELECT * FROM products WHERE sku = ? LIMIT ?"
+    assert statement_shape(plain) == plain
+    assert statement_shape("SELECT * FROM products WHERE id IN (?)") == "SELECT * FROM products WHERE id IN (?, ...)"
+    assert statement_shape("SELECT * FROM products WHERE id IN (?, ?, ?) AND sku IN (?, ?)") == \
+        "SELECT * FROM products WHERE id IN (?, ...) AND sku IN (?, ...)"
+    assert statement_shape("WHERE id IN (?, ?)") == statement_shape("WHERE id IN (?, ?, ?, ?)")
+
+
+@pytest.mark.parametrize("repeats, flagged", [(query_stats_module.SQL_REPEAT_THRESHOLD - 1, 0),
+                                              (query_stats_module.SQL_REPEAT_THRESHOLD, 1),
+                                              (query_stats_module.SQL_REPEAT_THRESHOLD * 3, 1)])
+def test_repeated_statements_are_flagged_once(engine, stats, caplog, repeats, flagged):
+    def lookups():
+        with engine.connect() as conn:
+            for i in range(repeats):
+                # Different IN-list lengths are still one shape
+                conn.execute(select(models.Product).where(models.Product.id.in_(range(i % 3 + 1)))).all()
+
+    with caplog.at_level(logging.WARNING, logger="sql"):
+        request = run_in_request(stats, "GET /products/", lookups)
+    assert request.count == repeats
+    assert len(request.repeated) == flagged
+    assert len([r for r in caplog.records if "Possible N+1" in r.message]) == flagged
+    assert stats.stats()["routes"]["GET /products/"]["n_plus_one_requests"] == flagged
+
+
+def test_executemany_is_not_a_repeat(engine, stats):
+    rows = [{"sku": f"S{i}"} for i in range(50)]
+
+    def bulk_inserts():
+        with engine.begin() as conn:
+            for _ in range(query_stats_module.SQL_REPEAT_THRESHOLD):
+                conn.execute(insert(models.Product), rows)
+
+    request = run_in_request(stats, "POST /products/bulk", bulk_inserts)
+    assert request.repeated == []
+    assert request.count >= query_stats_module.SQL_REPEAT_THRESHOLD
+
+
+def test_statements_outside_a_request_are_only_counted(engine, stats):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert stats.stats()["statements"] == 1
+    assert stats.stats()["routes"] == {}
+
+
+def test_counters_are_exact_across_threads(engine, stats):
+    def worker():
+        with engine.connect() as conn:
+            for _ in range(50):
+                conn.execute(text("SELECT 1"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    request = run_in_request(stats, "GET /x", lambda: [t.start() for t in threads] + [t.join() for t in threads])
+    assert stats.stats()["statements"] == 400
+    assert request.count == 0  # new threads do not inherit the request context
+
+
+def test_slow_queries_redact_parameters(engine, stats, monkeypatch):
+    monkeypatch.setattr(query_stats_module, "SQL_SLOW_QUERY_MS", 0)
+
+    def work():
+        with engine.connect() as conn:
+            conn.execute(select(models.Product).where(models.Product.sku == "SECRET-SKU"))
+
+    run_in_request(stats, "GET /products/", work)
+    slow = stats.stats()["slow_queries"][0]
+    assert slow["route"] == "GET /products/"
+    assert slow["statement"].startswith("SELECT products.id")
+    assert "SECRET-SKU" not in slow["parameters"]
+    assert slow["parameters"] == "1 values (redacted)"
+
+
+def test_describe_params():
+    assert describe_params(("a", 1), executemany=False) == "2 values (redacted)"
+    assert describe_params(("a", 1), executemany=False, redact=False) == "('a', 1)"
+    assert describe_params([("a",), ("b",)], executemany=True) == "2 rows (redacted)"
+    assert describe_params([("a",)] * 5, executemany=True, redact=False) == "5 rows, first: [('a',), ('a',), ('a',)]"
+    assert describe_params(("x" * 2000,), executemany=False, redact=False).endswith("...")
+
+
+def test_routes_are_labelled_by_template(client, db, monkeypatch):
+    db.add_all([models.Product(sku="A1"), models.Product(sku="A2")])
+    db.commit()
+    before = query_stats.stats()["routes"].get("GET /products/{product_id}", {"requests": 0})["requests"]
+
+    monkeypatch.setattr(query_stats_module, "SQL_DEBUG_HEADERS", True)
+    for product_id in (1, 2, 99):
+        res = client.get(f"/products/{product_id}")
+    assert int(res.headers["x-sql-queries"]) >= 1
+    assert res.headers["x-sql-repeated"] == "0"
+
+    routes = query_stats.stats()["routes"]
+    assert routes["GET /products/{product_id}"]["requests"] == before + 3
+    assert not any(label.startswith("GET /products/1") for label in routes)
+    client.get("/no/such/route")
+    assert "GET (unmatched)" in query_stats.stats()["routes"]
+
+
+def test_debug_queries_need_the_token(client, monkeypatch):
+    assert client.get("/debug/queries").status_code == 404
+    monkeypatch.setattr(debug_auth, "DEBUG_TOKEN", "s3cret")
+    assert client.get("/debug/queries", headers={"X-Debug-Token": "nope"}).status_code == 403
+
+    stats = client.get("/debug/queries", headers={"X-Debug-Token": "s3cret"}).json()
+    assert stats["enabled"] is True
+    assert stats["log_params"] is False
+    assert {"routes", "slow_queries", "statements"} <= set(stats)
@@ -0,0 +1,194 @@
+# test_snapshot.py
+from datetime import date
+
+import pytest
+
+from app.backend import models
+from app.backend.snapshot import CatalogSnapshot, _Table, catalog_snapshot
+
+
+def seed(db):
+    acme, birch = models.Vendor(name="Acme"), models.Vendor(name="Birch")
+    db.add_all([
+        models.Product(vendor=acme, sku="A1", style="Oak", product_type="LVT", pricing_unit="SF", price=3.5,
+                       width=12.0, is_promo=True, start_promo_date=date(2026, 1, 1), barcode="0001"),
+        models.Product(vendor=acme, sku="A2", style="Oak", product_type="CPT", pricing_unit="SY", price=None),
+        models.Product(vendor=birch, sku="B1", style=None, product_type="LVT", is_dropped=None, width=0.0),
+        models.Product(sku="A1", style="Ash", product_type="LVT", price=0.0),
+    ])
+    db.commit()
+    return acme, birch
+
+
+def add_product(db, **fields) -> models.Product:
+    product = models.Product(**fields)
+    db.add(product)
+    db.commit()
+    db.refresh(product)
+    return product
+
+
+def sql_records(db, **filters) -> list[dict]:
+    query = db.query(models.Product)
+    for name, value in filters.items():
+        query = query.filter(getattr(models.Product, name) == value)
+    names = models.Product.__table__.columns.keys()
+    return [
+        {name: value.isoformat() if isinstance(value, date) else value
+         for name in names for value in [getattr(p, name)]}
+        for p in query.order_by(models.Product.id)
+    ]
+
+
+@pytest.fixture
+def snapshot_on(monkeypatch):
+    monkeypatch.setattr(catalog_snapshot, "enabled", True)
+    return catalog_snapshot
+
+
+def test_records_match_sql(db):
+    acme, _ = seed(db)
+    snapshot = CatalogSnapshot(enabled=True)
+
+    assert snapshot.products() == sql_records(db)
+    assert snapshot.products(vendor_id=acme.id) == sql_records(db, vendor_id=acme.id)
+    assert snapshot.products(product_type="LVT") == sql_records(db, product_type="LVT")
+    assert snapshot.products(vendor_id=acme.id, product_type="LVT", skus=["A1", "Z9"]) == \
+        sql_records(db, vendor_id=acme.id, product_type="LVT")
+    assert snapshot.products(product_type="Tile") == []
+
+    first = sql_records(db)[0]
+    assert snapshot.get(first["id"]) == first
+    assert first["start_promo_date"] == "2026-01-01"
+    assert snapshot.get(10_000) is None
+    assert snapshot.stats()["builds"] == 1
+
+
+class CheckedAlive(bytearray):
+    """Fails if rows become visible (len(table)) before every column holds them."""
+
+    def __init__(self, table: _Table):
+        super().__init__()
+        self.table = table
+
+    def check(self, count: int) -> None:
+        last = len(self) + count - 1
+        for column in self.table.columns.values():
+            column.get(last)  # IndexError if the row is not in this column yet
+
+    def append(self, value):
+        self.check(1)
+        super().append(value)
+
+    def extend(self, values):
+        self.check(len(values))
+        super().extend(values)
+
+
+def test_rows_become_visible_after_all_their_columns(db):
+    seed(db)
+    table = _Table()
+    table.alive = CheckedAlive(table)
+    products = db.query(models.Product).order_by(models.Product.id).all()
+    rows = [{name: getattr(p, name) for name in table.names} for p in products]
+
+    table.extend([tuple(row[name] for name in table.names) for row in rows[:2]])
+    for row in rows[2:]:
+        assert table.append(row)
+    assert len(table) == len(rows)
+    assert [table.record(i)["id"] for i in range(len(table))] == [p.id for p in products]
+
+
+def test_patches_apply_without_a_rebuild(db):
+    seed(db)
+    snapshot = CatalogSnapshot(enabled=True)
+    snapshot.products()
+
+    added = add_product(db, sku="N1", style="New", price=1.25)
+    snapshot.added(added)
+    removed = db.query(models.Product).filter_by(sku="A2").one()
+    db.delete(removed)
+    db.commit()
+    snapshot.removed(removed.id)
+
+    assert snapshot.products() == sql_records(db)
+    stats = snapshot.stats()
+    assert (stats["builds"], stats["patches"], stats["tombstones"]) == (1, 2, 1)
+
+
+def test_patches_during_a_rebuild_are_replayed(db, monkeypatch):
+    seed(db)
+    snapshot = CatalogSnapshot(enabled=True)
+    snapshot.products()
+    doomed = db.query(models.Product).filter_by(sku="B1").one()
+    build = snapshot._build
+
+    def build_then_race():
+        # Both writes commit after the rebuild's SELECT has read the table
+        table = build()
+        snapshot.added(add_product(db, sku="N1", style="New", price=9.0))
+        db.delete(doomed)
+        db.commit()
+        snapshot.removed(doomed.id)
+        return table
+
+    monkeypatch.setattr(snapshot, "_build", build_then_race)
+    snapshot.mark_stale()
+    assert snapshot.products() == sql_records(db)
+    assert snapshot.stats()["builds"] == 2
+
+
+def test_reused_max_id_forces_a_rebuild(db):
+    seed(db)
+    snapshot = CatalogSnapshot(enabled=True)
+    last = add_product(db, sku="L1", style="Last")
+    snapshot.products()
+
+    db.delete(last)
+    db.commit()
+    snapshot.removed(last.id)
+    reused = add_product(db, sku="L2", style="Reused")
+    assert reused.id == last.id  # SQLite hands out the deleted max id again
+    snapshot.added(reused)
+
+    assert snapshot.stats()["stale"]
+    assert snapshot.products() == sql_records(db)
+
+
+def test_disabled_snapshot_ignores_patches(db):
+    seed(db)
+    snapshot = CatalogSnapshot(enabled=False)
+    snapshot.added(add_product(db, sku="N1", style="New"))
+    assert snapshot.stats()["patches"] == 0
+
+
+def test_endpoints_read_the_snapshot(client, db, snapshot_on):
+    acme, _ = seed(db)
+    builds = snapshot_on.stats()["builds"]
+    served = client.get("/products/", params={"vendor_id": acme.id, "sku": ["A1", "A2"]}).json()
+    assert [p["sku"] for p in served] == ["A1", "A2"]
+    assert served == sql_records(db, vendor_id=acme.id)
+
+    created = client.post("/products/", json={"sku": "N1", "style": "New", "vendor_id": acme.id}).json()
+    assert client.get(f"/products/{created['id']}").json()["sku"] == "N1"
+    assert client.delete(f"/products/{created['id']}").status_code == 204
+    assert client.get(f"/products/{created['id']}").status_code == 404
+    assert snapshot_on.stats()["builds"] == builds + 1
+
+
+def test_vendor_deletes_rebuild_the_snapshot(client, db, snapshot_on):
+    acme, birch = seed(db)
+    client.get("/products/")
+    builds = snapshot_on.stats()["builds"]
+
+    assert client.delete(f"/vendors/{acme.id}").status_code == 204
+    assert snapshot_on.stats()["stale"]
+    assert [p["vendor_id"] for p in client.get("/products/").json()] == [None, None, birch.id, None]
+
+    assert client.delete("/vendors/clear-all").status_code == 200
+    assert snapshot_on.stats()["stale"]
+    client.get("/products/")
+    assert snapshot_on.stats()["builds"] == builds + 2
+
+    assert client.delete("/products/clear-all").status_code == 200
+    assert client.get("/products/").json() == []
@@ -0,0 +1,94 @@
+# test_staging.py
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.backend import catalog_import, database, models, staging
+
+
+def make_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'staging.db'}", connect_args={"check_same_thread": False})
+    database.configure_sqlite(engine)
+    database.Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def rows(vendor, skus, price=1.0):
+    return [(vendor, {"sku": sku, "style": "Style", "price": price}) for sku in skus]
+
+
+def catalog(db):
+    return sorted(
+        db.execute(select(models.Vendor.name, models.Product.sku, models.Product.price).join(models.Product.vendor)).all()
+    )
+
+
+def staged_rows(db):
+    return db.execute(select(func.count()).select_from(staging.staging)).scalar()
+
+
+def test_replace_swaps_only_the_vendors_in_the_file(tmp_path):
+    Session = make_db(tmp_path)
+    with Session() as db:
+        catalog_import.append_products(db, rows("Acme", ["A1", "A2", "A3"]) + rows("Birch", ["B1"]))
+        db.commit()
+
+        result = catalog_import.replace_products(db, rows("Acme", ["A9"], price=2.0) + rows("Cedar", ["C1"]))
+
+        assert result["replaced"] == 3
+        assert result["imported"] == 2
+        assert result["vendors"] == 2
+        assert catalog(db) == [("Acme", "A9", 2.0), ("Birch", "B1", 1.0), ("Cedar", "C1", 1.0)]
+        assert staged_rows(db) == 0
+
+
+def test_rejected_batch_leaves_the_catalog_and_drops_new_vendors(tmp_path):
+    Session = make_db(tmp_path)
+    with Session() as db:
+        catalog_import.append_products(db, rows("Acme", ["A1"]))
+        db.commit()
+        before = catalog(db)
+
+        bad = rows("Acme", ["A2"]) + rows("Newco", ["N1"], price=-5.0)
+        with pytest.raises(HTTPException) as rejected:
+            catalog_import.replace_products(db, bad)
+
+        assert rejected.value.status_code == 400
+        assert "1 rows with a negative price" in rejected.value.detail
+        assert catalog(db) == before
+        assert staged_rows(db) == 0
+        assert db.execute(select(models.Vendor.name)).scalars().all() == ["Acme"]
+
+
+def test_empty_replace_is_rejected(tmp_path):
+    Session = make_db(tmp_path)
+    with Session() as db:
+        with pytest.raises(HTTPException) as rejected:
+            catalog_import.replace_products(db, [])
+        assert rejected.value.detail == "Import rejected: no rows to import"
+
+
+def test_staging_applies_product_defaults(tmp_path):
+    Session = make_db(tmp_path)
+    with Session() as db:
+        catalog_import.replace_products(db, rows("Acme", ["A1"]))
+        product = db.execute(select(models.Product)).scalar_one()
+        for name, default in staging.PRODUCT_DEFAULTS.items():
+            assert getattr(product, name) == default
+
+
+def test_replace_mode_over_http(client):
+    csv_text = "Manufacturer,Style Name,Color Name,SKU,Product Type,Pricing Unit,Price\n"
+    first = csv_text + "Acme,Oak,Natural,A1,FLOORING,SF,3.25\nAcme,Oak,Dark,A2,FLOORING,SF,3.50\n"
+    second = csv_text + "Acme,Oak,Light,A3,FLOORING,SF,3.75\n"
+
+    client.post("/qfloors/import", files={"file": ("a.csv", first)}, data={"mode": "append"})
+    res = client.post("/qfloors/import", files={"file": ("b.csv", second)}, data={"mode": "replace"})
+    assert res.status_code == 200
+    assert res.json()["replaced"] == 2
+
+    products = client.get("/products/").json()
+    assert [p["sku"] for p in products] == ["A3"]
+
+    assert client.post("/qfloors/import", files={"file": ("c.csv", second)}, data={"mode": "merge"}).status_code == 400
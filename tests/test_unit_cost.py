@@ -0,0 +1,139 @@
+# test_unit_cost.py
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, select, text
+
+from app.backend import models
+from app.backend.unit_cost import cost_per_sf
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[1] / "alembic"
+
+# price, pricing_unit, width, sf_per_carton, expected
+CASES = [
+    (4.5, "SF", None, None, 4.5),
+    (18.0, "sy", None, None, 2.0),
+    (30.0, "CT", None, 20.0, 1.5),
+    (30.0, "CT", 12.0, None, None),  # width may be a piece count
+    (30.0, "CT", None, 0.0, None),
+    (24.0, "LF", 12.0, None, 2.0),
+    (24.0, "LF", None, 12.0, None),
+    (5.0, "EA", 10.0, 10.0, None),
+    (5.0, None, None, None, None),
+    (None, "SF", None, None, None),
+]
+
+
+@pytest.mark.parametrize("price, unit, width, sf_per_carton, expected", CASES)
+def test_cost_per_sf(price, unit, width, sf_per_carton, expected):
+    assert cost_per_sf(price, unit, width, sf_per_carton) == expected
+
+
+def stored_costs(db):
+    return dict(db.execute(select(models.Product.sku, models.Product.normalized_cost_per_sf)).all())
+
+
+def test_stored_column_follows_every_write(client, db):
+    products = [
+        models.Product(sku=f"S{i}", price=p, pricing_unit=u, width=w, sf_per_carton=c)
+        for i, (p, u, w, c, _) in enumerate(CASES)
+    ]
+    db.add_all(products)
+    db.commit()
+    assert [p.normalized_cost_per_sf for p in products] == [expected for *_, expected in CASES]
+
+    # ORM updates
+    products[3].sf_per_carton = 15.0
+    db.commit()
+    assert stored_costs(db)["S3"] == 2.0
+
+    # Bulk inserts and UPDATEs by filter
+    res = client.post("/products/bulk", json=[{"sku": "B1", "style": "Oak", "product_type": "LVT", "pricing_unit": "CT", "price": 40.0,
+                                               "sf_per_carton": 20.0}])
+    assert res.status_code == 200
+    db.expire_all()
+    assert stored_costs(db)["B1"] == 2.0
+
+    res = client.patch("/products/bulk", json={"filter": {"product_type": "LVT"}, "adjust_price": {"multiply": 1.5}})
+    assert res.status_code == 200
+    db.expire_all()
+    assert stored_costs(db)["B1"] == 3.0
+
+    res = client.patch("/products/bulk", json={"filter": {"skus": ["S5"]}, "set": {"width": 6.0}})
+    assert res.status_code == 200
+    db.expire_all()
+    assert stored_costs(db)["S5"] == 4.0
+
+
+def test_import_reads_sf_per_carton(client, db):
+    data = ("Manufacturer,SKU,Product Type,Pricing Unit,Cut Cost,SF/CN,Pcs/CN\n"
+            "Acme,A1,LVT,CT,40.00,20,8\nAcme,A2,LVT,CT,40.00,,8\n")
+    res = client.post("/b2b/import/csv", files={"file": ("a.csv", data)})
+    assert res.status_code == 200
+    assert stored_costs(db) == {"A1": 2.0, "A2": None}
+
+
+def test_migration_backfills_the_stored_column(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrate.db'}"
+    config = Config()
+    config.set_main_option("script_location", str(ALEMBIC_DIR))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "7e4c1b9a2f56")
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO products (sku, pricing_unit, price, width) VALUES"
+            " ('carpet', 'SY', 18.0, 12.0), ('plank', 'CT', 40.0, 8.0), ('roll', 'lf', 24.0, 12.0)"
+        ))
+
+    command.upgrade(config, "head")
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT sku, normalized_cost_per_sf FROM products ORDER BY id")).all()
+    engine.dispose()
+    # Cartons wait for an import that states their SF per carton
+    assert rows == [("carpet", 2.0), ("plank", None), ("roll", 2.0)]
+
+
+def test_type_filter_is_an_index_range_scan(db):
+    plan = db.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM products WHERE product_type = 'LVT'"
+        " AND normalized_cost_per_sf IS NOT NULL ORDER BY normalized_cost_per_sf"
+    )).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_products_type_cost_per_sf" in details
+    assert "TEMP B-TREE" not in details
+
+
+def test_products_by_cost_per_sf(client, db):
+    db.add_all([
+        models.Product(sku="carpet", product_type="CPT", pricing_unit="SY", price=27.0),   # 3.0
+        models.Product(sku="plank", product_type="LVT", pricing_unit="CT", price=40.0, sf_per_carton=20.0),  # 2.0
+        models.Product(sku="tile", product_type="LVT", pricing_unit="SF", price=2.5),      # 2.5
+        models.Product(sku="old", product_type="LVT", pricing_unit="SF", price=0.5, is_dropped=True),
+        models.Product(sku="trim", product_type="LVT", pricing_unit="EA", price=1.0),
+    ])
+    db.commit()
+
+    def skus(**params):
+        res = client.get("/products/by-cost-per-sf", params=params)
+        assert res.status_code == 200
+        return [p["sku"] for p in res.json()]
+
+    assert skus() == ["plank", "tile", "carpet"]
+    assert skus(descending=True, limit=2) == ["carpet", "tile"]
+    assert skus(offset=1) == ["tile", "carpet"]
+    assert skus(product_type="LVT", include_dropped=True) == ["old", "plank", "tile"]
+    assert skus(min_cost=2.2, max_cost=3.0) == ["tile", "carpet"]
+    first = client.get("/products/by-cost-per-sf").json()[0]
+    assert first["normalized_cost_per_sf"] == 2.0
+    assert client.get("/products/by-cost-per-sf", params={"min_cost": -1}).status_code == 422
+
+
+def test_preview_shows_cost_per_sf(client):
+    data = ("Manufacturer,SKU,Product Type,Pricing Unit,Cut Cost,SF/CN,Pcs/CN\n"
+            "Acme,A1,Carpet,SY,18.00,,\nAcme,A2,Carpet,EA,4,,\nAcme,A3,LVT,CT,40,20,\nAcme,A4,LVT,CT,40,,8\n")
+    rows = client.post("/b2b/preview", files={"file": ("a.csv", data)}).json()["rows_preview"]
+    assert [row["Cost/SF"] for row in rows] == [2.0, None, 2.0, None]
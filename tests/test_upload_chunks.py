@@ -0,0 +1,138 @@
+# test_upload_chunks.py
+import gzip
+import io
+import os
+
+import openpyxl
+import pytest
+
+from app.backend import upload_store
+from app.backend.routers import b2b_import_export as b2b
+from app.backend.routers import uploads
+from app.backend.routers.uploads import DETECT_LINES, ChunkParser
+
+
+def vendor_file(rows: int = DETECT_LINES + 40) -> bytes:
+    """Title rows, CRLF endings, cp1252 text and quoted fields spanning lines."""
+    lines = [
+        "Acme Price List",
+        "",
+        "Manufacturer,Style Name,Color Name,SKU,Product Type,Pricing Unit,Cut Cost,Comments",
+    ]
+    for i in range(rows):
+        if i % 7 == 3:
+            comment = '"multi-line\r\nnote, with ""quotes""\r\nand a comma"'
+        elif i % 7 == 5:
+            comment = '"Café crème – “best” seller"'
+        else:
+            comment = ""
+        lines.append(f"Acme,Style {i % 4},Color {i},SKU{i:04d},Carpet,SY,{10 + i / 4:.2f},{comment}")
+    return ("\r\n".join(lines) + "\r\n").encode("cp1252")
+
+
+def convert_whole(client, data: bytes, filename: str = "acme.csv") -> bytes:
+    res = client.post("/b2b/convert-to-b2b", files={"file": (filename, data)})
+    assert res.status_code == 200
+    return res.content
+
+
+def chunked(client, data: bytes, chunk_size: int, filename: str = "acme.csv", purpose: str = "convert", **form):
+    created = client.post("/b2b/uploads", data={"filename": filename, "purpose": purpose, "total_size": len(data)})
+    assert created.status_code == 200
+    upload_id = created.json()["upload_id"]
+    for offset in range(0, len(data), chunk_size):
+        res = client.put(f"/b2b/uploads/{upload_id}", params={"offset": offset}, content=data[offset:offset + chunk_size])
+        assert res.json()["received"] == min(offset + chunk_size, len(data))
+    return upload_id, client.post(f"/b2b/uploads/{upload_id}/finalize", data=form)
+
+
+@pytest.mark.parametrize("chunk_size", [3, 64, 1000, 1 << 20])
+def test_chunked_output_is_byte_identical_to_convert(client, chunk_size):
+    data = vendor_file()
+    _, res = chunked(client, data, chunk_size)
+    assert res.status_code == 200
+    assert res.content == convert_whole(client, data)
+
+
+def test_parser_splits_records_by_quote_parity(db):
+    data = vendor_file(rows=20)
+    parser = ChunkParser({"upload_id": "0" * 32, "filename": "acme.csv", "purpose": "convert"})
+    for i in range(0, len(data), 5):
+        parser.feed(data[i:i + 5])
+    parser.feed(b"", final=True)
+
+    reader = b2b.build_reader(data, "acme.csv")
+    expected = [b2b.convert_row(b2b.normalize_row(row), reader.is_soho, None, False) for row in reader]
+    assert parser.rows == expected
+    assert parser.fmt.header_index == 2
+    assert parser.encoding == "cp1252"
+    # Line breaks inside quoted fields did not split records
+    assert [row["SKU"] for row in parser.rows] == [f"SKU{i:04d}" for i in range(20)]
+
+
+def test_gzip_and_xlsx_uploads(client):
+    data = vendor_file()
+    _, res = chunked(client, gzip.compress(data), 100, filename="acme.csv.gz")
+    assert res.content == convert_whole(client, data)
+
+    workbook = openpyxl.Workbook()
+    workbook.active.append(["Manufacturer", "SKU", "Product Type", "Pricing Unit", "Cut Cost"])
+    workbook.active.append(["Acme", "X1", "Carpet", "SY", 12.5])
+    buf = io.BytesIO()
+    workbook.save(buf)
+    _, res = chunked(client, buf.getvalue(), 500, filename="acme.xlsx")
+    assert res.content == convert_whole(client, buf.getvalue(), "acme.xlsx")
+
+
+def test_resume_after_a_dropped_chunk(client):
+    data = vendor_file()
+    upload_id = client.post("/b2b/uploads", data={"filename": "acme.csv", "total_size": len(data)}).json()["upload_id"]
+    client.put(f"/b2b/uploads/{upload_id}", params={"offset": 0}, content=data[:100])
+
+    gap = client.put(f"/b2b/uploads/{upload_id}", params={"offset": 200}, content=data[200:300])
+    assert gap.status_code == 409
+    assert gap.headers["upload-offset"] == "100"
+
+    early = client.post(f"/b2b/uploads/{upload_id}/finalize")
+    assert early.status_code == 409
+    assert early.json()["detail"]["received"] == 100
+
+    # A retried chunk overlapping what was stored only appends the new bytes
+    retry = client.put(f"/b2b/uploads/{upload_id}", params={"offset": 50}, content=data[50:])
+    assert retry.json()["received"] == len(data)
+    status = client.get(f"/b2b/uploads/{upload_id}").json()
+    assert status["received"] == len(data)
+
+    res = client.post(f"/b2b/uploads/{upload_id}/finalize")
+    assert res.content == convert_whole(client, data)
+    assert client.get(f"/b2b/uploads/{upload_id}").status_code == 404
+
+
+def test_import_purpose_writes_the_rows(client):
+    data = vendor_file(rows=10)
+    _, res = chunked(client, data, 64, purpose="import", mode="append")
+    assert res.status_code == 200
+    assert res.json()["imported"] == 10
+    assert len(client.get("/products/").json()) == 10
+
+
+def test_unknown_and_aborted_uploads(client):
+    assert client.get("/b2b/uploads/not-an-id").status_code == 404
+    assert client.post("/b2b/uploads", data={"filename": "a.csv", "purpose": "print"}).status_code == 400
+
+    upload_id = client.post("/b2b/uploads", data={"filename": "a.csv"}).json()["upload_id"]
+    assert client.delete(f"/b2b/uploads/{upload_id}").status_code == 204
+    assert client.put(f"/b2b/uploads/{upload_id}", params={"offset": 0}, content=b"x").status_code == 404
+
+
+def test_expired_uploads_leave_no_parser(client):
+    data = vendor_file(rows=10)
+    upload_id = client.post("/b2b/uploads", data={"filename": "acme.csv"}).json()["upload_id"]
+    client.put(f"/b2b/uploads/{upload_id}", params={"offset": 0}, content=data[:100])
+    assert upload_id in uploads._parsers
+
+    expired = os.path.getmtime(upload_store.UPLOAD_DIR / f"{upload_id}.part") - upload_store.UPLOAD_TTL_SECONDS - 1
+    os.utime(upload_store.UPLOAD_DIR / f"{upload_id}.part", (expired, expired))
+    client.post("/b2b/uploads", data={"filename": "other.csv"})
+    assert upload_id not in uploads._parsers
+    assert client.get(f"/b2b/uploads/{upload_id}").status_code == 404
@@ -0,0 +1,115 @@
+# test_writer.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.backend import catalog_import, database, debug_auth, models
+from app.backend.writer import WriteCoordinator
+
+UPLOADS = 24
+ROWS_PER_UPLOAD = 250
+
+
+def make_db(tmp_path):
+    path = tmp_path / "writer.db"
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    database.configure_sqlite(engine)
+    database.Base.metadata.create_all(bind=engine)
+    return path, engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def upload_rows(n):
+    vendor = f"Vendor {n % 5}"
+    return [
+        (vendor, {"sku": f"U{n}-{i}", "style": "Style", "price": 1.0 + i})
+        for i in range(ROWS_PER_UPLOAD)
+    ]
+
+
+def test_parallel_uploads_without_lock_errors(tmp_path):
+    path, engine, Session = make_db(tmp_path)
+
+    # Two coordinators sharing one lock file stand in for two uvicorn workers
+    workers = [
+        WriteCoordinator(session_factory=Session, lock_path=f"{path}.writer.lock")
+        for _ in range(2)
+    ]
+
+    stop = threading.Event()
+    read_errors = []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                with Session() as db:
+                    db.execute(select(func.count()).select_from(models.Product)).scalar()
+            except Exception as e:
+                read_errors.append(e)
+
+    read_thread = threading.Thread(target=reader)
+    read_thread.start()
+
+    def upload(n):
+        return workers[n % 2].submit(catalog_import.append_products, upload_rows(n)).result(timeout=60)
+
+    with ThreadPoolExecutor(max_workers=UPLOADS) as pool:
+        results = list(pool.map(upload, range(UPLOADS)))
+
+    stop.set()
+    read_thread.join()
+
+    assert all(r == {"imported": ROWS_PER_UPLOAD} for r in results)
+    assert not read_errors
+
+    with Session() as db:
+        assert db.execute(select(func.count()).select_from(models.Product)).scalar() == UPLOADS * ROWS_PER_UPLOAD
+        assert db.execute(select(func.count()).select_from(models.Vendor)).scalar() == 5
+
+    stats = [w.stats() for w in workers]
+    assert sum(s["jobs"] for s in stats) == UPLOADS
+    assert sum(s["failed"] for s in stats) == 0
+    assert all(s["queue_depth"] == 0 for s in stats)
+
+
+def test_failing_job_does_not_roll_back_its_batch(tmp_path):
+    _, engine, Session = make_db(tmp_path)
+    writer = WriteCoordinator(session_factory=Session)
+    gate = threading.Event()
+
+    def blocker(db):
+        gate.wait(timeout=10)
+
+    def boom(db):
+        db.add(models.Product(sku="never"))
+        db.flush()
+        raise ValueError("bad row")
+
+    # Hold the writer so the next three jobs are drained as one batch
+    first = writer.submit(blocker)
+    good_a = writer.submit(catalog_import.append_products, upload_rows(1))
+    bad = writer.submit(boom)
+    good_b = writer.submit(catalog_import.append_products, upload_rows(2))
+    gate.set()
+
+    first.result(timeout=10)
+    assert good_a.result(timeout=10) == {"imported": ROWS_PER_UPLOAD}
+    assert good_b.result(timeout=10) == {"imported": ROWS_PER_UPLOAD}
+    assert isinstance(bad.exception(timeout=10), ValueError)
+
+    with Session() as db:
+        skus = db.execute(select(models.Product.sku)).scalars().all()
+    assert len(skus) == 2 * ROWS_PER_UPLOAD
+    assert "never" not in skus
+    assert writer.stats()["failed"] == 1
+
+
+def test_debug_writer_needs_the_token(client, monkeypatch):
+    assert client.get("/debug/writer").status_code == 404
+    monkeypatch.setattr(debug_auth, "DEBUG_TOKEN", "s3cret")
+    assert client.get("/debug/writer").status_code == 403
+    assert client.get("/debug/writer", headers={"X-Debug-Token": "nope"}).status_code == 403
+
+    stats = client.get("/debug/writer", headers={"X-Debug-Token": "s3cret"}).json()
+    assert stats["failed"] == 0
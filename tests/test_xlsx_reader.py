@@ -0,0 +1,91 @@
+# test_xlsx_reader.py
+import datetime
+import io
+
+import pytest
+from fastapi import HTTPException
+from openpyxl import Workbook
+
+from app.backend.routers import b2b_import_export
+from app.backend.routers.b2b_import_export import build_reader, convert_contents, is_xlsx
+
+HEADER = ["Manufacturer", "Style Name", "Color Name", "SKU", "Product Type", "Pricing Unit", "Cut Cost", "Roll Cost"]
+ROWS = [
+    ["Acme", "Oak", "Natural", "A1", "Flooring", "SF", 3.25, 3.0],
+    ["Acme", "Oak", "Dark", "A2", "Carpet", "SY", 12.5, 11.0],
+]
+CSV = (
+    "Manufacturer,Style Name,Color Name,SKU,Product Type,Pricing Unit,Cut Cost,Roll Cost\n"
+    "Acme,Oak,Natural,A1,Flooring,SF,3.25,3\n"
+    "Acme,Oak,Dark,A2,Carpet,SY,12.5,11\n"
+).encode()
+
+
+def workbook_bytes(sheets: dict[str, list[list]]) -> bytes:
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for title, rows in sheets.items():
+        sheet = workbook.create_sheet(title)
+        for row in rows:
+            sheet.append(row)
+    buf = io.BytesIO()
+    workbook.save(buf)
+    return buf.getvalue()
+
+
+def price_list_workbook() -> bytes:
+    return workbook_bytes({
+        "Notes": [["Read me first"], ["Prices valid until further notice"]],
+        "Prices": [["Acme spring price list"], [], HEADER, *ROWS, [None] * len(HEADER)],
+    })
+
+
+def test_detects_workbooks_by_content_or_name():
+    data = price_list_workbook()
+    assert is_xlsx(data)
+    assert is_xlsx(b"", "prices.XLSX")
+    assert not is_xlsx(CSV, "prices.csv")
+
+
+def test_picks_the_sheet_and_header_row(db):
+    reader = build_reader(price_list_workbook(), "prices.xlsx")
+
+    assert reader.sheet_name == "Prices"
+    assert reader.header_index == 2
+    assert reader.fieldnames == [b2b_import_export.normalize_key(h) for h in HEADER]
+    assert not reader.is_soho
+    rows = list(reader)
+    assert [r["sku"] for r in rows] == ["A1", "A2"]
+    assert rows[1]["cutcost"] == "12.5"
+    assert rows[0]["rollcost"] == "3"
+
+
+def test_converts_like_the_equivalent_csv(db):
+    xlsx_text, xlsx_rows, _ = convert_contents(price_list_workbook(), source_name="prices.xlsx")
+    csv_text, csv_rows, _ = convert_contents(CSV, source_name="prices.csv")
+    assert xlsx_rows == csv_rows == 2
+    assert xlsx_text == csv_text
+
+
+def test_cells_render_as_in_a_csv_export():
+    assert b2b_import_export.cell_text(None) == ""
+    assert b2b_import_export.cell_text(4.0) == "4"
+    assert b2b_import_export.cell_text(datetime.datetime(2025, 3, 1)) == "2025-03-01"
+    assert b2b_import_export.cell_text(datetime.datetime(2025, 3, 1, 8, 30)) == "2025-03-01T08:30:00"
+    assert b2b_import_export.cell_text("  SKU9 ") == "SKU9"
+
+
+def test_empty_and_unreadable_workbooks_are_rejected():
+    with pytest.raises(HTTPException) as empty:
+        build_reader(workbook_bytes({"Sheet": []}), "empty.xlsx")
+    assert empty.value.detail == "Empty XLSX file"
+
+    with pytest.raises(HTTPException) as broken:
+        build_reader(b"not a workbook", "broken.xlsx")
+    assert broken.value.status_code == 400
+
+
+def test_convert_endpoint_accepts_xlsx(client):
+    res = client.post("/b2b/convert-to-b2b", files={"file": ("prices.xlsx", price_list_workbook())})
+    assert res.status_code == 200
+    assert res.text == convert_contents(CSV, source_name="prices.csv")[0]